@@ -0,0 +1,123 @@
+import ast
+import hashlib
+import json
+import os
+from collections import OrderedDict, defaultdict
+
+ANALYZER_SOURCES = ['DDG.py', 'Memory_Estimator.py', 'Analysis_Cache.py', 'Parsed_Program.py', 'Parallelizer.py']
+
+def normalized_ast(nodes):
+    '''
+    dump of the AST without line numbers or formatting, two sources that parse to the same tree share it.
+    '''
+    if isinstance(nodes, ast.AST):
+        nodes = [nodes]
+    return '\n'.join(ast.dump(node, annotate_fields=False) for node in nodes)
+
+def file_identity(path):
+    '''
+    (real path, size, mtime) of a file, None if it does not exist. symlinks to the same file share it.
+    '''
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return [os.path.realpath(path), stat.st_size, stat.st_mtime_ns]
+
+def _analyzer_version():
+    digest = hashlib.sha256()
+    folder = os.path.dirname(os.path.abspath(__file__))
+    for name in ANALYZER_SOURCES:
+        try:
+            with open(os.path.join(folder, name), 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(name.encode())
+    return digest.hexdigest()[:16]
+
+class Analysis_Cache:
+    '''
+    content addressed on-disk cache for analysis results (one JSON file per entry).
+    entries are evicted least recently used first once the folder grows over max_bytes,
+    recency is the file mtime so several processes can share the same folder.
+    '''
+    def __init__(self, folder='temp/cache', max_bytes=64 * 1024 * 1024):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.version = _analyzer_version()
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self.evictions = 0
+        os.makedirs(folder, exist_ok=True)
+        #! entry name -> size, ordered from least to most recently used
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        scanned = []
+        for entry in os.scandir(folder):
+            if entry.name.endswith('.json'):
+                stat = entry.stat()
+                scanned.append((stat.st_mtime_ns, entry.name, stat.st_size))
+        for _, name, size in sorted(scanned):
+            self.entries[name] = size
+            self.total_bytes += size
+        self._evict()
+    def make_key(self, kind, *parts):
+        '''
+        builds the key of an entry from its kind and any JSON serializable parts.
+        '''
+        payload = json.dumps([self.version, kind, parts], sort_keys=True, default=str)
+        return f"{kind}-{hashlib.sha256(payload.encode()).hexdigest()}"
+    def _path(self, key):
+        return os.path.join(self.folder, f"{key}.json")
+    def get(self, key):
+        kind = key.split('-', 1)[0]
+        name = f"{key}.json"
+        try:
+            with open(self._path(key), 'r') as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            self.misses[kind] += 1
+            return None
+        self.hits[kind] += 1
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        if name in self.entries:
+            self.entries.move_to_end(name)
+        return value
+    def put(self, key, value):
+        name = f"{key}.json"
+        data = json.dumps(value)
+        temp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(data)
+        os.replace(temp_path, self._path(key))
+        self.total_bytes -= self.entries.pop(name, 0)
+        self.entries[name] = len(data)
+        self.total_bytes += len(data)
+        self._evict()
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            name, size = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except OSError:
+                pass
+    def reset_stats(self):
+        self.hits.clear()
+        self.misses.clear()
+        self.evictions = 0
+    def stats(self):
+        kinds = sorted(set(self.hits) | set(self.misses))
+        return {kind: {'hits': self.hits[kind], 'misses': self.misses[kind]} for kind in kinds}
+    def report(self):
+        lines = ["Analysis cache statistics:"]
+        for kind, counts in self.stats().items():
+            total = counts['hits'] + counts['misses']
+            rate = 100 * counts['hits'] / total if total else 0
+            lines.append(f"  {kind:<10} hits: {counts['hits']:<5} misses: {counts['misses']:<5} hit rate: {rate:.0f}%")
+        lines.append(f"  entries: {len(self.entries)}  size: {self.total_bytes} bytes  evictions: {self.evictions}")
+        return "\n".join(lines)
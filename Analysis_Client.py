@@ -0,0 +1,91 @@
+#! thin client of Analysis_Server.py, takes the same arguments as Parallelizer.py
+#! only standard library modules are imported so the client starts fast
+import json
+import os
+import socket
+import stat
+import sys
+import tempfile
+
+USAGE = """usage: Analysis_Client.py [--socket PATH] [--ping | --shutdown-server] <Parallelizer.py arguments>
+
+Sends the arguments to a running Analysis_Server.py, falls back to a local (cold) run when no server is listening."""
+
+def default_socket_path():
+    '''
+    $XDG_RUNTIME_DIR/parallelizer.sock, else parallelizer.sock in a parallelizer-<uid> folder of the temp directory
+    that only the user can enter (Analysis_Server.py creates it).
+    '''
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "parallelizer.sock")
+    return os.path.join(tempfile.gettempdir(), f"parallelizer-{os.getuid()}", "parallelizer.sock")
+
+def check_private(path):
+    '''
+    raises PermissionError unless path belongs to the user and, for a folder, no one else can write to it.
+    '''
+    info = os.lstat(path)
+    if info.st_uid != os.getuid():
+        raise PermissionError(f"{path} belongs to another user.")
+    if stat.S_ISDIR(info.st_mode) and info.st_mode & 0o022:
+        raise PermissionError(f"{path} can be written by other users.")
+
+def send(socket_path, request):
+    '''
+    sends one request and returns the decoded response, raises OSError if no server is listening and
+    PermissionError if the socket or its folder is not the user's own.
+    '''
+    #! another user could have put the socket there to read the requests
+    check_private(os.path.dirname(os.path.abspath(socket_path)))
+    check_private(socket_path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps(request).encode() + b"\n")
+        chunks = []
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return json.loads(b"".join(chunks))
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    socket_path = os.environ.get('PARALLELIZER_SOCKET', default_socket_path())
+    command = None
+    if argv[:1] in (['-h'], ['--help']):
+        print(USAGE)
+        return 0
+    while argv and argv[0] in ('--socket', '--ping', '--shutdown-server'):
+        option = argv.pop(0)
+        if option == '--socket':
+            if not argv:
+                print("--socket expects a path", file=sys.stderr)
+                return 2
+            socket_path = argv.pop(0)
+        else:
+            command = option[2:].replace('-server', '')
+    request = {'command': command} if command else {'argv': argv, 'cwd': os.getcwd()}
+    try:
+        response = send(socket_path, request)
+    except PermissionError as e:
+        print(f"Not using {socket_path}: {e}", file=sys.stderr)
+        return 1
+    except OSError:
+        if command:
+            print(f"No analysis server listening on {socket_path}.", file=sys.stderr)
+            return 1
+        print(f"No analysis server listening on {socket_path}, running locally.", file=sys.stderr)
+        import Parallelizer
+        try:
+            Parallelizer.main(argv)
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else 1
+        return 0
+    sys.stdout.write(response['stdout'])
+    sys.stderr.write(response['stderr'])
+    return response['returncode']
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+from Parallelizer import build_arg_parser, run_cli
+from Analysis_Cache import Analysis_Cache
+from Analysis_Client import check_private, default_socket_path
+import argparse
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import traceback
+
+class Analysis_Server(socketserver.UnixStreamServer):
+    '''
+    keeps the analysis modules imported and one Analysis_Cache per cache folder open between requests.
+    requests are handled one at a time since the analysis works relative to the client's cwd.
+    '''
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        #! (cache folder, max bytes) -> Analysis_Cache
+        self.caches = {}
+        self.requests = 0
+        self.shutdown_requested = False
+        super().__init__(socket_path, Analysis_Handler)
+    def get_cache(self, folder, max_bytes):
+        folder = os.path.abspath(folder)
+        cache = self.caches.get((folder, max_bytes))
+        #! the folder may have been removed since the last request
+        if cache is None or not os.path.isdir(folder):
+            cache = self.caches[(folder, max_bytes)] = Analysis_Cache(folder, max_bytes)
+        cache.reset_stats()
+        return cache
+    def run(self, argv, cwd):
+        '''
+        runs Parallelizer with argv from cwd, returns (exit code, stdout, stderr).
+        '''
+        stdout, stderr = io.StringIO(), io.StringIO()
+        previous_cwd = os.getcwd()
+        returncode = 0
+        try:
+            os.chdir(cwd)
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    parser = build_arg_parser()
+                    parser.prog = 'Parallelizer.py'
+                    args = parser.parse_args(argv)
+                    cache = None if args.no_cache else self.get_cache(args.cache_dir, args.cache_size * 1024 * 1024)
+                    run_cli(args, cache)
+                except SystemExit as e:
+                    returncode = e.code if isinstance(e.code, int) else 1
+                except Exception:
+                    traceback.print_exc()
+                    returncode = 1
+        except OSError as e:
+            stderr.write(f"Cannot run in {cwd}: {e}\n")
+            returncode = 1
+        finally:
+            os.chdir(previous_cwd)
+        self.requests += 1
+        return returncode, stdout.getvalue(), stderr.getvalue()
+    def server_close(self):
+        super().server_close()
+        try:
+            os.remove(self.socket_path)
+        except OSError:
+            pass
+
+class Analysis_Handler(socketserver.StreamRequestHandler):
+    #! one JSON request line in, one JSON response line out
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+        except ValueError:
+            self.respond({'returncode': 2, 'stdout': '', 'stderr': 'Malformed request.\n'})
+            return
+        if request.get('command') == 'shutdown':
+            self.respond({'returncode': 0, 'stdout': '', 'stderr': ''})
+            self.server.shutdown_requested = True
+            return
+        if request.get('command') == 'ping':
+            self.respond({'returncode': 0, 'stdout': f"pid {os.getpid()}, {self.server.requests} requests served\n", 'stderr': ''})
+            return
+        returncode, stdout, stderr = self.server.run(request.get('argv', []), request.get('cwd', os.getcwd()))
+        self.respond({'returncode': returncode, 'stdout': stdout, 'stderr': stderr})
+    def respond(self, response):
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+def serve(socket_path):
+    #! clients only connect to a socket in a folder no other user can write to
+    folder = os.path.dirname(os.path.abspath(socket_path))
+    os.makedirs(folder, mode=0o700, exist_ok=True)
+    try:
+        check_private(folder)
+    except PermissionError as e:
+        raise SystemExit(f"Cannot listen on {socket_path}: {e}")
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+            raise SystemExit(f"An analysis server is already listening on {socket_path}.")
+        except OSError:
+            #! a stale socket from a server that did not exit cleanly
+            os.remove(socket_path)
+        finally:
+            probe.close()
+    server = Analysis_Server(socket_path)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"Analysis server listening on {socket_path} (pid {os.getpid()})", flush=True)
+    try:
+        while not server.shutdown_requested:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Long running analysis server, use Analysis_Client.py to send it submissions.")
+    parser.add_argument('--socket', default=default_socket_path(), help='Path of the Unix domain socket to listen on.')
+    args = parser.parse_args()
+    serve(args.socket)
+
+if __name__ == "__main__":
+    main()
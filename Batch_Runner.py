@@ -0,0 +1,173 @@
+from Parallelizer import run_pipeline
+from Analysis_Cache import Analysis_Cache
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import ast
+import contextlib
+import glob
+import json
+import os
+import shutil
+import time
+import traceback
+
+STAGES = ['syntax', 'ddg', 'grouping', 'footprint', 'schedule']
+
+def collect_submissions(inputs):
+    '''
+    expands directories (every .py below them), glob patterns and plain files, keeping the first occurence.
+    '''
+    submissions = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths = sorted(glob.glob(os.path.join(item, '**', '*.py'), recursive=True))
+        else:
+            paths = sorted(glob.glob(item)) or [item]
+        for path in paths:
+            path = os.path.abspath(path)
+            if '__pycache__' not in path and path not in submissions:
+                submissions.append(path)
+    return submissions
+
+def workspace_name(submission, root):
+    relative = os.path.relpath(submission, root)
+    return os.path.splitext(relative)[0].replace(os.sep, '__')
+
+def get_data_file_name(submission):
+    #! FILE_NAME = '...' at the top of the submission
+    try:
+        tree = ast.parse(open(submission, 'r').read())
+    except (OSError, SyntaxError):
+        return None
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == 'FILE_NAME' for t in node.targets):
+            if isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+                return node.value.value
+    return None
+
+def link_data_file(submission, workspace, data_dirs):
+    '''
+    makes the data file of the submission visible from its workspace, looking next to the
+    submission first and then in data_dirs. returns the path it links to, None if not found.
+    '''
+    file_name = get_data_file_name(submission)
+    if file_name is None or os.path.isabs(file_name):
+        return None
+    for folder in [os.path.dirname(submission)] + list(data_dirs):
+        source = os.path.join(folder, file_name)
+        if os.path.isfile(source):
+            target = os.path.join(workspace, file_name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                os.symlink(os.path.abspath(source), target)
+            except OSError:
+                shutil.copyfile(source, target)
+            return source
+    return None
+
+def run_job(job):
+    '''
+    analyses and schedules one submission inside its own workspace (runs in a worker process).
+    '''
+    workspace = job['workspace']
+    shutil.rmtree(workspace, ignore_errors=True)
+    os.makedirs(workspace)
+    data_file = link_data_file(job['submission'], workspace, job['data_dirs'])
+    timings = {}
+    summary = {'submission': job['submission'], 'workspace': workspace, 'data_file': data_file}
+    cache = None
+    cwd = os.getcwd()
+    start = time.perf_counter()
+    os.chdir(workspace)
+    try:
+        with open('log.txt', 'w') as log, contextlib.redirect_stdout(log):
+            try:
+                if job['cache_dir'] is not None:
+                    cache = Analysis_Cache(job['cache_dir'], job['cache_size'])
+                result = run_pipeline(job['submission'], job['nodes'], cache, output_dir='.', timings=timings)
+                if result is not None:
+                    whole_program_node = result['schedule']['whole_program_node']
+                    if whole_program_node:
+                        summary['outcome'] = f"ok: fits on {whole_program_node['name']}"
+                    else:
+                        summary['outcome'] = f"ok: {len(result['schedule']['consolidated_schedule_info'])} blocks"
+                elif 'ddg' not in timings:
+                    summary['outcome'] = 'syntax error'
+                else:
+                    summary['outcome'] = 'DDG failed'
+            except Exception as e:
+                traceback.print_exc(file=log)
+                summary['outcome'] = f"error: {type(e).__name__}: {e}"
+    finally:
+        os.chdir(cwd)
+    summary['timings'] = timings
+    summary['total'] = time.perf_counter() - start
+    summary['cache'] = cache.stats() if cache is not None else {}
+    return summary
+
+def summary_table(summaries):
+    rows = []
+    for summary in summaries:
+        hits = sum(counts['hits'] for counts in summary['cache'].values())
+        lookups = hits + sum(counts['misses'] for counts in summary['cache'].values())
+        row = [os.path.basename(summary['workspace']), summary['outcome']]
+        row += [f"{summary['timings'][stage] * 1000:.1f}" if stage in summary['timings'] else '-' for stage in STAGES]
+        row += [f"{summary['total'] * 1000:.1f}", f"{hits}/{lookups}" if lookups else '-']
+        rows.append(row)
+    from tabulate import tabulate
+    headers = ['program', 'outcome'] + [f"{stage} ms" for stage in STAGES] + ['total ms', 'cache hits']
+    return tabulate(rows, headers=headers, tablefmt='github')
+
+def run_batch(submissions, nodes_data, out_dir, jobs=1, cache_dir=None, cache_size=64 * 1024 * 1024, data_dirs=()):
+    '''
+    runs every submission in out_dir/<name>/ on a pool of jobs processes sharing cache_dir,
+    returns the per-submission summaries in input order.
+    '''
+    out_dir = os.path.abspath(out_dir)
+    root = os.path.commonpath([os.path.dirname(path) for path in submissions]) if submissions else out_dir
+    job_list = [{
+        'submission': submission,
+        'workspace': os.path.join(out_dir, workspace_name(submission, root)),
+        'nodes': nodes_data,
+        'cache_dir': os.path.abspath(cache_dir) if cache_dir is not None else None,
+        'cache_size': cache_size,
+        'data_dirs': [os.path.abspath(folder) for folder in data_dirs],
+    } for submission in submissions]
+    os.makedirs(out_dir, exist_ok=True)
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(run_job, job_list))
+    return [run_job(job) for job in job_list]
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse and schedule many submissions, each in its own workspace.")
+    parser.add_argument('inputs', nargs='+', help='Submission files, directories (every .py below them) or glob patterns.')
+    parser.add_argument('--nodes', required=True, help='Path to the nodes JSON file used to schedule every submission.')
+    parser.add_argument('--out', default='batch_out', help='Folder receiving one workspace per submission and the summary.')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='Submissions analysed concurrently.')
+    parser.add_argument('--cache-dir', default=None, help='Shared analysis cache folder (default <out>/cache).')
+    parser.add_argument('--cache-size', type=int, default=64, help='Maximum cache size in MB.')
+    parser.add_argument('--no-cache', action='store_true', help='Do not use the analysis cache.')
+    parser.add_argument('--data-dir', action='append', default=None, help='Folder searched for data files not found next to a submission (default: current folder).')
+    args = parser.parse_args()
+
+    with open(args.nodes, 'r') as f:
+        nodes_data = json.load(f)
+    submissions = collect_submissions(args.inputs)
+    cache_dir = None if args.no_cache else (args.cache_dir or os.path.join(args.out, 'cache'))
+    data_dirs = args.data_dir or [os.getcwd()]
+    start = time.perf_counter()
+    summaries = run_batch(submissions, nodes_data, args.out, args.jobs, cache_dir, args.cache_size * 1024 * 1024, data_dirs)
+    elapsed = time.perf_counter() - start
+
+    table = summary_table(summaries)
+    print(table)
+    print(f"\n{len(summaries)} submissions in {elapsed:.2f}s with {args.jobs} jobs, "
+          f"{sum(s['outcome'].startswith('ok') for s in summaries)} ok.")
+    with open(os.path.join(args.out, 'summary.txt'), 'w') as f:
+        f.write(table + "\n")
+    with open(os.path.join(args.out, 'summary.json'), 'w') as f:
+        json.dump(summaries, f, indent=4)
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,26 @@
-import networkx as nx
-import matplotlib.pyplot as plt
 import ast
 import os
+import sys
 import textwrap
-from tabulate import tabulate
-from termcolor import colored
+from array import array
 import re
-import gc
 import json
 from collections import defaultdict
+from Analysis_Cache import normalized_ast
 
 class DDG_Node:
-    def __init__(self, line_number,statement):
-        self.statement = statement
+    def __init__(self, line_number,statement=None,source=None):
+        self._statement = statement
+        #! AST node the statement text is generated from on first access
+        self.source = source
         self.line_number = line_number
         self.has=[]
         self.needs=[]
+    @property
+    def statement(self):
+        if self._statement is None and self.source is not None:
+            self._statement = ast.unparse(self.source)
+        return self._statement
         
 class DDG_Edge:
     def __init__(self, src, dest,dependencies):
@@ -59,216 +64,239 @@ class Debugger:
 class _Parser:
     def __init__(self,tree):
         self.tree=tree
-        self.entry_point = None
-        self.functions = []
+        self.entry_point_node = None
+        self.function_nodes = []
+        self._entry_point = None
+        self._functions = None
         self.debugger=Debugger()
     #! extract functiona and entry point
     def extract_snippets(self,debug=False):
        for node in self.tree.body:
-        #! Get function source code, name and arguements and put them in a tuple
+        #! keep the AST nodes, the source text is only built when asked for
         if isinstance(node, ast.FunctionDef):
-            func_name = node.name
-            arguements = [arg.arg for arg in node.args.args]
-            func_code = ast.unparse(node)  
-            pattern = rf'def\s+{func_name}\s*\(.*?\):\s*\n'
-            func_code = re.sub(pattern, '', func_code)
-            func_code = textwrap.dedent(func_code)
-            self.functions.append((func_name,arguements,func_code))
+            self.function_nodes.append(node)
             if debug:
                 self.debugger.print_unparsed_function(node)
         elif isinstance(node, ast.If):
-            self.entry_point = ast.unparse(node)
-            self.entry_point = self.entry_point.replace("if __name__ == '__main__':", "")
-            self.entry_point=textwrap.dedent(self.entry_point)
+            self.entry_point_node = node
+            self._entry_point = None
             if debug:
                 self.debugger.print_entry_point(self.entry_point)
-#! to replace loop variables with _
-class ReplaceForTargetsWithUnderscore(ast.NodeTransformer):
-    def visit_For(self, node):
-        # Visit children first
+       self._functions = None
+    @property
+    def entry_point_body(self):
+        node = self.entry_point_node
+        if node is None:
+            return None
+        if ast.unparse(node.test) == "__name__ == '__main__'":
+            return node.body
+        return [node]
+    @property
+    def function_names(self):
+        return {node.name for node in self.function_nodes}
+    @property
+    def entry_point(self):
+        if self._entry_point is None and self.entry_point_node is not None:
+            entry_point = ast.unparse(self.entry_point_node)
+            entry_point = entry_point.replace("if __name__ == '__main__':", "")
+            self._entry_point = textwrap.dedent(entry_point)
+        return self._entry_point
+    @property
+    def functions(self):
+        #! (name, arguements, body source) tuples
+        if self._functions is None:
+            self._functions = []
+            for node in self.function_nodes:
+                func_name = node.name
+                arguements = [arg.arg for arg in node.args.args]
+                func_code = ast.unparse(node)
+                pattern = rf'def\s+{func_name}\s*\(.*?\):\s*\n'
+                func_code = re.sub(pattern, '', func_code)
+                func_code = textwrap.dedent(func_code)
+                self._functions.append((func_name,arguements,func_code))
+        return self._functions
+class DependencyVisitor(ast.NodeVisitor):
+    '''
+    collects the variables a top level statement defines (has) and reads (needs) in one walk.
+    loop targets are read as '_' inside their loop body, the tree itself is never modified.
+    '''
+    TOP = 'top'
+    NESTED = 'nested'
+    list_funcs = {'pop', 'append', 'sort', 'extend', 'reverse', 'insert', 'remove', 'clear'}
+    def __init__(self, is_global):
+        self.is_global = is_global
+        self.has = []
+        self.needs = []
+        #! (depth, name) of every variable read, in visiting order
+        self.loads = []
+        self.depth = 0
+        #! None for statements that are only scanned for the variables they read
+        self.mode = None
+        #! loop target name -> number of enclosing loop bodies binding it
+        self.bound_names = defaultdict(int)
+        #! > 0 while inside a loop whose nested loops bind their targets
+        self.loop_scope = 0
+    def visit(self, node):
+        self.depth += 1
+        super().visit(node)
+        self.depth -= 1
+    def loaded_names(self):
+        #! a stable sort by depth turns the depth first visiting order into ast.walk order
+        return [name for _, name in sorted(self.loads, key=lambda load: load[0])]
+    def visit_statement(self, node, mode):
+        previous, self.mode = self.mode, mode
+        self.visit(node)
+        self.mode = previous
+    def _name(self, node):
+        if self.bound_names.get(node.id):
+            return '_'
+        return node.id
+    def _add_has(self, var, check_global):
+        if not check_global or self.is_global(var):
+            self.has.append(var)
+    def generic_visit(self, node):
+        if isinstance(node, ast.stmt):
+            #! children of unhandled statements are not dependency roots
+            previous, self.mode = self.mode, None
+            super().generic_visit(node)
+            self.mode = previous
+        else:
+            super().generic_visit(node)
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self.loads.append((self.depth, self._name(node)))
+    def visit_Assign(self, node):
+        if self.mode:
+            check_global = self.mode == self.NESTED
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    self._add_has(target.id, check_global)
+                elif isinstance(target, ast.Subscript) and isinstance(target.value, ast.Name):
+                    self._add_has(self._name(target.value), check_global)
         self.generic_visit(node)
-
-        # Collect all variable names bound in target
-        bound_names = self._extract_names(node.target)
-
-        # Replace target with matching structure filled with '_'
-        node.target = self._underscore_target_like(node.target)
-
-        # Replace all uses of those names in the loop body with '_'
-        node.body = [self._replace_names_in_stmt(stmt, bound_names) for stmt in node.body]
-        return node
-
-    def _extract_names(self, target):
+    def visit_Expr(self, node):
+        call = node.value
+        if self.mode and isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute):
+            if call.func.attr in self.list_funcs and isinstance(call.func.value, ast.Name):
+                self._add_has(self._name(call.func.value), self.mode == self.NESTED)
+        self.generic_visit(node)
+    def visit_AugAssign(self, node):
+        if self.mode == self.NESTED:
+            target = node.target
+            if isinstance(target, ast.Name):
+                self.has.append(target.id)
+                self.needs.append(target.id)
+            elif isinstance(target, ast.Subscript) and isinstance(target.value, ast.Name):
+                self.has.append(self._name(target.value))
+        self.generic_visit(node)
+    def visit_Return(self, node):
+        if self.mode == self.TOP and isinstance(node.value, ast.Name):
+            self.needs.append(node.value.id)
+        self.generic_visit(node)
+    def visit_If(self, node):
+        if not self.mode:
+            return self.generic_visit(node)
+        self.visit(node.test)
+        for stmt in node.body + node.orelse:
+            self.visit_statement(stmt, self.NESTED)
+    def visit_For(self, node):
+        binds = bool(self.mode) or self.loop_scope > 0
+        child_mode = self.NESTED if self.mode else None
+        previous, self.mode = self.mode, None
+        self.loop_scope += binds
+        self.visit(node.target)
+        self.visit(node.iter)
+        names = self._target_names(node.target) if binds else ()
+        for name in names:
+            self.bound_names[name] += 1
+        for stmt in node.body:
+            self.visit_statement(stmt, child_mode)
+        for name in names:
+            self.bound_names[name] -= 1
+        for stmt in node.orelse:
+            self.visit_statement(stmt, child_mode)
+        self.loop_scope -= binds
+        self.mode = previous
+    def _target_names(self, target):
         if isinstance(target, ast.Name):
             return {target.id}
         elif isinstance(target, (ast.Tuple, ast.List)):
             names = set()
             for elt in target.elts:
-                names.update(self._extract_names(elt))
+                names.update(self._target_names(elt))
             return names
         return set()
-
-    def _underscore_target_like(self, target):
-        if isinstance(target, ast.Name):
-            return ast.Name(id='_', ctx=ast.Store())
-        elif isinstance(target, ast.Tuple):
-            return ast.Tuple(
-                elts=[self._underscore_target_like(e) for e in target.elts],
-                ctx=ast.Store()
-            )
-        elif isinstance(target, ast.List):
-            return ast.List(
-                elts=[self._underscore_target_like(e) for e in target.elts],
-                ctx=ast.Store()
-            )
-        return target  # fallback
-
-    def _replace_names_in_stmt(self, stmt, names_to_replace):
-        return ReplaceNamesWithUnderscore(names_to_replace).visit(stmt)
-
-class ReplaceNamesWithUnderscore(ast.NodeTransformer):
-    def __init__(self, names_to_replace):
-        self.names_to_replace = names_to_replace
-
-    def visit_Name(self, node):
-        if isinstance(node.ctx, ast.Load) and node.id in self.names_to_replace:
-            node.id = '_'
-        return node
 class DDG:
     def __init__(self):
         self.debugger=Debugger()
         self.edges=[]
-        self.nodes=[]      
-    #? TODO Handle Loops
+        self.nodes=[]
+        #! variable name -> line numbers of the nodes defining it (kept in sync with self.nodes)
+        self.definitions=defaultdict(list)
+    def _add_node(self,node):
+        self.nodes.append(node)
+        for var in node.has:
+            lines = self.definitions[var]
+            if not lines or lines[-1] != node.line_number:
+                lines.append(node.line_number)
     def extract_dependencies(self,snippet,functions,function=False,debug=False):
         #! handle the function tuple
+        header = None
         if function:
-            func_name=snippet[0]
-            arguements=snippet[1]
-            snippet=snippet[2]
+            header = (snippet[0], snippet[1])
+            snippet = snippet[2]
+        func_names = {name for name, _, _ in functions}
+        self.extract_dependencies_from_body(ast.parse(snippet).body, func_names, header, debug)
+    def extract_dependencies_from_body(self,body,func_names,header=None,debug=False):
+        '''
+        builds the graph nodes from already parsed statements.
+        header is the (name, arguements) of the function the body belongs to, None for the entry point.
+        '''
+        if header:
+            func_name, arguements = header
             #! add the function definition as a node
             node = DDG_Node(0,'def '+func_name+'('+','.join(arguements)+'):')
             node.has.extend(arguements)
-            self.nodes.append(node)
-            
-        sub_tree=ast.parse(snippet)
-        def check_var_is_global(nodes,var):
-            for node in nodes:
-                if var in node.has:
-                    return True 
-            return False
-        def parse_subscript(node, gnode, not_check_globals=True):
-            if isinstance(node, ast.Subscript):
-                if isinstance(node.value, ast.Name) and (not_check_globals or check_var_is_global(self.nodes,node.value.id)):
-                    gnode.has.append(node.value.id)
-        def parse_assign(node, gnode,not_check_globals=True):
-            for target in node.targets:
-                    if isinstance(target, ast.Name) and(not_check_globals or check_var_is_global(self.nodes,target.id)):
-                        gnode.has.append(target.id)
-                    elif isinstance(target, ast.Subscript):
-                        parse_subscript(target, gnode, not_check_globals)
-        def parse_Expr(node, gnode,not_check_globals=True):
-            list_funcs = ['pop', 'append', 'sort', 'extend', 'reverse', 'insert', 'remove', 'clear']
-                
-            call = node.value
-            if isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute):
-                func_name = call.func.attr  # e.g., 'extend'
-                if func_name in list_funcs:
-                    target = call.func.value
-                    if isinstance(target, ast.Name) and (not_check_globals or check_var_is_global(self.nodes,target.id)):
-                        var_name = target.id  # 'y'
-                        gnode.has.append(var_name)
-        def parse_aug_assign(node, gnode):
-            target = node.target
-            if isinstance(target, ast.Name):
-                gnode.has.append(target.id)
-                gnode.needs.append(target.id)
-            elif isinstance(target, ast.Subscript):
-                parse_subscript(target, gnode)
-                
-        def parse_if(node, gnode):
-            temp = set()
-            for subnode in ast.iter_child_nodes(node):
-                if isinstance(subnode, ast.Assign):
-                    for target in subnode.targets:
-                        parse_assign(subnode, gnode, not_check_globals=False)
-                #! handle in place operations
-                elif isinstance(subnode, ast.Expr):
-                    parse_Expr(subnode, gnode, not_check_globals=False)
-                elif isinstance(subnode, ast.AugAssign):
-                    parse_aug_assign(subnode, gnode)
-                elif isinstance(subnode, ast.For):
-                    parse_for_loop(subnode, gnode, self.nodes)
-                elif isinstance(subnode, ast.If):
-                    parse_if(subnode, gnode)
-                    
-            gnode.has.extend(temp)
-            del temp
-            gc.collect()
-        def parse_for_loop(node, gnode, all_nodes):
-            # Replace target(s) with underscores
-            ReplaceForTargetsWithUnderscore().visit(node)
-            ast.fix_missing_locations(node)
-
-            temp = set()
-            list_funcs = ['pop', 'append', 'sort', 'extend', 'reverse', 'insert', 'remove', 'clear']
-
-            for subnode in ast.iter_child_nodes(node):
-                    if isinstance(subnode, ast.Assign):
-                        for target in subnode.targets:
-                            parse_assign(subnode, gnode, not_check_globals=False)
-                    #! handle in place operations
-                    elif isinstance(subnode, ast.Expr):
-                        parse_Expr(subnode, gnode, not_check_globals=False)
-                    elif isinstance(subnode, ast.AugAssign):
-                        parse_aug_assign(subnode, gnode)
-                    elif isinstance(subnode,ast.For) and subnode != node:
-                        parse_for_loop(subnode, gnode, self.nodes)
-                    elif isinstance(subnode, ast.If):
-                        parse_if(subnode, gnode)
-            gnode.has.extend(temp)
-            del temp
-            gc.collect()
-        def parse_return(node, gnode):
-            if isinstance(node.value, ast.Name):
-                gnode.needs.append(node.value.id)
-        def parse_node(node,gnode,not_check_globals=True):
-            #! get variables being assigned to
-            if isinstance(node, ast.Assign):  
-                parse_assign(node, gnode,not_check_globals)
-            #! handle in place operations
-            elif isinstance(node, ast.Expr):
-                parse_Expr(node, gnode)
-            #! handle if conditions
-            elif isinstance(node, ast.If):
-                parse_if(node, gnode)
-            #! handle the function return statement
-            elif isinstance(node, ast.Return):
-                parse_return(node, gnode)
-            #! handle For loops
-            elif isinstance (node,ast.For):
-                parse_for_loop(node, gnode, self.nodes)
-                
-        def visit_has_needs(self, node,number):
-            #! create a new node
-            gnode = DDG_Node(number,ast.unparse(node))
-            parse_node(node, gnode)
-            #! Get variables used in the assignment
-            used_vars = {name.id for name in ast.walk(node) if isinstance(name, ast.Name) and isinstance(name.ctx, ast.Load) and name.id not in  ['_','enumerate','range','zip']and  check_var_is_global(self.nodes,name.id)}
-            func_names = [name for name, _, _ in functions]
-            used_vars = used_vars - set(func_names)  # Exclude function names from used_vars
-            gnode.needs.extend(used_vars)
+            self._add_node(node)
+        is_global = self.definitions.__contains__
+        ignored = {'_','enumerate','range','zip'}
+        for i, stmt in enumerate(body):
+            gnode = DDG_Node(i+1, source=stmt)
+            visitor = DependencyVisitor(is_global)
+            visitor.visit_statement(stmt, DependencyVisitor.TOP)
+            gnode.has = visitor.has
+            gnode.needs = visitor.needs
+            #! Get variables used in the statement, excluding function names
+            used_vars = {var for var in visitor.loaded_names() if var not in ignored and is_global(var)}
+            gnode.needs.extend(used_vars - func_names)
             if debug:
                 self.debugger.print_DDG_node(gnode)
-            self.nodes.append(gnode)
             gnode.has = list(set(gnode.has))  # Remove duplicates
-            gnode.has = [var for var in gnode.has if check_var_is_global(self.nodes,var)]  
             gnode.needs = list(set(gnode.needs))  # Remove duplicates
-            
-            
-        for i,node in enumerate(sub_tree.body):
-            visit_has_needs(self,node,i+1)
-            
+            self._add_node(gnode)
+
+    def to_cache_entry(self):
+        return {
+            'nodes': [[node.line_number, node.has, node.needs] for node in self.nodes],
+            'edges': [[edge.src, edge.dest, edge.dependencies] for edge in self.edges],
+        }
+    @classmethod
+    def from_cache_entry(cls,entry,body,header=None):
+        '''
+        rebuilds a graph saved with to_cache_entry, statement text still comes lazily from body.
+        '''
+        ddg = cls()
+        sources = {i+1: stmt for i, stmt in enumerate(body)}
+        for line_number, has, needs in entry['nodes']:
+            if line_number == 0 and header:
+                node = DDG_Node(0,'def '+header[0]+'('+','.join(header[1])+'):')
+            else:
+                node = DDG_Node(line_number, source=sources[line_number])
+            node.has = has
+            node.needs = needs
+            ddg._add_node(node)
+        ddg.edges = [DDG_Edge(src, dest, dependencies) for src, dest, dependencies in entry['edges']]
+        return ddg
     def construct_edges(self,debug=False):
         if not self.nodes:
             raise ValueError("No nodes to construct edges from. Please run 'extract_dependencies' first.")
@@ -291,6 +319,9 @@ class DDG:
     def visualize_graph(self):
         if not self.nodes:
             raise ValueError("No nodes or edges to visualize. Please run 'extract_dependencies' and 'construct_edges' first.")
+        #! plotting libraries are slow to import, only load them when a graph is drawn
+        import networkx as nx
+        import matplotlib.pyplot as plt
         G = nx.DiGraph()
         for node in self.nodes:
             G.add_node(node.line_number)
@@ -319,6 +350,8 @@ class DDG:
         node_data = [{'code line': node.line_number,'statement':node.statement, 'has': node.has, 'needs': node.needs} for node in self.nodes]
         edge_data = [{'Node': edge.dest, 'Depends on': edge.src,  'Dependency': edge.dependencies} for edge in self.edges]
 
+        from tabulate import tabulate
+        from termcolor import colored
         node_table = tabulate(node_data, headers="keys", tablefmt="fancy_grid")
         edge_table = tabulate(edge_data, headers="keys", tablefmt="fancy_grid")
 
@@ -344,26 +377,180 @@ class DDG:
 
         
         
+class Variable_Table:
+    '''
+    interns variable names to small integer ids, one table is shared by all graphs of a program.
+    '''
+    __slots__ = ('ids', 'names')
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+    def intern(self, name):
+        var_id = self.ids.get(name)
+        if var_id is None:
+            var_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return var_id
+    def __len__(self):
+        return len(self.names)
+class Compact_Node:
+    __slots__ = ('line_number', '_statement', 'source')
+    def __init__(self, line_number, statement=None, source=None):
+        self.line_number = line_number
+        self._statement = statement
+        self.source = source
+    @property
+    def statement(self):
+        if self._statement is None and self.source is not None:
+            self._statement = ast.unparse(self.source)
+        return self._statement
+class Compact_DDG:
+    '''
+    array backed form of a DDG. has/needs of node i are the slices [offsets[i]:offsets[i+1]] of flat
+    buffers of interned variable ids, incoming edges are stored the same way (CSR) grouped by destination
+    node in the order construct_edges created them, with the dependency ids of edge e in
+    dep_ids[dep_offsets[e]:dep_offsets[e+1]].
+    '''
+    __slots__ = ('variables', 'nodes', 'has_offsets', 'has_ids', 'needs_offsets', 'needs_ids',
+                 'in_offsets', 'in_src', 'dep_offsets', 'dep_ids')
+    def __init__(self, variables=None):
+        self.variables = variables if variables is not None else Variable_Table()
+        self.nodes = []
+        self.has_offsets = array('i', [0])
+        self.has_ids = array('i')
+        self.needs_offsets = array('i', [0])
+        self.needs_ids = array('i')
+        self.in_offsets = array('i', [0])
+        #! node index (not line number) of the source of every incoming edge
+        self.in_src = array('i')
+        self.dep_offsets = array('i', [0])
+        self.dep_ids = array('i')
+    @classmethod
+    def from_ddg(cls, ddg, variables=None):
+        graph = cls(variables)
+        intern = graph.variables.intern
+        index_of = {}
+        incoming = defaultdict(list)
+        for edge in ddg.edges:
+            incoming[edge.dest].append(edge)
+        for i, node in enumerate(ddg.nodes):
+            index_of[node.line_number] = i
+            graph.nodes.append(Compact_Node(node.line_number, node._statement, node.source))
+            graph.has_ids.extend(intern(var) for var in node.has)
+            graph.has_offsets.append(len(graph.has_ids))
+            graph.needs_ids.extend(intern(var) for var in node.needs)
+            graph.needs_offsets.append(len(graph.needs_ids))
+        for node in ddg.nodes:
+            for edge in incoming.pop(node.line_number, ()):
+                graph.in_src.append(index_of[edge.src])
+                graph.dep_ids.extend(intern(var) for var in edge.dependencies)
+                graph.dep_offsets.append(len(graph.dep_ids))
+            graph.in_offsets.append(len(graph.in_src))
+        return graph
+    def __len__(self):
+        return len(self.nodes)
+    def line_number(self, i):
+        return self.nodes[i].line_number
+    def statement(self, i):
+        return self.nodes[i].statement
+    def has(self, i):
+        names = self.variables.names
+        return [names[v] for v in self.has_ids[self.has_offsets[i]:self.has_offsets[i+1]]]
+    def needs(self, i):
+        names = self.variables.names
+        return [names[v] for v in self.needs_ids[self.needs_offsets[i]:self.needs_offsets[i+1]]]
+    def depends_on(self, i):
+        '''
+        (source line number, dependency names) of every edge ending at node i.
+        '''
+        names = self.variables.names
+        dep_offsets, dep_ids = self.dep_offsets, self.dep_ids
+        for e in range(self.in_offsets[i], self.in_offsets[i+1]):
+            yield self.nodes[self.in_src[e]].line_number, [names[v] for v in dep_ids[dep_offsets[e]:dep_offsets[e+1]]]
+    def save_to_json(self):
+        #! same documents as DDG.save_to_json
+        node_data = [{'code line': self.line_number(i),'statement':self.statement(i), 'has': self.has(i), 'needs': self.needs(i)} for i in range(len(self))]
+        edge_dict = {}
+        for i in range(len(self)):
+            depends_on = [{"Node": src, "Dependency": dependencies} for src, dependencies in self.depends_on(i)]
+            if depends_on:
+                edge_dict[self.line_number(i)] = {"Node": self.line_number(i), "Depends on": depends_on}
+        return json.dumps(node_data, indent=4), json.dumps(edge_dict, indent=4)
+    def nbytes(self):
+        '''
+        bytes held by the adjacency buffers and node records (statement text and ASTs excluded).
+        '''
+        buffers = (self.has_offsets, self.has_ids, self.needs_offsets, self.needs_ids,
+                   self.in_offsets, self.in_src, self.dep_offsets, self.dep_ids)
+        return (sum(sys.getsizeof(buffer) for buffer in buffers) + sys.getsizeof(self.nodes)
+                + sum(sys.getsizeof(node) for node in self.nodes))
+def build_ddg_entry(body,func_names,header=None):
+    '''
+    builds the graph of one body and returns it in cache entry form (runs in a worker process).
+    '''
+    ddg=DDG()
+    ddg.extract_dependencies_from_body(body,func_names,header)
+    ddg.construct_edges()
+    return ddg.to_cache_entry()
 class DDG_Wrapper:
     def __init__(self,tree):
         self.parser=_Parser(tree)
         self.parser.extract_snippets()
         #! index 0 is always the entry point else functions
         self.ddgs=[]
-    def build_ddgs(self):
-        if not self.parser.functions and not self.parser.entry_point:
+        self.variables=None
+        self._compact_ddgs=None
+    def build_ddgs(self,cache=None,executor=None):
+        if not self.parser.function_nodes and self.parser.entry_point_node is None:
             raise ValueError("No functions or entry points to extract dependencies from. Please run 'extract_snippets' first.")
-        if self.parser.entry_point:
-            ddg=DDG()
-            ddg.extract_dependencies(self.parser.entry_point,self.parser.functions)
-            ddg.construct_edges()
-            self.ddgs.append(ddg)
-        for function in self.parser.functions:
-            ddg=DDG()
-            ddg.extract_dependencies(function,self.parser.functions,function=True)
-            ddg.construct_edges()
-            self.ddgs.append(ddg)
+        func_names = self.parser.function_names
+        bodies = []
+        if self.parser.entry_point_node is not None:
+            bodies.append((self.parser.entry_point_body,None))
+        for function in self.parser.function_nodes:
+            header = (function.name, [arg.arg for arg in function.args.args])
+            bodies.append((function.body,header))
+        if executor is None:
+            for body,header in bodies:
+                self.ddgs.append(self._build_ddg(body,func_names,header,cache))
+            return
+        #! graphs are independent, misses are built on the executor and merged back in order
+        keys, entries, futures = [], [], {}
+        for index,(body,header) in enumerate(bodies):
+            key = cache.make_key('ddg', normalized_ast(body), header, sorted(func_names)) if cache is not None else None
+            entry = cache.get(key) if cache is not None else None
+            if entry is None:
+                futures[index] = executor.submit(build_ddg_entry,body,func_names,header)
+            keys.append(key)
+            entries.append(entry)
+        for index,(body,header) in enumerate(bodies):
+            if index in futures:
+                entries[index] = futures[index].result()
+                if cache is not None:
+                    cache.put(keys[index], entries[index])
+            self.ddgs.append(DDG.from_cache_entry(entries[index],body,header))
+    def _build_ddg(self,body,func_names,header,cache=None):
+        #! the graph only depends on the statements, the header and which names are user functions
+        key = None
+        if cache is not None:
+            key = cache.make_key('ddg', normalized_ast(body), header, sorted(func_names))
+            entry = cache.get(key)
+            if entry is not None:
+                return DDG.from_cache_entry(entry,body,header)
+        ddg=DDG()
+        ddg.extract_dependencies_from_body(body,func_names,header)
+        ddg.construct_edges()
+        if cache is not None:
+            cache.put(key, ddg.to_cache_entry())
+        return ddg
             
+    @property
+    def compact_ddgs(self):
+        #! array backed copies of self.ddgs sharing one variable table, built on first use
+        if self._compact_ddgs is None or len(self._compact_ddgs) != len(self.ddgs):
+            self.variables = Variable_Table()
+            self._compact_ddgs = [Compact_DDG.from_ddg(ddg, self.variables) for ddg in self.ddgs]
+        return self._compact_ddgs
     #! Visualize the graph (index=-1 for all graphs)
     def visualize_graph(self,index=-1):
         if index == -1:
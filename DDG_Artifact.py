@@ -0,0 +1,164 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+from DDG import Compact_DDG, Compact_Node, Variable_Table
+
+#! layout (little endian, every array is int32):
+#!   header      magic, version, graph count, variable count, string count
+#!   strings     offsets[string count + 1] then the utf-8 blob, variable names first then statements
+#!   directory   (offset, size) of every graph section
+#!   graph       node count, has count, needs count, edge count, dependency count, then the arrays
+#!               lines, statement ids, has offsets/ids, needs offsets/ids, in offsets, in src, dep offsets/ids
+MAGIC = b'DDGB'
+VERSION = 1
+HEADER = struct.Struct('<4sIIII')
+GRAPH_HEADER = struct.Struct('<IIIII')
+DIRECTORY_ENTRY = struct.Struct('<QQ')
+
+def _int_array(values):
+    buffer = array('i', values)
+    if sys.byteorder != 'little':
+        buffer.byteswap()
+    return buffer.tobytes()
+
+def _read_array(view, offset, count):
+    buffer = array('i')
+    buffer.frombytes(view[offset:offset + 4 * count])
+    if sys.byteorder != 'little':
+        buffer.byteswap()
+    return buffer, offset + 4 * count
+
+def write_artifact(path, graphs, variables):
+    '''
+    saves the compact graphs of a program (sharing the variables table) to a single binary file.
+    the text of every statement is written, nodes that were not read yet are unparsed here.
+    '''
+    strings = list(variables.names)
+    sections = []
+    for graph in graphs:
+        statement_ids = []
+        for node in graph.nodes:
+            statement_ids.append(len(strings))
+            strings.append(node.statement)
+        n_edges = len(graph.in_src)
+        sections.append(b''.join([
+            GRAPH_HEADER.pack(len(graph.nodes), len(graph.has_ids), len(graph.needs_ids), n_edges, len(graph.dep_ids)),
+            _int_array(node.line_number for node in graph.nodes),
+            _int_array(statement_ids),
+            _int_array(graph.has_offsets), _int_array(graph.has_ids),
+            _int_array(graph.needs_offsets), _int_array(graph.needs_ids),
+            _int_array(graph.in_offsets), _int_array(graph.in_src),
+            _int_array(graph.dep_offsets), _int_array(graph.dep_ids),
+        ]))
+    encoded = [string.encode('utf-8') for string in strings]
+    string_offsets = [0]
+    for data in encoded:
+        string_offsets.append(string_offsets[-1] + len(data))
+    string_table = _int_array(string_offsets) + b''.join(encoded)
+    offset = HEADER.size + len(string_table) + DIRECTORY_ENTRY.size * len(sections)
+    directory = []
+    for section in sections:
+        directory.append(DIRECTORY_ENTRY.pack(offset, len(section)))
+        offset += len(section)
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(graphs), len(variables), len(strings)))
+        f.write(string_table)
+        f.write(b''.join(directory))
+        for section in sections:
+            f.write(section)
+
+class DDG_Artifact:
+    '''
+    memory maps a file written by write_artifact, graphs are only decoded when they are asked for.
+    '''
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is empty, not a DDG artifact.")
+        magic, version, self.n_graphs, self.n_variables, self.n_strings = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a DDG artifact.")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"{path} has DDG artifact version {version}, expected {VERSION}.")
+        self._string_offsets, self._blob_start = _read_array(self._map, HEADER.size, self.n_strings + 1)
+        self._directory_start = self._blob_start + self._string_offsets[-1]
+        self._variables = None
+    def __len__(self):
+        return self.n_graphs
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        self.close()
+    def close(self):
+        self._map.close()
+        self._file.close()
+    def string(self, index):
+        start = self._blob_start + self._string_offsets[index]
+        end = self._blob_start + self._string_offsets[index + 1]
+        return self._map[start:end].decode('utf-8')
+    @property
+    def variables(self):
+        if self._variables is None:
+            self._variables = Variable_Table()
+            for index in range(self.n_variables):
+                self._variables.intern(self.string(index))
+        return self._variables
+    def graph(self, index):
+        '''
+        decodes graph index (0 is the entry point, then the functions in definition order).
+        '''
+        if not 0 <= index < self.n_graphs:
+            raise IndexError(f"graph {index} out of range, the artifact has {self.n_graphs} graphs.")
+        offset, _ = DIRECTORY_ENTRY.unpack_from(self._map, self._directory_start + index * DIRECTORY_ENTRY.size)
+        n_nodes, n_has, n_needs, n_edges, n_deps = GRAPH_HEADER.unpack_from(self._map, offset)
+        offset += GRAPH_HEADER.size
+        graph = Compact_DDG(self.variables)
+        lines, offset = _read_array(self._map, offset, n_nodes)
+        statement_ids, offset = _read_array(self._map, offset, n_nodes)
+        graph.has_offsets, offset = _read_array(self._map, offset, n_nodes + 1)
+        graph.has_ids, offset = _read_array(self._map, offset, n_has)
+        graph.needs_offsets, offset = _read_array(self._map, offset, n_nodes + 1)
+        graph.needs_ids, offset = _read_array(self._map, offset, n_needs)
+        graph.in_offsets, offset = _read_array(self._map, offset, n_nodes + 1)
+        graph.in_src, offset = _read_array(self._map, offset, n_edges)
+        graph.dep_offsets, offset = _read_array(self._map, offset, n_edges + 1)
+        graph.dep_ids, offset = _read_array(self._map, offset, n_deps)
+        graph.nodes = [Compact_Node(line, self.string(string_id)) for line, string_id in zip(lines, statement_ids)]
+        return graph
+    def graphs(self):
+        for index in range(self.n_graphs):
+            yield self.graph(index)
+    def export_json(self, folder):
+        '''
+        writes graph_N_nodes.json/graph_N_edges.json debug files for every graph, folder is created if needed.
+        '''
+        os.makedirs(folder, exist_ok=True)
+        for index, graph in enumerate(self.graphs()):
+            node_data, edge_data = graph.save_to_json()
+            with open(f"{folder}/graph_{index}_nodes.json", "w") as outfile:
+                outfile.write(node_data)
+            with open(f"{folder}/graph_{index}_edges.json", "w") as outfile:
+                outfile.write(edge_data)
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a binary DDG artifact.")
+    parser.add_argument('artifact', help='Path to the artifact (e.g. temp/ddg.bin).')
+    parser.add_argument('--json', metavar='FOLDER', help='Export every graph as graph_N_nodes/edges.json into FOLDER.')
+    args = parser.parse_args()
+    with DDG_Artifact(args.artifact) as artifact:
+        print(f"{args.artifact}: version {VERSION}, {len(artifact)} graphs, {artifact.n_variables} variables")
+        if args.json:
+            artifact.export_json(args.json)
+            print(f"JSON export written to {args.json}")
+
+if __name__ == "__main__":
+    main()
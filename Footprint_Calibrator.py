@@ -0,0 +1,293 @@
+from Memory_Estimator import cell_object_size, profile_data_file
+from Parallelizer import get_aggregation
+from Parsed_Program import Parsed_Program, is_main_guard, protected_lines
+import argparse
+import ast
+import itertools
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+#! data rows of the samples the functions run on, the largest one that finishes in time is the last
+CALIBRATION_ROWS = (50, 100, 200, 400)
+CALIBRATION_TIMEOUT = 60
+#! the simplest growth model within this relative error of every measurement is kept, lists over-allocate
+#! as they grow so a few percent is the step of the allocator, not a faster growth
+GROWTH_TOLERANCE = 0.05
+GROWTH_MODELS = (
+    ('constant', lambda n: [1.0]),
+    ('linear', lambda n: [1.0, n]),
+    ('n log n', lambda n: [1.0, n * math.log(n)]),
+    ('quadratic', lambda n: [1.0, n, n * n]),
+)
+MARK = '__calibration_mark__'
+
+def deep_size(value, seen=None):
+    '''
+    bytes of value and everything it holds (lists, tuples, sets, dicts), shared objects are counted once.
+    '''
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(deep_size(item, seen) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(deep_size(key, seen) + deep_size(item, seen) for key, item in value.items())
+    return cell_object_size(value)
+
+def call_sites(program):
+    '''
+    (index, statement, function name or None for a method call) of every assignment of a call
+    in the entry point, the call sites of get_memory_foortprint.
+    '''
+    sites = []
+    for i, node in enumerate(program.entry_point_body):
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Call):
+            func = node.value.func
+            if isinstance(func, ast.Attribute):
+                sites.append((i, node, None))
+            elif isinstance(func, ast.Name) and program.function(func.id) is not None:
+                sites.append((i, node, func.id))
+    return sites
+
+def call_site_key(program, index, node, func_name):
+    #! same keys as func_lines_footprint.json
+    if func_name is None:
+        return f"{ast.unparse(node)}#{index}:copy()"
+    _, fargs, _ = program.function(func_name)
+    return f"{ast.unparse(node)}#{index}:{func_name}({', '.join(fargs)})"
+
+def line_keys(program, func_name):
+    '''
+    keys of the lines of a function in func_lines_footprint.json, the aggregation is ('aggregation', "type:list").
+    '''
+    _, fargs, body = program.function(func_name)
+    keys = [f"def {func_name}({', '.join(fargs)}):"]
+    for node in body:
+        if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name) and node.targets[0].id == 'aggregation':
+            keys.append(('aggregation', get_aggregation(node) or ':'))
+        else:
+            keys.append(ast.unparse(node))
+    return keys
+
+class Line_Recorder:
+    '''
+    peak traced memory of every top level statement of the function being measured, above the
+    memory in use when it was called. the instrumented functions call mark before every statement.
+    '''
+    def __init__(self):
+        self.active = None
+    def start(self, func_name):
+        self.active = func_name
+        self.values = {}
+        self.current = None
+        self.base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    def mark(self, func_name, index):
+        if func_name != self.active:
+            return
+        self._close()
+        self.current = index
+    def _close(self):
+        if self.current is not None:
+            self.values[self.current] = max(tracemalloc.get_traced_memory()[1] - self.base, 0)
+        tracemalloc.reset_peak()
+    def stop(self):
+        self._close()
+        self.active = None
+        return self.values
+
+class Statement_Marker(ast.NodeTransformer):
+    #! MARK(name, i) before the i-th top level statement of every function
+    def visit_FunctionDef(self, node):
+        body = []
+        for index, statement in enumerate(node.body):
+            mark = ast.Expr(ast.Call(ast.Name(MARK, ast.Load()), [ast.Constant(node.name), ast.Constant(index)], []))
+            body += [ast.copy_location(mark, statement), statement]
+        node.body = body
+        return node
+
+def run_sample(program_path, data_path):
+    '''
+    runs the submission on data_path with instrumented functions (inside the worker process),
+    returns {call site key: {line key: bytes}}.
+    '''
+    program = Parsed_Program(program_path)
+    if program.error is not None:
+        raise ValueError(program.syntax_error)
+    module = ast.parse(program.source, program_path)
+    guard = next((node for node in module.body if isinstance(node, ast.If) and is_main_guard(node)), None)
+    if guard is None:
+        raise ValueError("No __main__ block found")
+    recorder = Line_Recorder()
+    namespace = {'__name__': '__calibration__', MARK: recorder.mark}
+    definitions = ast.Module(body=[Statement_Marker().visit(node) for node in module.body if node is not guard], type_ignores=[])
+    exec(compile(ast.fix_missing_locations(definitions), program_path, 'exec'), namespace)
+    namespace['FILE_NAME'] = data_path
+    #! the data loading block is the protected code of the main block before the entry point
+    spans = protected_lines(program.source)
+    protected = [any(first <= node.lineno and node.end_lineno <= last for first, last in spans) for node in guard.body]
+    first_entry = next((i for i, is_protected in enumerate(protected) if not is_protected), len(guard.body))
+    exec(compile(ast.Module(body=guard.body[:first_entry], type_ignores=[]), program_path, 'exec'), namespace)
+
+    sites = {index: (node, func_name) for index, node, func_name in call_sites(program)}
+    results = {}
+    tracemalloc.start()
+    try:
+        for index, node in enumerate(program.entry_point_body):
+            if index not in sites:
+                exec(compile(ast.Module(body=[node], type_ignores=[]), program_path, 'exec'), namespace)
+                continue
+            node, func_name = sites[index]
+            key = call_site_key(program, index, node, func_name)
+            target = node.targets[0].id
+            if func_name is None:
+                exec(compile(ast.Module(body=[node], type_ignores=[]), program_path, 'exec'), namespace)
+                results[key] = {f"return {node.value.func.value.id}.copy()": deep_size(namespace[target])}
+                continue
+            args = [eval(compile(ast.Expression(arg), program_path, 'eval'), namespace) for arg in node.value.args]
+            args_size = deep_size(args) - sys.getsizeof(args)
+            recorder.start(func_name)
+            namespace[target] = namespace[func_name](*args)
+            values = recorder.stop()
+            keys = line_keys(program, func_name)
+            lines = {keys[0]: args_size}
+            previous = args_size
+            for i, line_key in enumerate(keys[1:]):
+                if isinstance(line_key, tuple):
+                    lines[line_key[0]] = line_key[1]
+                    continue
+                #! statements after an early return keep the last measurement
+                previous = args_size + values[i] if i in values else previous
+                lines[line_key] = previous
+            if keys[-1].startswith('return '):
+                #! the returned value is handed over as a copy, alive with everything else
+                lines[keys[-1]] += deep_size(namespace[target])
+            results[key] = lines
+    finally:
+        tracemalloc.stop()
+    return results
+
+def write_sample(data_path, sample_path, rows):
+    '''
+    header and the first rows data rows of data_path, starting over when the file has fewer.
+    '''
+    with open(data_path, 'r', newline='') as f:
+        header = f.readline()
+        lines = list(itertools.islice(f, rows))
+    lines = [line if line.endswith('\n') else line + '\n' for line in lines]
+    with open(sample_path, 'w', newline='') as f:
+        f.write(header if header.endswith('\n') else header + '\n')
+        if lines:
+            f.writelines(itertools.islice(itertools.cycle(lines), rows))
+
+def fit_growth(sizes, values):
+    '''
+    (model name, coefficients, largest relative error) of the simplest GROWTH_MODELS within
+    GROWTH_TOLERANCE of every (size, value), the closest one when none is.
+    '''
+    import numpy as np
+    best = None
+    for name, basis in GROWTH_MODELS:
+        if len(basis(1)) > len(sizes):
+            break
+        design = np.array([basis(size) for size in sizes])
+        coefficients = np.linalg.lstsq(design, np.array(values, dtype=float), rcond=None)[0]
+        error = max(abs(float(design[i] @ coefficients) - value) / max(abs(value), 1) for i, value in enumerate(values))
+        if best is None or error < best[2]:
+            best = (name, [float(c) for c in coefficients], error)
+        if error <= GROWTH_TOLERANCE:
+            return name, [float(c) for c in coefficients], error
+    return best
+
+def growth_value(model, coefficients, rows):
+    basis = dict(GROWTH_MODELS)[model]
+    return max(int(round(sum(c * b for c, b in zip(coefficients, basis(rows))))), 0)
+
+def calibrate(program, sizes=CALIBRATION_ROWS, timeout=CALIBRATION_TIMEOUT, rows=None):
+    '''
+    measured func_lines_footprint of program (a Parsed_Program) for a data file of rows data rows
+    (the data file's own by default), and the report of the calibration.
+    every sample runs in a subprocess killed after timeout seconds, larger samples are not tried once one failed.
+    '''
+    data_path = program.file_name
+    if rows is None:
+        rows = max(profile_data_file(data_path)['rows'] - 1, 1)
+    measured = {}
+    failures = {}
+    with tempfile.TemporaryDirectory(prefix='calibration_') as folder:
+        for size in sorted(sizes):
+            sample_path = os.path.join(folder, f"sample_{size}.csv")
+            result_path = os.path.join(folder, f"result_{size}.json")
+            write_sample(data_path, sample_path, size)
+            command = [sys.executable, os.path.abspath(__file__), '--worker', os.path.abspath(program.file_path), sample_path, result_path]
+            try:
+                completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                failures[size] = f"timed out after {timeout}s"
+                break
+            if completed.returncode != 0:
+                failures[size] = (completed.stderr.strip().splitlines() or ['failed'])[-1]
+                break
+            with open(result_path, 'r') as f:
+                measured[size] = json.load(f)
+    if not measured:
+        raise RuntimeError(f"No sample could be measured: {failures}")
+    sizes = sorted(measured)
+    footprint = {}
+    lines_report = {}
+    for call, lines in measured[sizes[0]].items():
+        footprint[call] = {}
+        lines_report[call] = {}
+        for line, value in lines.items():
+            if isinstance(value, str):
+                footprint[call][line] = value
+                continue
+            values = [measured[size][call][line] for size in sizes]
+            model, coefficients, error = fit_growth(sizes, values)
+            footprint[call][line] = growth_value(model, coefficients, rows)
+            lines_report[call][line] = {'measured': values, 'model': model, 'coefficients': coefficients, 'error': error,
+                                        'estimate': footprint[call][line]}
+    report = {'file': program.file_path, 'data_file': data_path, 'rows': rows, 'sample_rows': sizes,
+              'failures': failures, 'lines': lines_report}
+    return footprint, report
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == '--worker':
+        _, _, program_path, sample_path, result_path = sys.argv
+        results = run_sample(program_path, sample_path)
+        with open(result_path, 'w') as f:
+            json.dump(results, f)
+        return
+    parser = argparse.ArgumentParser(description="Measure the memory footprint of every line of every function call on samples of the data file.")
+    parser.add_argument('filename', help='Path to the submission to calibrate.')
+    parser.add_argument('--sample-rows', type=int, nargs='+', default=list(CALIBRATION_ROWS), help='Data rows of the samples the functions run on.')
+    parser.add_argument('--timeout', type=float, default=CALIBRATION_TIMEOUT, help='Seconds a sample may run before it is stopped.')
+    parser.add_argument('--rows', type=int, help='Data rows the footprints are extrapolated to (default: the rows of the data file).')
+    parser.add_argument('--out', default=os.path.join('temp', 'memory_parsed'), help='Folder of func_lines_footprint_calibrated.json and calibration.json.')
+    args = parser.parse_args()
+
+    program = Parsed_Program(args.filename)
+    if program.error is not None:
+        parser.exit(1, f"{program.syntax_error}\n")
+    try:
+        footprint, report = calibrate(program, args.sample_rows, args.timeout, args.rows)
+    except RuntimeError as e:
+        parser.exit(1, f"{e}\n")
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, 'func_lines_footprint_calibrated.json'), 'w') as f:
+        json.dump(footprint, f, indent=4)
+    with open(os.path.join(args.out, 'calibration.json'), 'w') as f:
+        json.dump(report, f, indent=4)
+    print(f"Calibrated on {report['sample_rows']} data rows, extrapolated to {report['rows']}.")
+    for size, reason in report['failures'].items():
+        print(f"  sample of {size} rows failed: {reason}")
+    print(f"Written to {os.path.join(args.out, 'func_lines_footprint_calibrated.json')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import bisect
+import json
+from collections.abc import Mapping
+
+#! on disk every statement is written once and every line only lists the variables it changed:
+#!   {"statements": [text, ...], "changes": {"<line id>": {var: {"length": l, "size": s} or null when removed}}}
+#! line ids are positions in statements, the variables alive before the first line are changes of line 0
+
+class Live_Vars(Mapping):
+    '''
+    (length, size) of the variables alive before every recorded statement of the entry point, kept as the
+    changes of every line. statements are interned: the id of a statement is the line it was recorded at
+    (the last one when the same text is recorded twice). a variable at a line is a bisection of its history
+    and the total size of every line is kept, so one variable or the sum of a line is read in O(log n)
+    without building the line. as a mapping it is statement -> {var: {'length', 'size'}}, the old per-line
+    snapshots of main_lines_footprint.json.
+    '''
+    def __init__(self, initial=None):
+        self.statements = []  #! text of every recorded line, by line id
+        self.ids = {}  #! statement text -> line id
+        self.changes = []  #! per line id: {var: (length, size), None when removed}
+        self._history = {}  #! var -> (line ids, values) in the order they were recorded
+        self._totals = []  #! size of all the variables alive at every line
+        self._current = {}
+        self._pending = {}
+        self._total = 0
+        for var, value in (initial or {}).items():
+            self.set(var, value)
+    def set(self, var, value):
+        '''
+        var takes value (length, size, ...) from the next recorded line on.
+        '''
+        value = (value[0], value[1])
+        self._total += value[1] - self._current.get(var, (0, 0))[1]
+        self._current[var] = self._pending[var] = value
+    def remove(self, var):
+        if var in self._current:
+            self._total -= self._current.pop(var)[1]
+            self._pending[var] = None
+    def record(self, statement):
+        '''
+        records the variables alive before statement, only the ones that changed since the last line are stored.
+        returns the id of the line.
+        '''
+        line = len(self.statements)
+        self.statements.append(statement)
+        self.ids[statement] = line
+        for var, value in self._pending.items():
+            ids, values = self._history.setdefault(var, ([], []))
+            ids.append(line)
+            values.append(value)
+        self.changes.append(self._pending)
+        self._totals.append(self._total)
+        self._pending = {}
+        return line
+    def _value(self, line, var):
+        history = self._history.get(var)
+        if history is None:
+            return None
+        i = bisect.bisect_right(history[0], line) - 1
+        return history[1][i] if i >= 0 else None
+    def value(self, statement, var):
+        '''
+        {'length', 'size'} of var before statement, None when it is not alive there or statement was not recorded.
+        '''
+        line = self.ids.get(statement)
+        value = None if line is None else self._value(line, var)
+        return None if value is None else {'length': value[0], 'size': value[1]}
+    def size(self, statement, var):
+        line = self.ids.get(statement)
+        value = None if line is None else self._value(line, var)
+        return 0 if value is None else value[1]
+    def total_size(self, statement):
+        '''
+        size of every variable alive before statement, 0 when it was not recorded.
+        '''
+        line = self.ids.get(statement)
+        return 0 if line is None else self._totals[line]
+    def snapshot(self, line):
+        '''
+        {var: {'length', 'size'}} of every variable alive at a line id.
+        '''
+        values = ((var, self._value(line, var)) for var in self._history)
+        return {var: {'length': value[0], 'size': value[1]} for var, value in values if value is not None}
+    def __getitem__(self, statement):
+        return self.snapshot(self.ids[statement])
+    def __iter__(self):
+        return iter(self.ids)
+    def __len__(self):
+        return len(self.ids)
+    def to_json(self):
+        changes = {}
+        for line, line_changes in enumerate(self.changes):
+            if line_changes:
+                changes[str(line)] = {var: None if value is None else {'length': value[0], 'size': value[1]}
+                                      for var, value in line_changes.items()}
+        return {'statements': self.statements, 'changes': changes}
+    @classmethod
+    def from_json(cls, data):
+        '''
+        Live_Vars of a to_json() dict, or of the per-line snapshots {statement: {var: {'length', 'size'}}}
+        older main_lines_footprint.json files hold.
+        '''
+        live_vars = cls()
+        if isinstance(data.get('statements'), list) and isinstance(data.get('changes'), dict):
+            for line, statement in enumerate(data['statements']):
+                for var, value in data['changes'].get(str(line), {}).items():
+                    if value is None:
+                        live_vars.remove(var)
+                    else:
+                        live_vars.set(var, (value['length'], value['size']))
+                live_vars.record(statement)
+            return live_vars
+        previous = {}
+        for statement, line_vars in data.items():
+            for var in previous.keys() - line_vars.keys():
+                live_vars.remove(var)
+            for var, value in line_vars.items():
+                if previous.get(var) != value:
+                    live_vars.set(var, (value['length'], value['size']))
+            previous = line_vars
+            live_vars.record(statement)
+        return live_vars
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_json(), f, indent=4)
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            return cls.from_json(json.load(f))
+
+def as_live_vars(data):
+    '''
+    data when it is a Live_Vars already, else Live_Vars.from_json(data).
+    '''
+    return data if isinstance(data, Live_Vars) else Live_Vars.from_json(data)
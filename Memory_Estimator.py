@@ -1,12 +1,14 @@
 import ast
-import string
 import sys
 import math
 import enum
 import os
+import csv
+import mmap
+import operator
+from statistics import NormalDist
 from copy import deepcopy
-import re
-import random
+from collections import ChainMap
 class Primitives_Estimator:
     def __init__(self):
         pass
@@ -142,6 +144,266 @@ class InsertToAppend(ast.NodeTransformer):
             # Keep only the second argument (the value to insert)
             node.args = [node.args[1]]
         return node
+def _plain_index(node):
+    #! an index without brackets of its own (no nested subscript or list display)
+    return not any(isinstance(child, (ast.Subscript, ast.List, ast.ListComp)) for child in ast.walk(node))
+class FlattenSubscriptTransformer(ast.NodeTransformer):
+    #! assumption deal with multilevel indexing as first level only: x[i][j] --> x[i]
+    def visit_Subscript(self, node):
+        self.generic_visit(node)
+        inner = node.value
+        if isinstance(inner, ast.Subscript) and _plain_index(inner.slice) and _plain_index(node.slice):
+            inner.ctx = node.ctx
+            return inner
+        return node
+class ElementMethodToListTransformer(ast.NodeTransformer):
+    #! x[i].append() --> x.append()
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        func = node.func
+        if isinstance(func, ast.Attribute):
+            while isinstance(func.value, ast.Subscript) and _plain_index(func.value.slice):
+                func.value = func.value.value
+        return node
+class LenToConstantTransformer(ast.NodeTransformer):
+    '''
+    len(x) --> length(x) and len(x[0]) --> element_length(x), both get the name of x and return None
+    when it is not known (the call is then left as it is). modified is set when a call was replaced.
+    '''
+    def __init__(self, vars, length, element_length):
+        self.vars = vars
+        self.length = length
+        self.element_length = element_length
+        self.modified = False
+    def _var(self, var_name):
+        if var_name not in self.vars:
+            raise ValueError(f"Variable {var_name} not found in local parser variables.")
+        return var_name
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if not (isinstance(node.func, ast.Name) and node.func.id == 'len' and len(node.args) == 1):
+            return node
+        arg = node.args[0]
+        if isinstance(arg, ast.Name):
+            length = self.length(self._var(arg.id))
+        elif (isinstance(arg, ast.Subscript) and isinstance(arg.value, ast.Name) and isinstance(arg.slice, ast.Constant)
+              and type(arg.slice.value) is int and arg.slice.value >= 0):
+            length = self.element_length(self._var(arg.value.id))
+        else:
+            return node
+        if length is None:
+            return node
+        self.modified = True
+        return ast.copy_location(ast.Constant(value=length), node)
+def simplify_statement(node):
+    '''
+    copy of a statement in the form the estimator handles: augmented assignments as assignments,
+    multilevel indexing as first level and methods of an element (x[i].append()) as methods of the list.
+    '''
+    node = deepcopy(node)
+    for transformer in (AugAssignToAssignTransformer(), FlattenSubscriptTransformer(), ElementMethodToListTransformer()):
+        node = transformer.visit(node)
+    return ast.fix_missing_locations(node)
+#! files up to this size are profiled without numpy (importing it costs more than the scan)
+SMALL_DATA_FILE = 1024 * 1024
+DATA_FILE_CHUNK = 16 * 1024 * 1024
+def _length_bucket(bit_length):
+    #! rows of bit_length b have 2**(b-1) to 2**b - 1 bytes
+    return '0' if bit_length == 0 else f"{2 ** (bit_length - 1)}-{2 ** bit_length - 1}"
+def profile_data_file(file_path, chunk_size=DATA_FILE_CHUNK):
+    '''
+    one pass over the memory mapped file: size, rows, comma delimited columns of the first row
+    and a histogram of the row lengths in bytes (without the newline) by power of two buckets.
+    '''
+    size = os.path.getsize(file_path)
+    profile = {'size': size, 'rows': 0, 'columns': 0, 'row_length_histogram': {}}
+    if size == 0:
+        return profile
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        end = buffer.find(b'\n')
+        first_line = buffer[:end if end != -1 else size].decode('utf-8', errors='ignore')
+        if first_line.strip():
+            profile['columns'] = len(next(csv.reader([first_line])))
+        if size <= SMALL_DATA_FILE:
+            lines = buffer[:].split(b'\n')
+            if lines[-1] == b'':
+                lines.pop()  #! the file ends with a newline
+            counts = {}
+            for line in lines:
+                counts[len(line).bit_length()] = counts.get(len(line).bit_length(), 0) + 1
+            rows = len(lines)
+        else:
+            import numpy as np
+            counts = np.zeros(64, dtype=np.int64)
+            rows = 0
+            previous = -1  #! offset of the last newline seen
+            for start in range(0, size, chunk_size):
+                chunk = np.frombuffer(buffer, dtype=np.uint8, count=min(chunk_size, size - start), offset=start)
+                newlines = np.flatnonzero(chunk == 10) + start
+                del chunk  #! the mmap cannot be closed while a view on it is alive
+                if len(newlines) == 0:
+                    continue
+                lengths = np.diff(newlines, prepend=previous) - 1
+                counts += np.bincount(np.frexp(lengths)[1], minlength=64)[:64]
+                rows += len(newlines)
+                previous = int(newlines[-1])
+            if previous != size - 1:
+                #! last row without a newline
+                counts[(size - previous - 1).bit_length()] += 1
+                rows += 1
+            counts = {bit_length: int(count) for bit_length, count in enumerate(counts) if count}
+    profile['rows'] = rows
+    profile['row_length_histogram'] = {_length_bucket(bit_length): counts[bit_length] for bit_length in sorted(counts)}
+    return profile
+#! rows read by sample_data_file and the confidence of the size bound the scheduler gets
+DATA_SAMPLE_ROWS = 1000
+DATA_SIZE_CONFIDENCE = 0.99
+def infer_cell_type(value):
+    #! same as infer_type of the data loading block
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return value.strip()
+def cell_object_size(value):
+    #! small ints and one character strings are shared by the interpreter, a cell holding one costs no object
+    if type(value) is int and -5 <= value <= 256:
+        return 0
+    if type(value) is str and (value == '' or (len(value) == 1 and ord(value) < 256)):
+        return 0
+    return sys.getsizeof(value)
+def _sample_row_starts(buffer, start, size, sample_rows, rows):
+    '''
+    offsets of the rows starting after sample_rows evenly spaced points of buffer[start:size] (rows rows),
+    every row when there are not more rows than that.
+    the row after a point is taken rather than the one containing it, so long rows are not favoured.
+    '''
+    starts = []
+    if rows <= sample_rows:
+        while start < size:
+            starts.append(start)
+            newline = buffer.find(b'\n', start)
+            start = size if newline == -1 else newline + 1
+        return starts
+    span = size - start
+    for k in range(sample_rows):
+        point = start + k * span // sample_rows
+        if point > start:
+            newline = buffer.find(b'\n', point - 1)
+            if newline == -1 or newline + 1 >= size:
+                continue
+            point = newline + 1
+        if not starts or starts[-1] != point:
+            starts.append(point)
+    return starts
+def _row_size(line):
+    row = [infer_cell_type(cell) for cell in line.strip().split(',')]
+    return sys.getsizeof(row) + sum(cell_object_size(cell) for cell in row), row
+def sample_data_file(file_path, sample_rows=DATA_SAMPLE_ROWS, confidence=DATA_SIZE_CONFIDENCE, profile=None):
+    '''
+    size model of the list the data loading block builds ([[infer_type(cell) for cell in line.strip().split(',')] ...]).
+    the header row is measured, sample_rows rows spread evenly through the rest of the file give the mean and spread
+    of a row (list plus cell objects), extrapolated to every row with a one sided upper bound at confidence.
+    profile is the profile_data_file() of the file when it is already known.
+    '''
+    if not 0 < confidence < 1:
+        raise ValueError(f"Confidence must be between 0 and 1, got {confidence}.")
+    profile = profile if profile is not None else profile_data_file(file_path)
+    rows, size = profile['rows'], profile['size']
+    estimator = Primitives_Estimator()
+    model = {'rows': rows, 'sampled_rows': 0, 'confidence': confidence, 'header_bytes': 0, 'row_bytes_mean': 0.0,
+             'row_bytes_std': 0.0, 'list_bytes': estimator.estimate_list_size(rows), 'columns': []}
+    if rows:
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            header_end = buffer.find(b'\n')
+            header_end = size if header_end == -1 else header_end
+            model['header_bytes'], _ = _row_size(buffer[:header_end].decode('utf-8', errors='replace'))
+            row_sizes = []
+            columns = []
+            for start in _sample_row_starts(buffer, header_end + 1, size, sample_rows, rows - 1):
+                end = buffer.find(b'\n', start)
+                row_size, row = _row_size(buffer[start:end if end != -1 else size].decode('utf-8', errors='replace'))
+                row_sizes.append(row_size)
+                for index, cell in enumerate(row):
+                    if index == len(columns):
+                        columns.append({'int': 0, 'float': 0, 'str': 0, 'bytes': 0})
+                    columns[index][type(cell).__name__] += 1
+                    columns[index]['bytes'] += cell_object_size(cell)
+        n = len(row_sizes)
+        if n:
+            mean = sum(row_sizes) / n
+            std = (sum((row_size - mean) ** 2 for row_size in row_sizes) / (n - 1)) ** 0.5 if n > 1 else 0.0
+            model.update(sampled_rows=n, row_bytes_mean=mean, row_bytes_std=std)
+        model['columns'] = [{'int': column['int'], 'float': column['float'], 'str': column['str'],
+                             'mean_bytes': column['bytes'] / max(column['int'] + column['float'] + column['str'], 1)}
+                            for column in columns]
+    n, others = model['sampled_rows'], max(rows - 1, 0)
+    estimate = model['list_bytes'] + model['header_bytes'] + others * model['row_bytes_mean']
+    margin = 0.0
+    if n and others > n:
+        #! standard error of the mean with the finite population correction
+        standard_error = model['row_bytes_std'] / n ** 0.5 * ((others - n) / (others - 1)) ** 0.5
+        margin = others * NormalDist().inv_cdf(confidence) * standard_error
+    model['estimate'] = int(estimate)
+    model['upper_bound'] = int(math.ceil(estimate + margin))
+    return model
+def scaled_data_size(model, rows, columns):
+    '''
+    upper bound of the loaded list for a file of rows rows and columns columns shaped like the one model
+    (sample_data_file()) was measured on. every column more or less is a pointer and a mean cell object,
+    the header and the margin of a row scale with the number of columns.
+    '''
+    measured_columns = max(len(model['columns']), 1)
+    cell_bytes = sum(column['mean_bytes'] for column in model['columns']) / measured_columns
+    scale = columns / measured_columns
+    row_bytes = model['row_bytes_mean'] + (columns - measured_columns) * (cell_bytes + 8)
+    margin = 0.0
+    if model['sampled_rows']:
+        margin = NormalDist().inv_cdf(model['confidence']) * model['row_bytes_std'] / model['sampled_rows'] ** 0.5 * scale
+    size = Primitives_Estimator().estimate_list_size(rows) + model['header_bytes'] * scale + max(rows - 1, 0) * (row_bytes + margin)
+    return int(math.ceil(size))
+INT_OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.FloorDiv: operator.floordiv,
+                 ast.Mod: operator.mod, ast.Pow: operator.pow}
+#! builtins returning a number whatever they get
+SCALAR_FUNCTIONS = {'int', 'float', 'bool', 'abs', 'round', 'len', 'sum', 'pow', 'ord', 'hash'}
+def merge_shapes(first, second):
+    #! shape of a list holding elements of both shapes, None for the dimensions they disagree on
+    if first is None or second is None or len(first) != len(second):
+        return None
+    return tuple(a if a == b else None for a, b in zip(first, second))
+class Sized_String:
+    '''
+    stands for an ascii string of length characters (e.g. the x in x.append(data[i])), nothing is built
+    to measure it.
+    '''
+    def __init__(self, length):
+        self.length = max(length, 0)
+    def size(self):
+        return sys.getsizeof('') + self.length
+def insertion_size(size, element_size, count=1):
+    '''
+    size of a list after count insertions of element_size bytes in closed form, every insertion
+    averages the running total with the element (size = (size + element_size) // 2).
+    '''
+    if count <= 0:
+        return size
+    #! once 2 ** count is above the distance to element_size the result no longer changes
+    count = min(count, abs(size - element_size).bit_length() + 1)
+    scale = 1 << count
+    return (size + element_size * (scale - 1)) // scale
+def removal_size(length, size, count=1):
+    '''
+    (length, size) of a list after count removals in closed form, every removal takes the mean
+    element size (size // length) off. count must not be above length.
+    '''
+    #! size = quotient * length + remainder, removals take quotient off until length reaches remainder
+    quotient, remainder = divmod(size, length)
+    length -= count
+    if length > remainder:
+        return length, quotient * length + remainder
+    return length, (quotient + 1) * length
 class Memory_Parser:
     transformer = VariableToConstantTransformer()
     transformer2 = ConstantListToNamesTransformer()
@@ -153,6 +415,10 @@ class Memory_Parser:
     def __init__(self):
         self.primitives_estimator = Primitives_Estimator()
         self.vars = {}  #! varibles parsed so far (name: (value, memory, type))
+        self.data_profile = None  #! profile_data_file() of the data file once _file_handler ran
+        self.data_model = None  #! sample_data_file() of the data file when it was sampled
+        self.shapes = {}  #! dimensions of nested lists (name: (rows, columns, ...)), None where one is not known
+        self.unresolved = []  #! loops and lengths whose size is not known, counted once
         self.funcs = {'int':('int',0), 'str':('str',0), 'float':('float',0), 'bool':('bool',0), 'bytes':('bytes',0), 'bytearray':('bytearray',0), 'complex':('complex',0)
                       ,'list':('list',0)}  #! functions parsed so far (name: (type, memory))
         self.primitives=['int','str','float','bool','bytes','bytearray','complex','unk']  #! primitive types  
@@ -162,52 +428,186 @@ class Memory_Parser:
         '''
         self.vars = {}
     def conv_len_assignment(self,tree):
-        #! for x = len(var) case
-        code = ast.unparse(tree)
-        pattern = r"len\((\w+)\)"
-        match = re.search(pattern, code)
-        if match:
-            var_name = match.group(1)
-            if var_name in self.vars:
-                length = self.vars[var_name][0] if self.vars[var_name][2] == 'list' else 420
-                modified_code = re.sub(pattern, str(length), code)
-                # print(f"Modified code: {modified_code}")  # Debugging: print the modified code
-                tree = ast.parse(modified_code).body[0]  
-                return tree
-            else:
-                raise ValueError(f"Variable {var_name} not found in local parser variables.")  
-        #! for x = len(var[i])
-        pattern = r"len\((\w+\[\d+\])\)" 
-        match = re.search(pattern, code)
-        if match:
-            full_index_expr = match.group(1)  # e.g., numeric_data[0]
-            var_name = full_index_expr.split('[')[0]  # Extract base variable name, e.g., numeric_data
-            if var_name in self.vars:
-                length = str(self.vars[var_name][0] if self.vars[var_name][2] == 'list' else 420)  # Convert to string
-                # Replace only the matched part
-                modified_code = code[:match.start()] + str(length) + code[match.end():]
-                # print(f"Modified code: {modified_code}")  # Debugging: print the modified code
-                tree = ast.parse(modified_code).body[0]
-                return tree
-            else:
-                raise ValueError(f"Variable {var_name} not found in local parser variables.")
-        return tree  # Return the original tree if no match is found
+        #! for x = len(var) and x = len(var[i]) cases, tree is modified in place
+        tree = LenToConstantTransformer(self.vars, self._length, self._element_length).visit(tree)
+        return ast.fix_missing_locations(tree)
+    def _shape(self, name):
+        '''
+        dimensions of the nested lists in name, outermost first (None for one that is not known),
+        None when name is not a list. the outermost one of a list is its length.
+        '''
+        shape = self.shapes.get(name)
+        if name in self.vars and self.vars[name][2] == 'list':
+            return (self.vars[name][0],) + (shape[1:] if shape else (None,))
+        return shape
+    def _length(self, name):
+        shape = self._shape(name)
+        return shape[0] if shape else None
+    def _element_length(self, name):
+        shape = self._shape(name)
+        return shape[1] if shape and len(shape) > 1 else None
+    def _int_value(self, node):
+        '''
+        value of an integer expression of constants, integer variables and len(), None when it is not known.
+        '''
+        if isinstance(node, ast.Constant):
+            return node.value if type(node.value) is int else None
+        if isinstance(node, ast.Name):
+            if node.id not in self.vars:
+                raise ValueError(f"Variable '{node.id}' is not defined syntax error.")
+            value, _, var_type = self.vars[node.id]
+            return value if var_type == 'int' and type(value) is int else None
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            value = self._int_value(node.operand)
+            return None if value is None else -value
+        if isinstance(node, ast.BinOp) and type(node.op) in INT_OPERATORS:
+            left, right = self._int_value(node.left), self._int_value(node.right)
+            if left is None or right is None:
+                return None
+            try:
+                return INT_OPERATORS[type(node.op)](left, right)
+            except (ZeroDivisionError, ValueError):
+                return None
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'len' and len(node.args) == 1:
+            return self._trip_count(node.args[0])
+        return None
+    def _trip_count(self, node):
+        '''
+        number of items of the iterable node (range, enumerate, zip, a list or a slice of one), None when it is not known.
+        '''
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            if node.func.id == 'range' and 1 <= len(node.args) <= 3:
+                bounds = [self._int_value(arg) for arg in node.args]
+                if None in bounds or bounds[2:] == [0]:
+                    return None
+                return len(range(*bounds))
+            if node.func.id == 'enumerate' and node.args:
+                return self._trip_count(node.args[0])
+            if node.func.id == 'zip' and node.args:
+                counts = [self._trip_count(arg) for arg in node.args]
+                return None if None in counts else min(counts)
+        shape = self._value_shape(node)
+        return shape[0] if shape else None
+    def _value_shape(self, node):
+        '''
+        dimensions of the nested lists an expression evaluates to, () for a number and None when they are not known.
+        '''
+        if isinstance(node, ast.Name):
+            return self._shape(node.id)
+        if isinstance(node, ast.Constant):
+            return None if isinstance(node.value, (str, bytes)) else ()
+        if isinstance(node, (ast.List, ast.Tuple)):
+            elements = [self._value_shape(elt) for elt in node.elts]
+            element = elements[0] if elements else ()
+            for other in elements[1:]:
+                element = merge_shapes(element, other)
+            return (len(node.elts),) + (element if element is not None else (None,))
+        if isinstance(node, ast.Subscript):
+            shape = self._value_shape(node.value)
+            if not shape:
+                return None
+            if not isinstance(node.slice, ast.Slice):
+                return shape[1:]
+            parts = (node.slice.lower, node.slice.upper, node.slice.step)
+            bounds = [None if part is None else self._int_value(part) for part in parts]
+            if shape[0] is None or any(part is not None and bound is None for part, bound in zip(parts, bounds)) or bounds[2] == 0:
+                return (None,) + shape[1:]
+            return (len(range(shape[0])[slice(*bounds)]),) + shape[1:]
+        if isinstance(node, ast.Call):
+            if isinstance(node.func, ast.Name):
+                if node.func.id in ('list', 'sorted', 'reversed') and len(node.args) == 1:
+                    return self._value_shape(node.args[0])
+                if node.func.id in SCALAR_FUNCTIONS:
+                    return ()
+            elif isinstance(node.func, ast.Attribute) and node.func.attr == 'copy':
+                return self._value_shape(node.func.value)
+            return None
+        if isinstance(node, ast.UnaryOp):
+            return () if self._value_shape(node.operand) == () else None
+        if isinstance(node, ast.BinOp):
+            left, right = self._value_shape(node.left), self._value_shape(node.right)
+            if left == () and right == ():
+                return ()
+            if isinstance(node.op, ast.Mult) and left and right == ():
+                #! [x] * n
+                times = self._int_value(node.right)
+                return (None if left[0] is None or times is None else left[0] * times,) + left[1:]
+            if isinstance(node.op, ast.Add) and left and right:
+                element = merge_shapes(left[1:], right[1:])
+                length = None if left[0] is None or right[0] is None else left[0] + right[0]
+                return (length,) + (element if element is not None else (None,))
+        return None
+    def _set_shape(self, name, shape):
+        if shape is None:
+            self.shapes.pop(name, None)
+        else:
+            self.shapes[name] = shape
+    def _record_inserted_shape(self, tree):
+        '''
+        shape of the elements of the list an insertion (x.append(y), x.extend(y), x.insert(i, y), x += y) adds to,
+        before self.vars is updated: the first insertion into an empty list sets it, the next ones are merged in.
+        '''
+        if isinstance(tree, ast.AugAssign):
+            if not isinstance(tree.target, ast.Name):
+                return
+            var, func, arg_nodes = tree.target.id, 'extend', [tree.value]
+        else:
+            call = tree.value if isinstance(tree, ast.Expr) else tree
+            if not (isinstance(call, ast.Call) and isinstance(call.func, ast.Attribute) and isinstance(call.func.value, ast.Name)):
+                return
+            var, func, arg_nodes = call.func.value.id, call.func.attr, call.args
+            if func == 'insert':
+                func, arg_nodes = 'append', arg_nodes[1:]
+        if var not in self.vars or self.vars[var][2] != 'list' or len(arg_nodes) != 1:
+            return
+        element = self._value_shape(arg_nodes[0])
+        if func == 'extend':
+            element = element[1:] if element else None
+        elif func != 'append':
+            return
+        current = self.shapes.get(var)
+        if current is not None and self.vars[var][0] != 0:
+            element = merge_shapes(current[1:], element)
+        elif current is None and self.vars[var][0] != 0:
+            element = None
+        self.shapes[var] = (None,) + (element if element is not None else (None,))
+    def _loop_target_shapes(self, node):
+        #! shapes of the loop variables: an item of the iterable, numbers for range() and the index of enumerate()
+        iterable, target = node.iter, node.target
+        pairs = [(target, iterable)]
+        if isinstance(iterable, ast.Call) and isinstance(iterable.func, ast.Name) and isinstance(target, ast.Tuple):
+            if iterable.func.id == 'enumerate' and iterable.args and len(target.elts) == 2:
+                pairs = [(target.elts[0], None), (target.elts[1], iterable.args[0])]
+            elif iterable.func.id == 'zip':
+                pairs = list(zip(target.elts, iterable.args))
+        for name, source in pairs:
+            if not isinstance(name, ast.Name):
+                continue
+            if source is None or isinstance(source, ast.Call) and isinstance(source.func, ast.Name) and source.func.id == 'range':
+                self._set_shape(name.id, ())
+                continue
+            shape = self._value_shape(source)
+            self._set_shape(name.id, shape[1:] if shape else None)
     def _hande_primitives_type_conversions(self, node):
         if isinstance(node.func, ast.Name) and node.func.id == 'int':  
                 if (isinstance(node.args[0], ast.Subscript)):
                     return 100000000000000000
                 arg_val = self._evaluate_primtive_expression(node.args[0])
-                return int(arg_val)
+                return None if arg_val is None else int(arg_val)
         elif isinstance(node.func, ast.Name) and node.func.id == 'str':
             if (isinstance(node.args[0], ast.Subscript)): 
                 return "this is a place holder for a string"
-            return str(self._evaluate_primtive_expression(node.args[0]))
+            arg_val = self._evaluate_primtive_expression(node.args[0])
+            return None if arg_val is None else str(arg_val)
         elif isinstance(node.func, ast.Name) and node.func.id == 'float':
             if (isinstance(node.args[0], ast.Subscript)): 
                 return 100000000000000000.0
-            return float(self._evaluate_primtive_expression(node.args[0]))
+            arg_val = self._evaluate_primtive_expression(node.args[0])
+            return None if arg_val is None else float(arg_val)
         return None
     def _handle_mathematical_ops(self, node, left_val, right_val):
+        if left_val is None or right_val is None:
+            return None #! a value that is not known (an unresolved len()) keeps the result unknown
         if isinstance(node.op, ast.Add):
             return left_val + right_val
         elif isinstance(node.op, ast.Sub):
@@ -256,6 +656,11 @@ class Memory_Parser:
             return
         var_name = stmt.targets[0].id  
         result = self._evaluate_primtive_expression(stmt.value)
+        if result is None:
+            #! computed from a value that is not known, kept like an unresolved len()
+            self.vars[var_name] = (None, sys.getsizeof(0), 'int')
+            self.unresolved.append(ast.unparse(stmt))
+            return
         memory = self.primitives_estimator.estimate_primitive_size(result)
         self.vars[var_name] = (result, memory, type(result).__name__) 
     def _assignment_type(self, node):
@@ -486,182 +891,238 @@ class Memory_Parser:
           
     def _assignmemt_handler(self,tree):
         stmt = tree
+        target = stmt.targets[0].id if isinstance(stmt.targets[0], ast.Name) else None
+        if target is not None and any(isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'len'
+                                      for node in ast.walk(stmt.value)):
+            #! a length conv_len_assignment could not resolve
+            self.vars[target] = (None, sys.getsizeof(0), 'int')
+            self.shapes[target] = ()
+            self.unresolved.append(ast.unparse(stmt))
+            return
+        shape = self._value_shape(stmt.value) if target is not None else None
+        if target is not None:
+            self._set_shape(target, shape)
         if self._assignment_type(stmt.value) == self.AssignTypes.PRIMITIVE:
             self._evaluate_primitive_assignment(stmt)
         elif self._assignment_type(stmt.value) == self.AssignTypes.LIST :
             # print("List Assignment")            
             self._evaluate_list_assignment(stmt)
-    def _handle_list_insertion(self, var,func,args,in_loop = 1):
+    def _argument_size(self, value):
+        #! size of an inserted value, "$x" stands for the variable x
+        if isinstance(value, Sized_String):
+            return value.size()
+        if isinstance(value, list):
+            return sum(self._argument_size(item) if isinstance(item, str) else sys.getsizeof(item) for item in value) \
+                + self.primitives_estimator.estimate_list_size(len(value))
+        if isinstance(value, str) and value.startswith("$"):
+            if value[1:] not in self.vars:
+                raise NameError(f"Variable '{value[1:]}' is not defined syntax error.")
+            return self.vars[value[1:]][1]
+        return sys.getsizeof(value)
+    def _inserted_elements(self, func, args):
+        '''
+        what one call adds to a list as (length, element size, copies) groups in insertion order.
+        every element is stored in a one element list of its own, hence the size of a list of 1.
+        '''
+        pointer = self.primitives_estimator.estimate_list_size(1)
         if func == 'append':
+            arg = args[0]
             #! start with $ then a variable name
-            if isinstance(args[0], str) and args[0].startswith("$"):
-               args[0] = args[0][1:]  # Remove the leading '$'
-               if args[0] not in self.vars:
-                   raise NameError(f"Variable '{args[0]}' is not defined syntax error.")
-               args[0] = self.vars[args[0]][0]  # Get the value of the variable
-            for i in range(in_loop):
-                new_node = ast.Assign(
-                    targets=[ast.Name(id=var, ctx=ast.Store())],
-                    value=ast.List(elts=[ast.Constant(value=args[0])], ctx=ast.Load())
-                )
-                new_node = self.transformer2.visit(new_node)
-                # print(f"New Node: {ast.dump(new_node)}")
-                self._evaluate_list_assignment(new_node, False)
-        elif func == 'extend':  
+            if isinstance(arg, str) and arg.startswith("$"):
+                if arg[1:] not in self.vars:
+                    raise NameError(f"Variable '{arg[1:]}' is not defined syntax error.")
+                arg = self.vars[arg[1:]][0]  # Get the value of the variable
+            return [(1, self._argument_size(arg) + pointer, 1)]
+        elif func == 'extend':
             #! extend treats immutable objects as if they were re-created in memory together with their pointers.
-            
-            flattened_args = []
+            merged = []
+            elements = []
             for sublist in args:
+                if isinstance(sublist, Sized_String):
+                    #! one string per character
+                    elements.append((1, sys.getsizeof('a') + pointer, sublist.length))
+                    continue
                 for item in sublist:
                     if isinstance(item, str) and item.startswith("$"):
-                        item = item[1:]
-                        if item not in self.vars:
-                            raise NameError(f"Variable '{item}' is not defined syntax error.")
-                        if self.vars[item][2] == 'list':
-                            length = self.vars[item][0]
-                            size = self.vars[item][1]
-                            total_size = size + self.primitives_estimator.estimate_list_size(length) -  sys.getsizeof([]) #! should be 2 one for get the size of the list and one for the pointer in the original list
-                            self.vars[var] = (self.vars[var][0] + length, (self.vars[var][1] + total_size)//2, 'list')
+                        if item[1:] not in self.vars:
+                            raise NameError(f"Variable '{item[1:]}' is not defined syntax error.")
+                        length, size, var_type = self.vars[item[1:]]
+                        if var_type == 'list':
+                            #! should be 2 one for get the size of the list and one for the pointer in the original list
+                            merged.append((length, size + self.primitives_estimator.estimate_list_size(length) - sys.getsizeof([]), 1))
                             continue
-                    flattened_args.append(item)
-            args = flattened_args
-            for i in range(in_loop):
-                for arg in args:
-                    new_node = ast.Assign(
-                        targets=[ast.Name(id=var, ctx=ast.Store())],
-                        value=ast.List(elts=[ast.Constant(value=arg)], ctx=ast.Load())
-                    )
-                    new_node = self.transformer2.visit(new_node)
-                    # print(f"New Node: {ast.dump(new_node)}")
-                    self._evaluate_list_assignment(new_node, False)
-    def _insertion_handler(self, tree,in_loop = 1):
-        def extract_call_info(tree):
-            for node in ast.walk(tree):
-                # print(f"Node: {ast.dump(node,indent=4)}")  # Debugging: print the node structure
-                if isinstance(node, ast.Call):
-                    func_node = node.func
-                    if isinstance(func_node, ast.Attribute):
-                        var_id = func_node.value.id  # e.g., 'x'
-                        func_type = func_node.attr   # e.g., 'append'
-                        args = []
-                        for arg in node.args:
-                            if isinstance(arg, ast.Name):
-                                # Capture variable name as a string
-                               args.append([f"${arg.id}"])
-                            elif isinstance(arg, ast.Call):
-                                args.append(111111111111111)
-                                #append(data[0])
-                            elif isinstance(arg, ast.Subscript):
-                                 var_sub_name = arg.value.id
-                                #  print(var_sub_name)
-                                 if self.vars[var_sub_name][2] == 'list':
-                                    target_size = self.vars[var_sub_name][1]//self.vars[var_sub_name][0]
-                                 else:
-                                    target_size = self.vars[var_sub_name][1]  
-                                
-                                #  print(target_size)
-                                 def generate_string_with_exact_size(target_size):
-                                    return ''.join(random.choices(string.ascii_letters, k=target_size))
-                                 args.append(generate_string_with_exact_size(min(target_size,10000)))
-                            else:
-                                node = self.transformer.visit(node)
-                                try:
-                                    args.append(ast.literal_eval(arg))
-                                except (ValueError, SyntaxError):
-                                    raise ValueError(f"Unsupported argument type: {type(arg).__name__}")
-                        return var_id, func_type, args
-         
+                    elements.append((1, self._argument_size(item) + pointer, 1))
+            #! lists are merged before the other elements are added
+            return merged + elements
+        return []
+    def _list_insertion_state(self, var, func, args, in_loop=1):
+        #! (length, size) of var after the call ran in_loop times
+        length, size = self.vars[var][0], self.vars[var][1]
+        elements = self._inserted_elements(func, args)
+        length += in_loop * sum(added * copies for added, _, copies in elements)
+        for _ in range(in_loop):
+            previous = size
+            for _, element_size, copies in elements:
+                size = insertion_size(size, element_size, copies)
+            if size == previous:
+                #! further calls change nothing, at most a few dozens of rounds get here
+                break
+        return length, size
+    def _handle_list_insertion(self, var, func, args, in_loop=1):
+        if func in ['append', 'extend']:
+            length, size = self._list_insertion_state(var, func, args, in_loop)
+            self.vars[var] = (length, size, 'list')
+    def _insertion_call(self, tree):
+        '''
+        (variable, method, arguments) of an insertion, insert(i, x) is read as append(x) and x += y as
+        x.extend(y). tree is not modified.
+        '''
         if isinstance(tree, ast.AugAssign): #! for handling +=
             tree = self.transformer3.visit(tree)
-        else: #1 to replace insert with append
-            contains_insert = any(
-                isinstance(node, ast.Call) and
-                isinstance(node.func, ast.Attribute) and
-                node.func.attr == 'insert'
-                for node in ast.walk(tree)
-            )
-            if contains_insert:
-                tree = self.transformer4.visit(tree)
-        var, func_type, args = extract_call_info(tree)
+        node = next((node for node in ast.walk(tree) if isinstance(node, ast.Call)), None)
+        if node is None or not isinstance(node.func, ast.Attribute):
+            return None
+        var_id = node.func.value.id  # e.g., 'x'
+        func_type = node.func.attr   # e.g., 'append'
+        arg_nodes = node.args
+        if func_type == 'insert' and len(arg_nodes) == 2:
+            func_type, arg_nodes = 'append', arg_nodes[1:]
+        args = []
+        for arg in arg_nodes:
+            if isinstance(arg, ast.Name):
+                # Capture variable name as a string
+                args.append([f"${arg.id}"])
+            elif isinstance(arg, ast.Call):
+                args.append(111111111111111)
+                #append(data[0])
+            elif isinstance(arg, ast.Subscript):
+                var_sub_name = arg.value.id
+                if self.vars[var_sub_name][2] == 'list':
+                    target_size = self.vars[var_sub_name][1]//self.vars[var_sub_name][0]
+                else:
+                    target_size = self.vars[var_sub_name][1]
+                args.append(Sized_String(target_size))
+            else:
+                try:
+                    args.append(ast.literal_eval(self.transformer.visit(deepcopy(arg))))
+                except (ValueError, SyntaxError):
+                    raise ValueError(f"Unsupported argument type: {type(arg).__name__}")
+        return var_id, func_type, args
+    def _insertion_effect(self, tree):
+        '''
+        (variable, length, size) once tree ran, self.vars is left as is (the shape of its elements is recorded).
+        '''
+        self._record_inserted_shape(tree)
+        var, func_type, args = self._insertion_call(tree)
+        if not var in self.vars:
+            raise NameError(f"Variable '{var}' is not defined syntax error.")
+        if self.vars[var][2] != 'list':
+            return var, self.vars[var][0], self.vars[var][1]
+        return (var,) + self._list_insertion_state(var, func_type, args)
+    def _insertion_handler(self, tree,in_loop = 1):
+        self._record_inserted_shape(tree)
+        var, func_type, args = self._insertion_call(tree)
         if not var in self.vars:
             raise NameError(f"Variable '{var}' is not defined syntax error.")
         if self.vars[var][2] == 'list':
            self._handle_list_insertion(var, func_type,args, in_loop)   
-            
-        
+    def _list_deletion_state(self, var, func_type, in_loop=1):
+        #! (length, size) of var after the call ran in_loop times
+        length, size = self.vars[var][0], self.vars[var][1]
+        if func_type == 'clear':
+            return 0, sys.getsizeof([])  # Reset to empty list
+        elif func_type in ['pop', 'remove']:
+            if length == 0 or in_loop > length:
+                raise IndexError(f"{func_type} from empty list syntax error.")
+            return removal_size(length, size, in_loop)
+        return length, size
     def _handle_list_deletion(self, var, func_type,in_loop = 1):
-        if func_type == 'pop':
-            if self.vars[var][0] == 0:
-                raise IndexError(f"pop from empty list syntax error.")
-            for i in range(in_loop):
-                total_size = self.vars[var][1]
-                total_length = self.vars[var][0]
-                new_size = total_size - (total_size // total_length)  
-                self.vars[var] = (total_length - 1, new_size, 'list')
-            return
-        elif func_type == 'clear':
-            self.vars[var] = (0, sys.getsizeof([]), 'list')  # Reset to empty list
-        elif func_type == 'remove':
-            for i in range(in_loop):
-                new_length = self.vars[var][0] - 1
-                new_size = self.vars[var][1] - (self.vars[var][1] // self.vars[var][0])
-                self.vars[var] = (new_length, new_size, 'list') 
-    def _deletion_handler(self, tree, in_loop = 1):
-        def extract_call_info(tree):
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Call):
-                    func_node = node.func
-                    if isinstance(func_node, ast.Attribute):
-                        var_id = func_node.value.id  # e.g., 'x'
-                        func_type = func_node.attr   # e.g., 'pop'
-                        return var_id, func_type
-        var_id, func_type = None, None
-        if  isinstance(tree, ast.Delete): #! handle del statements
-            stmt = tree
-            subscript = stmt.targets[0]
-            var_id = subscript.value.id
-            slice = subscript.slice
-            lower = None
+        length, size = self._list_deletion_state(var, func_type, in_loop)
+        self.vars[var] = (length, size, 'list')
+    def _slice_deletion_effect(self, subscript):
+        '''
+        (variable, length, size) once del subscript ran, None when the bounds are not constants.
+        self.vars is left as is.
+        '''
+        var_id = subscript.value.id
+        slice = subscript.slice
+        lower = None
+        upper = None
+        step = 1
+        if isinstance(slice, ast.Slice):
+            lower = slice.lower.value if isinstance(slice.lower, ast.Constant) else None
+            upper = slice.upper.value if isinstance(slice.upper, ast.Constant) else None
+            step = slice.step.value if isinstance(slice.step, ast.Constant) else 1
+        elif isinstance(slice, ast.Constant):
+            lower = slice.value
             upper = None
-            step = 1
+            step = 1 
+        total_length = self.vars[var_id][0]
+        total_size = self.vars[var_id][1]
+        if lower is not None and upper is not None:
+            length = (upper - lower) // step
+            size = total_size // total_length * length
+            return var_id, total_length - length, total_size - size
+        elif lower is not None and upper is None:
             if isinstance(slice, ast.Slice):
-                lower = slice.lower.value if isinstance(slice.lower, ast.Constant) else None
-                upper = slice.upper.value if isinstance(slice.upper, ast.Constant) else None
-                step = slice.step.value if isinstance(slice.step, ast.Constant) else 1
-            elif isinstance(slice, ast.Constant):
-                lower = slice.value
-                upper = None
-                step = 1 
-            total_length = self.vars[var_id][0]
-            total_size = self.vars[var_id][1]
-            if lower is not None and upper is not None:
-                length = (upper - lower) // step
-                size = total_size // total_length * length
-                self.vars[var_id] = (total_length - length, total_size - size, 'list')
-            elif lower is not None and upper is None:
-                if isinstance(slice, ast.Slice):
-                        length = (total_length - lower)// step
-                        size = total_size - (total_size // total_length) * length
-                        length = total_length - length 
-                else:
-                    length = total_length - 1
-                    size = total_size - total_size // total_length
-                self.vars[var_id] = (length, size//10, 'list')
-            elif lower is None and upper is not None:
-                length = upper// step
-                size = total_size - total_size//total_length * length
-                length = total_length - length
-                self.vars[var_id] = (length, size//10, 'list')     
-
-                
-            return                
-        else:
-            var_id, func_type = extract_call_info(tree)
+                    length = (total_length - lower)// step
+                    size = total_size - (total_size // total_length) * length
+                    length = total_length - length 
+            else:
+                length = total_length - 1
+                size = total_size - total_size // total_length
+            return var_id, length, size//10
+        elif lower is None and upper is not None:
+            length = upper// step
+            size = total_size - total_size//total_length * length
+            length = total_length - length
+            return var_id, length, size//10
+        return None  #! bounds not known, nothing is removed
+    def _deletion_call(self, tree):
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call):
+                func_node = node.func
+                if isinstance(func_node, ast.Attribute):
+                    var_id = func_node.value.id  # e.g., 'x'
+                    func_type = func_node.attr   # e.g., 'pop'
+                    return var_id, func_type
+        return None, None
+    def _deletion_effect(self, tree):
+        '''
+        (variable, length, size) once the pop, remove or clear call ran, self.vars is left as is.
+        '''
+        var_id, func_type = self._deletion_call(tree)
+        if var_id not in self.vars:
+            raise NameError(f"Variable '{var_id}' is not defined syntax error.")
+        if self.vars[var_id][2] != 'list':
+            raise TypeError(f"Variable '{var_id}' is not a list syntax error.")
+        return (var_id,) + self._list_deletion_state(var_id, func_type)
+    def _deletion_handler(self, tree, in_loop = 1):
+        if  isinstance(tree, ast.Delete): #! handle del statements
+            effect = self._slice_deletion_effect(tree.targets[0])
+            if effect is not None:
+                var_id, length, size = effect
+                self.vars[var_id] = (length, size, 'list')
+            return
+        var_id, func_type = self._deletion_call(tree)
         if var_id not in self.vars:
             raise NameError(f"Variable '{var_id}' is not defined syntax error.")
         if self.vars[var_id][2] != 'list':
             raise TypeError(f"Variable '{var_id}' is not a list syntax error.")
         self._handle_list_deletion(var_id, func_type, in_loop)
+    def _repeat_effect(self, effect, n_iterations, scale=10, clamp=False):
+        '''
+        carries the change one iteration makes to a list (effect is the (variable, length, size) after it)
+        over n_iterations, the size is then divided by scale. clamp keeps both from going negative.
+        '''
+        var, length_after, size_after = effect
+        length, size = self.vars[var][0], self.vars[var][1]
+        new_length = length + (length_after - length) * int(n_iterations)
+        new_size = size + (size_after - size) * int(n_iterations)
+        if clamp:
+            #! max is to avoid negative sizes or lengths
+            new_length, new_size = max(new_length, 0), max(new_size, 0)
+        self.vars[var] = (new_length, new_size // scale, 'list')
                     
          
     def _list_method_handler(self, tree):
@@ -690,9 +1151,11 @@ class Memory_Parser:
         
     
         # print(f"Variable ID: {var}, Function Type: {func_type}, Arguments: {args}")
-    def _file_handler(self, tree):
+    def _file_handler(self, tree, sample_rows=DATA_SAMPLE_ROWS, confidence=DATA_SIZE_CONFIDENCE):
         '''
         gets the file metadata and records it in the dictionary.
+        the size of the loaded list is the upper bound of sample_data_file, or the file size
+        plus the list pointers when sample_rows is 0.
         '''
         def extract_file_info(tree):
             file_path = None
@@ -712,14 +1175,16 @@ class Memory_Parser:
 
             return file_path, list_name
         file_path ,var = extract_file_info(tree)
-        file_size = os.path.getsize(file_path) + sys.getsizeof([])  #! add the size of the list pointer
-        length = 0
-        with open(file_path, 'rb') as f:
-            length = sum(1 for _ in f)
+        self.data_profile = profile_data_file(file_path)
+        length = self.data_profile['rows']
+        ncols = self.data_profile['columns']
+        self.shapes[var] = (length, ncols)
+        if sample_rows:
+            self.data_model = sample_data_file(file_path, sample_rows, confidence, self.data_profile)
+            self.vars[var] = (length, self.data_model['upper_bound'], 'list')
+            return
+        file_size = self.data_profile['size'] + sys.getsizeof([])  #! add the size of the list pointer
         file_size += self.primitives_estimator.estimate_list_size(length)
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            first_line = f.readline()
-            ncols = len(first_line.strip().split()) if first_line else 0
         file_size += self.primitives_estimator.estimate_list_size(ncols) * length  #! add the size of the list pointer
         self.vars[var] = (length, file_size, 'list')
     def _get_return_size_length(self,node):
@@ -764,67 +1229,22 @@ class Memory_Parser:
             new_size = int(original_size // original_length * new_length)
             return new_size, new_length
     def _handle_loop_footprint(self, node):
-        def get_number_outer_iterations(node):
-            loop_expr = None
+        def get_number_iterations(node, depth=0):
+            #! trip count of a loop, None when it is not known (the body is then counted once)
             iter_node = node.iter
-            #! no subscript within the loop
-            if isinstance(iter_node, ast.Subscript):
-                iter_node = ast.Name(id=iter_node.value.id, ctx=ast.Load())
-            # Case 1: for i in x:
-                
-            if isinstance(iter_node, ast.Name):
-                loop_expr = f"len({iter_node.id})"
-            # Case 2: for i in range(...):
-            elif isinstance(iter_node, ast.Call) and isinstance(iter_node.func, ast.Name):
-                if iter_node.func.id == 'range':
-                    if len(iter_node.args) == 1:
-                        # range(N)
-                        if isinstance(iter_node.args[0], ast.Constant):
-                            loop_expr = str(iter_node.args[0].value)
-                        else:
-                            loop_expr = ast.unparse(iter_node.args[0])
-                            if not loop_expr.startswith("len("):
-                                if loop_expr in self.vars:
-                                    loop_expr = self.vars[loop_expr][0]
-                                else:
-                                    raise ValueError(f"Variable '{loop_expr}' is not defined syntax error.") 
-                    elif len(iter_node.args) in [2, 3]:
-                        start = ast.unparse(iter_node.args[0])
-                        stop = ast.unparse(iter_node.args[1])
-                        if len(iter_node.args) == 3:
-                            step = ast.unparse(iter_node.args[2])
-                            loop_expr = f"({stop} - {start}) // {step}"
-                        else:
-                            loop_expr = f"{stop} - {start}"
-                # Case 3: for index, name in enumerate(names):
-                elif iter_node.func.id == 'enumerate' and len(iter_node.args) == 1:
-                    arg_expr = ast.unparse(iter_node.args[0])
-                    loop_expr = f"len({arg_expr})"
-                # Case 4: for i, j in zip(a, b):
-                elif iter_node.func.id == 'zip':
-                    zipped_lens = []
-                    for arg in iter_node.args:
-                        zipped_lens.append(f"len({ast.unparse(arg)})")
-                    loop_expr = f"min({', '.join(zipped_lens)})"
-            # Try resolving len(x) from known vars
-            if isinstance(loop_expr, int):
-                return loop_expr 
-            if loop_expr:
-                if loop_expr.startswith("len(") and loop_expr.endswith(")"):
-                    var = loop_expr[4:-1].strip()
-                    if var in self.vars:
-                        loop_expr = self.vars[var][0]
-                return loop_expr
-            else:
+            supported = isinstance(iter_node, (ast.Name, ast.Subscript)) or (isinstance(iter_node, ast.Call)
+                and isinstance(iter_node.func, ast.Name) and iter_node.func.id in ('range', 'enumerate', 'zip'))
+            if depth == 0 and not supported:
                 raise ValueError("Unsupported loop iteration expression.")
-        def has_inner_for_loop(node):
-            if not isinstance(node, ast.For):
-                return False
-
-            for child in ast.walk(node):
-                if child is not node and isinstance(child, ast.For):
-                    return True
-            return False
+            try:
+                n_iters = self._trip_count(iter_node)
+            except ValueError:
+                if depth == 0:
+                    raise
+                n_iters = None
+            if n_iters is None:
+                self.unresolved.append(f"for {ast.unparse(node.target)} in {ast.unparse(iter_node)}:")
+            return n_iters
         def get_assignment_targets(assign_node):
             targets = []
             target = assign_node.target
@@ -833,22 +1253,23 @@ class Memory_Parser:
             elif isinstance(target, ast.Tuple):
                 targets.extend([elt.id for elt in target.elts if isinstance(elt, ast.Name)])
             return targets
-        def handle_nested_loops(node, depth=0,n_outer_iterations=None, n_inner_iterations=None):
+        def handle_nested_loops(node, depth=0, n_iters=None):
             if not isinstance(node, ast.For):
                 return
             # print("  " * depth + f"Handling loop at depth {depth}")
-            n_iters = n_outer_iterations if depth == 0 else n_inner_iterations #* n_outer_iterations
+            #! statements of a loop run once per iteration of it, whatever loop it is in
             if not isinstance(n_iters, int):
-                n_iters = 420
+                n_iters = 1
             for stmt in node.body:
                 # print(ast.dump(stmt, indent=4))
                 if isinstance(stmt, ast.For):
-                    original_vars = self.vars.copy()
+                    n_inner_iterations = get_number_iterations(stmt, depth + 1)
                     targets = get_assignment_targets(stmt)
                     costs = get_iterable_cost_expr_only(stmt, self.vars)
                     for i,target in enumerate(targets):
                         self.vars[target] = (1,costs[i], 'unk')
-                    handle_nested_loops(stmt, depth + 1, n_outer_iterations=n_iters, n_inner_iterations=n_inner_iterations)
+                    self._loop_target_shapes(stmt)
+                    handle_nested_loops(stmt, depth + 1, n_inner_iterations)
                     # for key in list(self.vars.keys()):
                     #     if key not in original_vars:
                     #         del self.vars[key]
@@ -875,55 +1296,18 @@ class Memory_Parser:
                         # else:
                         self._assignmemt_handler(stmt)
                     elif  isinstance(stmt, ast.AugAssign):
-                        size_before_loop = self.vars[stmt.target.id][1]
-                        len_before_loop = self.vars[stmt.target.id][0]
-                        self._insertion_handler(deepcopy(stmt))
-                        size_after_loop = self.vars[stmt.target.id][1]
-                        len_after_loop = self.vars[stmt.target.id][0]
-                        size_increment = size_after_loop - size_before_loop
-                        len_increment = len_after_loop - len_before_loop
-                        new_size = size_before_loop + size_increment * int(n_iters)
-                        new_length = len_before_loop + len_increment * int(n_iters)
-                        self.vars[stmt.target.id] = (new_length,new_size//10, 'list')
+                        self._repeat_effect(self._insertion_effect(stmt), n_iters)
                     elif isinstance(stmt, ast.Expr):
                         func = stmt.value.func.attr 
                         if func in ['insert', 'append', 'extend']:
-                            size_before_loop = self.vars[stmt.value.func.value.id][1]
-                            len_before_loop = self.vars[stmt.value.func.value.id][0]
-                            self._insertion_handler(deepcopy(stmt))
-                            size_after_loop = self.vars[stmt.value.func.value.id][1]
-                            len_after_loop = self.vars[stmt.value.func.value.id][0]
-                            size_increment = size_after_loop - size_before_loop
-                            len_increment = len_after_loop - len_before_loop
-                            new_size = size_before_loop + size_increment * int(n_iters)
-                            new_length = len_before_loop + len_increment * int(n_iters)
-                            self.vars[stmt.value.func.value.id] = (new_length,new_size//10, 'list')
+                            self._repeat_effect(self._insertion_effect(stmt), n_iters)
                         elif func in ['pop', 'remove','clear']:
-                            size_before_loop = self.vars[stmt.value.func.value.id][1]
-                            len_before_loop = self.vars[stmt.value.func.value.id][0]
-                            self._deletion_handler(deepcopy(stmt))
-                            size_after_loop = self.vars[stmt.value.func.value.id][1]
-                            len_after_loop = self.vars[stmt.value.func.value.id][0]
-                            size_decrement = size_after_loop - size_before_loop
-                            len_decrement = len_after_loop - len_before_loop
-                            new_size = size_before_loop + size_decrement * int(n_iters)
-                            new_length = len_before_loop + len_decrement * int(n_iters)
-                            self.vars[stmt.value.func.value.id] = (new_length,new_size//10, 'list')
+                            self._repeat_effect(self._deletion_effect(stmt), n_iters)
                     elif  isinstance(stmt, ast.Delete):
                             for target in stmt.targets:
                                 if isinstance(target, ast.Subscript) and isinstance(target.value, ast.Name):    
-                                    var_name = target.value.id        
-                                    size_before_loop = self.vars[var_name][1]
-                                    len_before_loop = self.vars[var_name][0]
-                                    self._deletion_handler(deepcopy(stmt))
-                                    size_after_loop = self.vars[var_name][1]
-                                    len_after_loop = self.vars[var_name][0]
-                                    size_decrement = size_after_loop - size_before_loop
-                                    len_decrement = len_after_loop - len_before_loop
-                                    #! max is to avoid negative sizes or lengths
-                                    new_size = max(size_before_loop + size_decrement * int(n_iters),0)
-                                    new_length = max(len_before_loop + len_decrement * int(n_iters),0)
-                                    self.vars[var_name] = (new_length,new_size, 'list')
+                                    effect = self._slice_deletion_effect(target) or (target.value.id,) + self.vars[target.value.id][:2]
+                                    self._repeat_effect(effect, n_iters, scale=1, clamp=True)
             # print("  " * (depth + 1) + f"Statement: {ast.dump(stmt)}")
             # print(self.vars)
         def get_iterable_cost_expr_only(for_node, vars_dict):
@@ -933,7 +1317,7 @@ class Memory_Parser:
             cost_exprs = []
 
             def var_expr(name):
-                return self.vars[name][1]//self.vars[name][0]
+                return self.vars[name][1]//(self._length(name) or self.vars[name][0])
 
             if isinstance(iter_expr, ast.Call):
                 func_name = getattr(iter_expr.func, 'id', None)
@@ -963,15 +1347,14 @@ class Memory_Parser:
                 cost_exprs.append("sys.getsizeof(100000)")
             return cost_exprs
         
-        original_vars = self.vars.copy()
-        n_outer_iterations = get_number_outer_iterations(node)
-        n_inner_iterations = 420 if has_inner_for_loop(node) else None
+        n_outer_iterations = get_number_iterations(node)
         targets = get_assignment_targets(node)
         costs = get_iterable_cost_expr_only(node, self.vars) 
         for i,target in enumerate(targets):
             self.vars[target] = (1,costs[i], 'unk')  # Initialize targets to empty lists
+        self._loop_target_shapes(node)
 
-        handle_nested_loops(node, depth=0, n_outer_iterations=n_outer_iterations, n_inner_iterations=n_inner_iterations)
+        handle_nested_loops(node, depth=0, n_iters=n_outer_iterations)
         # for key in list(self.vars.keys()):
         #     if key not in original_vars:
         #         del self.vars[key]
@@ -981,22 +1364,27 @@ class Memory_Parser:
             blocks = []
             current = root_if_node
             while isinstance(current, ast.If):
-                blocks.append(ast.Module(body=deepcopy(current.body), type_ignores=[]))
+                blocks.append(ast.Module(body=current.body, type_ignores=[]))
                 if len(current.orelse) == 1 and isinstance(current.orelse[0], ast.If):
                     current = current.orelse[0]  # move to next `elif`
                 else:
                     if current.orelse:
-                        blocks.append(ast.Module(body=deepcopy(current.orelse), type_ignores=[]))  # final `else` block
+                        blocks.append(ast.Module(body=current.orelse, type_ignores=[]))  # final `else` block
                     break
             return blocks
         def handle_if_blocks(blocks,n_iterations = 1):
+            #! every block runs on an overlay of the variables, only what it changes is stored
+            original_vars = self.vars
+            original_size = sum(value[1] for value in original_vars.values())
             vars_footprints_dicts= []
             n_iter = n_iterations 
             for block in blocks:
-                original_vars = self.vars.copy()
+                self.vars = ChainMap({}, original_vars)
                 for stmt in block.body:
                     if isinstance(stmt, ast.Assign):
                         if isinstance(stmt.targets[0], ast.Subscript):
+                           original_vars.update(self.vars.maps[0])
+                           self.vars = original_vars
                            return #! most probably changing a value not inserting anything 
                         stmt = self.conv_len_assignment(deepcopy(stmt))
                         # if stmt.targets[0].id in self.vars: 
@@ -1014,70 +1402,29 @@ class Memory_Parser:
                         # else:
                         self._assignmemt_handler(stmt)
                     elif  isinstance(stmt, ast.AugAssign):
-                        size_before_loop = self.vars[stmt.target.id][1]
-                        len_before_loop = self.vars[stmt.target.id][0]
-                        self._insertion_handler(deepcopy(stmt))
-                        size_after_loop = self.vars[stmt.target.id][1]
-                        len_after_loop = self.vars[stmt.target.id][0]
-                        size_increment = size_after_loop - size_before_loop
-                        len_increment = len_after_loop - len_before_loop
-                        new_size = size_before_loop + size_increment * int(n_iter)
-                        new_length = len_before_loop + len_increment * int(n_iter)
-                        self.vars[stmt.target.id] = (new_length,new_size//10, 'list')
+                        self._repeat_effect(self._insertion_effect(stmt), n_iter)
                     elif isinstance(stmt, ast.Expr):
                         func = stmt.value.func.attr 
                         if func in ['insert', 'append', 'extend']:
-                            size_before_loop = self.vars[stmt.value.func.value.id][1]
-                            len_before_loop = self.vars[stmt.value.func.value.id][0]
-                            self._insertion_handler(deepcopy(stmt))
-                            size_after_loop = self.vars[stmt.value.func.value.id][1]
-                            len_after_loop = self.vars[stmt.value.func.value.id][0]
-                            size_increment = size_after_loop - size_before_loop
-                            len_increment = len_after_loop - len_before_loop
-                            new_size = size_before_loop + size_increment * int(n_iter)
-                            new_length = len_before_loop + len_increment * int(n_iter)
-                            self.vars[stmt.value.func.value.id] = (new_length,new_size//10, 'list')
+                            self._repeat_effect(self._insertion_effect(stmt), n_iter)
                         elif func in ['pop', 'remove','clear']:
-                            size_before_loop = self.vars[stmt.value.func.value.id][1]
-                            len_before_loop = self.vars[stmt.value.func.value.id][0]
-                            self._deletion_handler(deepcopy(stmt))
-                            size_after_loop = self.vars[stmt.value.func.value.id][1]
-                            len_after_loop = self.vars[stmt.value.func.value.id][0]
-                            size_decrement = size_after_loop - size_before_loop
-                            len_decrement = len_after_loop - len_before_loop
-                            new_size = size_before_loop + size_decrement * int(n_iter)
-                            new_length = len_before_loop + len_decrement * int(n_iter)
-                            self.vars[stmt.value.func.value.id] = (new_length,new_size, 'list')
-                        elif isinstance(stmt, ast.Delete):
-                            for target in stmt.targets:
-                                if isinstance(target, ast.Subscript) and isinstance(target.value, ast.Name):    
-                                    var_name = target.value.id        
-                                    size_before_loop = self.vars[var_name][1]
-                                    len_before_loop = self.vars[var_name][0]
-                                    self._deletion_handler(deepcopy(stmt))
-                                    size_after_loop = self.vars[var_name][1]
-                                    len_after_loop = self.vars[var_name][0]
-                                    size_decrement = size_after_loop - size_before_loop
-                                    len_decrement = len_after_loop - len_before_loop
-                                    #! max is to avoid negative sizes or lengths
-                                    new_size = max(size_before_loop + size_decrement * int(n_iter),0)
-                                    new_length = max(len_before_loop + len_decrement * int(n_iter),0)
-                                    self.vars[var_name] = (new_length,new_size, 'list')
+                            self._repeat_effect(self._deletion_effect(stmt), n_iter, scale=1)
                     elif isinstance(stmt, ast.If):
                         self._handle_if_footprint(stmt, n_iterations)
                     elif isinstance(stmt, ast.For):
                         self._handle_loop_footprint(stmt)
-                vars_footprints_dicts.append(self.vars.copy())
-                self.vars = original_vars.copy()  #! Reset to original vars after each block
+                vars_footprints_dicts.append(self.vars.maps[0])
+            self.vars = original_vars  #! Reset to original vars after each block
             footprints = []
             # print(vars_footprints_dicts)
             for item in vars_footprints_dicts:
-                total_size = sum(value[1]  for value in item.values())  #! sum the values of the dicts
+                #! total size of the block: the original size with the changed variables swapped
+                total_size = original_size + sum(value[1] - original_vars.get(var, (0, 0))[1] for var, value in item.items())
                 footprints.append(total_size)
             # print(footprints)
             max_index = footprints.index(max(footprints))  #! get the index of the max footprint
             # print(max_index)
-            self.vars = vars_footprints_dicts[max_index]  #! set the vars to the max footprint dict
+            self.vars.update(vars_footprints_dicts[max_index])  #! apply the changes of the max footprint block
             # for key in list(self.vars.keys()):
             #     if key not in original_vars:
             #         del self.vars[key]
@@ -1,134 +1,135 @@
-from Memory_Estimator import *
-from DDG import *
-import py_compile
+from Memory_Estimator import Memory_Parser, LenToConstantTransformer, simplify_statement, DATA_SAMPLE_ROWS, DATA_SIZE_CONFIDENCE
+from Parsed_Program import Parsed_Program
+from DDG import DDG_Wrapper, Compact_DDG
+from Analysis_Cache import Analysis_Cache, file_identity, normalized_ast
+from DDG_Artifact import DDG_Artifact, write_artifact
+from Live_Vars import Live_Vars
+from scheduler import run_schedule
+from Stage_Profiler import Stage_Profiler
+import argparse
+import ast
+import os
+from concurrent.futures import FIRST_COMPLETED, wait
 import sys
 from collections import defaultdict, deque
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
 import glob
 import json
-import copy
 import re
 
-from collections import defaultdict
-from typing import List, Dict, Any
+DDG_ARTIFACT_NAME = 'ddg.bin'
 
 def group_by_needs_with_wait_index(
-    statements: List[Dict[str, Any]],
-    dependency_graph: Dict[str, Any]
+    statements: Union[List[Dict[str, Any]], Compact_DDG],
+    dependency_graph: Dict[str, Any] = None
 ) -> Dict[tuple, List[str]]:
-    
+    #! statements is either the saved node list (with the saved edges as dependency_graph) or a Compact_DDG
+    def get_rows(statements):
+        #! (line, statement, [(source line, dependencies)]) of every node
+        if isinstance(statements, Compact_DDG):
+            for i in range(len(statements)):
+                yield statements.line_number(i), statements.statement(i), statements.depends_on(i)
+        else:
+            for stmt in statements:
+                info = dependency_graph.get(str(stmt["code line"]), {})
+                depends_on = [(dep['Node'], dep['Dependency']) for dep in info.get("Depends on", [])]
+                yield stmt["code line"], stmt["statement"], depends_on
     def get_dependency_dict(statements):
-        line_to_stmt = {stmt["code line"]: stmt["statement"] for stmt in statements}
         grouped_statements = defaultdict(list)
+        #! line number -> index of the group the statement lands in (groups are numbered by first use)
+        group_of_line = {}
+        group_index = {}
         first_no_dependency_handled = False
 
-        for stmt in statements:
-            line_num = stmt["code line"]
-            line_str = str(line_num)
-            info = dependency_graph.get(line_str, {})
-            depends_on = info.get("Depends on", [])
-
-            if not depends_on:
-                key = ("none:none",) if not first_no_dependency_handled else ("data:none",)
+        for line_num, statement, depends_on in get_rows(statements):
+            key_parts = [
+                (var, node)
+                for node, dependency in depends_on
+                for var in dependency
+            ]
+            if not key_parts:
                 key = None
                 if first_no_dependency_handled:
                     key = ("none:none",)
                 else:   
-                    if line_to_stmt[line_num].startswith("def"):
+                    if statement.startswith("def"):
                         key = ("args:none",)
                     else:
                         key = ("data:none",)
                     
                 first_no_dependency_handled = True
-                grouped_statements[key].append(line_to_stmt[line_num])
             else:
-                # key_parts = [f"{dep['Dependency'][0]}:{dep['Node']}" for dep in depends_on]
-                key_parts = [
-                    f"{var}:{dep['Node']}"
-                    for dep in depends_on
-                    for var in dep['Dependency']
-                ]
-                key = tuple(sorted(key_parts))
-                grouped_statements[key].append(line_to_stmt[line_num])
-
-        # Convert to list of dicts
-        result = [{"key": key, "statements": stmts} for key, stmts in grouped_statements.items()]
-        return result  
-    def get_line_to_statement_map(statements: List[Dict[str, Any]]) -> Dict[int, str]:
-        return {stmt["code line"]: stmt["statement"] for stmt in statements}
-    def convert_keys_to_dict_indices(grouped_list, line_to_code_mapping):
-        def get_statement_index(grouped_list,code):
-            for i, item in enumerate(grouped_list):
-                if code in item["statements"]:
-                    return i
-            return None
-        for ind,dictionnary in enumerate(grouped_list):
-            keys = dictionnary["key"]
-            keys = list(keys)
-            new_keys = []
-            for key in keys:
-                lineno = key.split(":")
-                new_key = None
-                if lineno[1] == "none":
-                    new_key = key
-                else:
-                    code_line = line_to_code_mapping.get(int(lineno[1]), None)
-                    index = get_statement_index(grouped_list, code_line)
-                    new_key = f'{lineno[0]}:{index}'
-                new_keys.append(new_key) 
-            new_key_tuple = tuple(new_keys)
-            grouped_list[ind]["key"] = new_key_tuple
-        return grouped_list
-    result = get_dependency_dict(statements)
-    line_to_code_mapping = get_line_to_statement_map(statements)
-    result = convert_keys_to_dict_indices(result,  line_to_code_mapping)
-    
-    return result
+                #! sorted on the "var:line" text, the line is replaced by its group index afterwards
+                key = tuple(sorted(key_parts, key=lambda part: f"{part[0]}:{part[1]}"))
+            if key not in group_index:
+                group_index[key] = len(group_index)
+            group_of_line[line_num] = group_index[key]
+            grouped_statements[key].append(statement)
+        return grouped_statements, group_of_line
+    def convert_keys_to_dict_indices(grouped_statements, group_of_line):
+        #! (var, line) parts become "var:group index", statements with the same text are told apart by their line
+        result = []
+        for key, stmts in grouped_statements.items():
+            new_keys = tuple(
+                part if isinstance(part, str) else f"{part[0]}:{group_of_line.get(part[1])}"
+                for part in key
+            )
+            result.append({"key": new_keys, "statements": stmts})
+        return result
+    grouped_statements, group_of_line = get_dependency_dict(statements)
+    return convert_keys_to_dict_indices(grouped_statements, group_of_line)
    
 
-def check_syntax_errors(file_path,error_file="errors.txt"):
-    try:
-        py_compile.compile(file_path, doraise=True)
+def check_syntax_errors(program,error_file="errors.txt"):
+    if program.syntax_error is None:
         return True
-    except py_compile.PyCompileError as e:
-        print(f"Syntax error in {file_path}: {e.msg}")
-        with open(error_file, 'a') as ef:
-            ef.write(f"Syntax error in {file_path}: {e.msg}\n")
-        return False
+    print(f"Syntax error in {program.file_path}: {program.syntax_error}")
+    with open(error_file, 'a') as ef:
+        ef.write(f"Syntax error in {program.file_path}: {program.syntax_error}\n")
+    return False
     
-def build_ddg(file_path):
+def build_ddg(program, cache=None, executor=None):
     try:
-        with open(file_path, 'r') as f:
-            code = f.read()
-
-        # Remove all content between any two "#---------------------------------------------------------------------------------------------------------"   
-        code = re.sub(
-            r"#-+\n.*?\n#-+\n",
-            "",
-            code,
-            flags=re.DOTALL
-        )
-
-        tree = ast.parse(code)
-        tree = AugAssignToAssignTransformer().visit(tree)
-        ast.fix_missing_locations(tree)
-        graph=DDG_Wrapper(tree)
-        graph.build_ddgs()
+        if program.error is not None:
+            raise program.error
+        graph=DDG_Wrapper(program.tree)
+        graph.build_ddgs(cache, executor)
         return graph
     except Exception as e:
-        print(f"Error building DDG for {file_path}: {e}")
+        print(f"Error building DDG for {program.file_path}: {e}")
         return None
-def dependency_analyzer(folder):
-    jsons = sorted(glob.glob(f"{folder}/*.json"))
-    results = []
+def _saved_graphs(folder):
+    #! graph_N_edges.json/graph_N_nodes.json debug pairs, ordered by N
+    jsons = glob.glob(f"{folder}/graph_*_*.json")
     if len(jsons) % 2 != 0:
         raise ValueError("Expected an even number of JSON files (pairs of edges and nodes).")
-    for i in range(0, len(jsons), 2):
-        with open(jsons[i], 'r') as f1, open(jsons[i + 1], 'r') as f2:
+    indices = sorted({int(re.search(r'\d+', os.path.basename(path)).group(0)) for path in jsons})
+    for index in indices:
+        with open(f"{folder}/graph_{index}_edges.json", 'r') as f1, open(f"{folder}/graph_{index}_nodes.json", 'r') as f2:
             edges = json.load(f1)
             nodes = json.load(f2)
-
-        print(f"\nProcessing pair: {os.path.basename(jsons[i])}, {os.path.basename(jsons[i+1])}")
+        yield index, nodes, edges
+def dependency_analyzer(folder, graphs=None, save_path='temp'):
+    '''
+    groups the statements of every graph, graphs is the list of Compact_DDG of the program,
+    if it is not given the graphs are read back from folder/ddg.bin (or the JSON debug files).
+    the groups are saved under save_path/ddg_parsed unless save_path is None.
+    '''
+    source = 'memory'
+    if graphs is None and os.path.exists(f"{folder}/{DDG_ARTIFACT_NAME}"):
+        with DDG_Artifact(f"{folder}/{DDG_ARTIFACT_NAME}") as artifact:
+            graphs = list(artifact.graphs())
+        source = f"{folder}/{DDG_ARTIFACT_NAME}"
+    if graphs is None:
+        pairs = _saved_graphs(folder)
+    else:
+        pairs = ((index, graph, None) for index, graph in enumerate(graphs))
+    results = []
+    for index, nodes, edges in pairs:
+        if graphs is None:
+            print(f"\nProcessing pair: graph_{index}_edges.json, graph_{index}_nodes.json")
+        else:
+            print(f"\nProcessing graph {index} from {source}")
         result = group_by_needs_with_wait_index(nodes, edges)
       
         for entry in result:
@@ -150,10 +151,11 @@ def dependency_analyzer(folder):
             elif data_in_args and not has_data_key:
                 keys.append("data:none")
                 entry["key"] = sorted(set(keys))
-        save_path = 'temp'
-        index = int(re.search(r'\d+', os.path.basename(jsons[i])).group(0))
+            else:
+                entry["key"] = keys
         if index == 0:
-            json.dump(result, open(f"{save_path}/ddg_parsed/main_lists.json", 'w'), indent=4)
+            if save_path is not None:
+                json.dump(result, open(f"{save_path}/ddg_parsed/main_lists.json", 'w'), indent=4)
         else:
             #! remove aggregation keys from the result
             for item in result:
@@ -163,276 +165,469 @@ def dependency_analyzer(folder):
                 ]
             result = [item for item in result if item["statements"]]
 
-            json.dump(result, open(f"{save_path}/ddg_parsed/function{index}_lists.json", 'w'), indent=4)
+            if save_path is not None:
+                json.dump(result, open(f"{save_path}/ddg_parsed/function{index}_lists.json", 'w'), indent=4)
         results.append(result)
     return results
 
-def get_memory_foortprint(file_path, entry_point, functions):
-    def get_file_name(tree):
-        file_name = None
-        for node in tree.body:
-            if isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Name) and target.id == 'FILE_NAME':
-                        if isinstance(node.value, ast.Constant):
-                            file_name = node.value.value
-        return file_name
-    def get_read_file_block(tree):
-        try_node = None
-        for node in tree.body:
-            if isinstance(node, ast.If):
-                # match: if __name__ == '__main__':
-                test = node.test
-                if (
-                    isinstance(test, ast.Compare)
-                    and isinstance(test.left, ast.Name)
-                    and test.left.id == '__name__'
-                    and any(
-                        isinstance(c, ast.Constant) and c.value == '__main__'
-                        for c in test.comparators
-                    )
-                ):
-                    # look for the Try in its body
-                    for inner in node.body:
-                        if isinstance(inner, ast.Try):
-                            try_node = inner
-                            break
-
-        # 4. Unparse (get source for) that Try node
-        if try_node is not None:
-            try_src = ast.unparse(try_node)
-            return try_src
-        else:
-            print("No try/except block found under __main__")
-    def get_func_footprint(func_name, args, functions, func_lines_footprint, global_parser,main_code_line,lineno):
-        def find_func_index(func_name, func_list):
-            for idx, func_tuple in enumerate(func_list):
-                if func_tuple[0] == func_name:
-                    return idx
-            return -1
-        def get_footprint(node,local_parser,func_lines_footprint,original_code):
-            tree = copy.deepcopy(node.body[0])  # Get the first statement in the function body
-            # print(ast.dump(tree, indent=4))  # Debugging: print the AST nodes
-            if isinstance(tree, ast.Assign):
-                #! for x = len(var) case
-                code = ast.unparse(tree)
-                pattern = r"len\((\w+)\)"
-                match = re.search(pattern, code)
-                if match:
-                    var_name = match.group(1)
-                    if var_name in local_parser.vars:
-                        length = local_parser.vars[var_name][0]
-                        modified_code = re.sub(pattern, str(length), code)
-                        print(f"Modified code: {modified_code}")  # Debugging: print the modified code
-                        tree = ast.parse(modified_code).body[0]  
-                    else:
-                        raise ValueError(f"Variable {var_name} not found in local parser variables.")  
-                #! for x = len(var[i])
-                pattern = r"len\((\w+\[\d+\])\)" 
-                match = re.search(pattern, code)
-                if match:
-                    full_index_expr = match.group(1)  # e.g., numeric_data[0]
-                    var_name = full_index_expr.split('[')[0]  # Extract base variable name, e.g., numeric_data
-                    if var_name in local_parser.vars:
-                        length = 420  # Convert to string
-                        # Replace only the matched part
-                        modified_code = code[:match.start()] + str(length) + code[match.end():]
-                        print(f"Modified code: {modified_code}")  # Debugging: print the modified code
-                        tree = ast.parse(modified_code).body[0]
-                    else:
-                        raise ValueError(f"Variable {var_name} not found in local parser variables.")
-                #! skip break and continue statements
-                if (ast.unparse(tree).startswith('break') or ast.unparse(tree).startswith('continue')):
-                    return
-                local_parser._assignmemt_handler(tree)
-            elif  isinstance(tree, ast.AugAssign):
+def footprint_cache_key(cache, function, arg_values, arg_shapes, data_file_identity):
+    #! the footprint only depends on the function body, the argument sizes and shapes and the data file
+    func_name, fargs, body = function
+    return cache.make_key('footprint', normalized_ast(body), fargs, arg_values, arg_shapes, data_file_identity)
+def get_aggregation(node):
+    #! aggregation = "type:list", returns the string (None if it is not a constant)
+    return next((child.value for child in ast.walk(node.value) if isinstance(child, ast.Constant) and isinstance(child.value, str)), None)
+def return_value(cached):
+    #! (size, length, shape) of a cached return, the shape comes back from JSON as a list
+    size, length, shape = cached
+    return size, length, None if shape is None else tuple(shape)
+def get_func_footprint(func_name, args, functions, func_lines_footprint, global_parser,main_code_line,lineno,cache=None,data_file_identity=None):
+    def find_func_index(func_name, func_list):
+        for idx, func_tuple in enumerate(func_list):
+            if func_tuple[0] == func_name:
+                return idx
+        return -1
+    def get_footprint(tree,local_parser,func_lines_footprint,original_code):
+        # print(ast.dump(tree, indent=4))  # Debugging: print the AST nodes
+        #! the line is recorded at its peak: before it ran, after it ran, or the old and new value of a
+        #! rebound name both alive, the return line holds the returned copy on top of everything else
+        before = sum(val[1] for val in local_parser.vars.values())
+        rebound = None
+        if isinstance(tree, ast.Assign) and isinstance(tree.targets[0], ast.Name) and tree.targets[0].id in local_parser.vars:
+            rebound = tree.targets[0].id
+        if isinstance(tree, ast.Assign):
+            #! for x = len(var) and x = len(var[i]) cases
+            transformer = LenToConstantTransformer(local_parser.vars, local_parser._length, local_parser._element_length)
+            tree = ast.fix_missing_locations(transformer.visit(tree))
+            if transformer.modified:
+                print(f"Modified code: {ast.unparse(tree)}")  # Debugging: print the modified code
+            local_parser._assignmemt_handler(tree)
+        elif  isinstance(tree, ast.AugAssign):
+            local_parser._insertion_handler(tree)
+        elif isinstance(tree, ast.Expr):
+            func = tree.value.func.attr 
+            if func in ['insert', 'append', 'extend']:
                 local_parser._insertion_handler(tree)
-            elif isinstance(tree, ast.Expr):
-                func = tree.value.func.attr 
-                if func in ['insert', 'append', 'extend']:
-                    local_parser._insertion_handler(tree)
-                elif func in ['pop', 'remove','clear']:
-                    local_parser._deletion_handler(tree)
-            elif  isinstance(tree, ast.Delete):
-                local_parser._deletion_handler(tree.body[0])
-            elif isinstance(tree, ast.For):
-                local_parser._handle_loop_footprint(tree)
-            elif isinstance(tree, ast.If):
-                local_parser._handle_if_footprint(tree)
-            # print(ast.unparse(node))  # Debugging: print the source code of the node
-            key = f"{main_code_line}#{lineno}:{func_name}"
-            func_lines_footprint[key][original_code] = sum(val[1] for val in local_parser.vars.values())
-        local_parser = Memory_Parser()
-        lines_footprint = {}
-        index = find_func_index(func_name, functions)
-        if index != -1:
-            fargs = functions[index][1]
-            if len(args) != len(fargs):
-                raise ValueError(f"Function {func_name} called with incorrect number of arguments.")
+            elif func in ['pop', 'remove','clear']:
+                local_parser._deletion_handler(tree)
+        elif  isinstance(tree, ast.Delete):
+            local_parser._deletion_handler(tree.body[0])
+        elif isinstance(tree, ast.For):
+            local_parser._handle_loop_footprint(tree)
+        elif isinstance(tree, ast.If):
+            local_parser._handle_if_footprint(tree)
+        elif isinstance(tree, ast.Return) and tree.value is not None:
+            before += local_parser._get_return_size_length(ast.Module(body=[tree], type_ignores=[]))[0]
+        after = sum(val[1] for val in local_parser.vars.values())
+        peak = max(before, after)
+        if rebound is not None and rebound in local_parser.vars:
+            peak = max(peak, before + local_parser.vars[rebound][1])
+        key = f"{main_code_line}#{lineno}:{func_name}"
+        func_lines_footprint[key][original_code] = peak
+    local_parser = Memory_Parser()
+    lines_footprint = {}
+    index = find_func_index(func_name, functions)
+    if index != -1:
+        fargs = functions[index][1]
+        if len(args) != len(fargs):
+            raise ValueError(f"Function {func_name} called with incorrect number of arguments.")
+        else:
+            for i, arg in enumerate(args):
+                local_parser.vars[fargs[i]] = global_parser.vars[arg]
+                if arg in global_parser.shapes:
+                    local_parser.shapes[fargs[i]] = global_parser.shapes[arg]
+        body = functions[index][2]
+        func_def = f"def {func_name}({', '.join(fargs)}):"
+        key = f"{main_code_line}#{lineno}:{func_name}"
+        cache_key = None
+        if cache is not None:
+            cache_key = footprint_cache_key(cache, functions[index], [local_parser.vars[farg] for farg in fargs],
+                                            [local_parser.shapes.get(farg) for farg in fargs], data_file_identity)
+            entry = cache.get(cache_key)
+            if entry is not None:
+                func_lines_footprint[key] = entry['lines']
+                return return_value(entry['return'])
+        args_total_memory = sum(val[1] for val in local_parser.vars.values())
+        func_lines_footprint[key][func_def] = args_total_memory 
+        agg = False
+        for node in body:
+            original_code = ast.unparse(node)
+            # print(ast.dump(node, indent=4))  # Debugging: print the AST nodes
+            node = simplify_statement(node)
+            #! if aggreagation then get the aggregation type instead of the footprint
+            if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name) and node.targets[0].id == 'aggregation':
+                agg = True
+                full_value = get_aggregation(node)
+                if full_value is not None:
+                   agg_type = ''
+                   agg_target = ''
+                   if full_value != "":
+                       agg_type, agg_target = full_value.split(':', 1)
+                   if agg_type in ['c', 'a', 's', 'm', 'n', 'l', 'i','']:
+                       func_lines_footprint[key]["aggregation"] = f"{agg_type}:{agg_target}"
+                   else:
+                       raise ValueError(f"Invalid aggregation type: {full_value}")
             else:
-                for i, arg in enumerate(args):
-                    local_parser.vars[fargs[i]] = global_parser.vars[arg]
-            code = functions[index][2]
-            func_def = f"def {func_name}({', '.join(fargs)}):"
-            args_total_memory = sum(val[1] for val in local_parser.vars.values())
-            key = f"{main_code_line}#{lineno}:{func_name}"
-            func_lines_footprint[key][func_def] = args_total_memory 
-            tree = ast.parse(code)
-            agg = False
-            for node in tree.body:
-                original_code = ast.unparse(node)
-                # print(ast.dump(node, indent=4))  # Debugging: print the AST nodes
-                node = AugAssignToAssignTransformer().visit(node)
-                ast.fix_missing_locations(node)
-                #! assumption deal with multilevel indexing as first level only
-                node = ast.parse(re.sub(r'(\[[^\[\]]+\])(?:\[[^\[\]]+\])+', r'\1', ast.unparse(node)))
-                #! x[i].append() --> x.append()
-                pattern = r'(?:\[\s*[^]]+\s*\])+(?=\.\w+\s*\()'
-                node = ast.parse(re.sub(pattern, '', ast.unparse(node)))
-                #! if aggreagation then get the aggregation type instead of the footprint
-                if ast.unparse(node).startswith('aggregation = '):
-                    agg = True
-                    match = re.search(r'''["'](.*?)["']''', ast.unparse(node))
-                    if match:
-                       agg_type = ''
-                       agg_target = ''
-                       full_value = match.group(1)
-                       if full_value != "":
-                           agg_type, agg_target = full_value.split(':', 1)
-                       letter = match.group(1)
-                       if agg_type in ['c', 'a', 's', 'm', 'n', 'l', 'i','']:
-                           func_lines_footprint[key]["aggregation"] = f"{agg_type}:{agg_target}"
-                           agg = True
-                       else:
-                           raise ValueError(f"Invalid aggregation type: {letter}")
-                else:
-                    get_footprint(node, local_parser, func_lines_footprint,original_code)
-            if not agg:
-                raise ValueError(f"Function {func_name} does not have an aggregation type defined.")
-           
-            return_statement = list(func_lines_footprint[key].keys())[-1]
-            return_footprint_size,return_footprint_length = local_parser._get_return_size_length(ast.parse(return_statement))
-            return return_footprint_size,return_footprint_length 
-                # print(local_parser.vars)
+                get_footprint(node, local_parser, func_lines_footprint,original_code)
+        if not agg:
+            raise ValueError(f"Function {func_name} does not have an aggregation type defined.")
+        for code in local_parser.unresolved:
+            print(f"Size not known, counted once: {code.splitlines()[0]}")
+       
+        return_statement = ast.Module(body=[body[-1]], type_ignores=[])
+        return_footprint_size,return_footprint_length = local_parser._get_return_size_length(return_statement)
+        return_shape = local_parser._value_shape(body[-1].value) if isinstance(body[-1], ast.Return) and body[-1].value else None
+        if cache is not None:
+            cache.put(cache_key, {'lines': func_lines_footprint[key], 'return': [return_footprint_size, return_footprint_length, return_shape]})
+        return return_footprint_size,return_footprint_length,return_shape 
+            # print(local_parser.vars)
+    else:
+        raise ValueError(f"Function {func_name} not found in the provided functions list.")
+def _func_footprint_job(func_name, args, arg_values, arg_shapes, functions, main_code_line, lineno):
+    #! runs in a worker process, the argument sizes and shapes are resolved by the caller
+    global_parser = Memory_Parser()
+    global_parser.vars = arg_values
+    global_parser.shapes = arg_shapes
+    func_lines_footprint = defaultdict(dict)
+    result = get_func_footprint(func_name, args, functions, func_lines_footprint, global_parser, main_code_line, lineno)
+    return func_lines_footprint[f"{main_code_line}#{lineno}:{func_name}"], result
+def resolve_call_footprints(statements, functions, global_parser, executor, cache=None, data_file_identity=None):
+    '''
+    computes the footprint of every user function call of the entry point on the executor.
+    a call is submitted as soon as the calls producing its arguments are done, the results
+    are returned by statement index so the caller can merge them in program order.
+    '''
+    initial_vars = dict(global_parser.vars)
+    initial_shapes = dict(global_parser.shapes)
+    producer = {}  #! variable -> index of the task that last assigned it
+    tasks = []
+    for i, node in enumerate(statements):
+        if not (isinstance(node, ast.Assign) and isinstance(node.value, ast.Call)):
+            continue
+        targets = [target.id for target in node.targets if isinstance(target, ast.Name)]
+        func = node.value.func
+        if isinstance(func, ast.Attribute):
+            inputs = [func.value.id]
+            task = {'index': i, 'method': True, 'node': node.value}
         else:
-            raise ValueError(f"Function {func_name} not found in the provided functions list.")
-            
-    def get_main_footprint(entry_point, functions,global_parser):
-        def get_func_attributes(node, functions):
-            func = value.func
-            if isinstance(func, ast.Name):
-                func_name = func.id
-            elif isinstance(func, ast.Attribute):
-                func_name = func.attr
-            args = []
-            for arg in value.args:
-                if isinstance(arg, ast.Name):
-                    args.append(arg.id)
-                elif isinstance(arg, ast.Constant):
-                    args.append(arg.value)
-                else:
-                    args.append(ast.dump(arg))  # fallback for complex args
+            args = [arg.id if isinstance(arg, ast.Name) else arg.value if isinstance(arg, ast.Constant) else ast.dump(arg) for arg in node.value.args]
+            inputs = args
+            task = {'index': i, 'method': False, 'func_name': func.id if isinstance(func, ast.Name) else func.attr, 'args': args, 'code': ast.unparse(node)}
+        task['sources'] = [producer.get(var) for var in inputs]
+        task['inputs'] = inputs
+        producer[targets[0]] = len(tasks)
+        tasks.append(task)
+
+    outputs = {}  #! task -> value assigned to its target
+    output_shapes = {}  #! task -> shape of the value assigned to its target
+    call_results = {}
+    futures = {}
+    remaining = list(range(len(tasks)))
+    while remaining or futures:
+        progressed = False
+        for t in list(remaining):
+            task = tasks[t]
+            if any(source is not None and source not in outputs for source in task['sources']):
+                continue
+            values = {var: outputs[source] if source is not None else initial_vars[var] for var, source in zip(task['inputs'], task['sources'])}
+            shapes = {var: output_shapes[source] if source is not None else initial_shapes.get(var) for var, source in zip(task['inputs'], task['sources'])}
+            shapes = {var: shape for var, shape in shapes.items() if shape is not None}
+            remaining.remove(t)
+            progressed = True
+            if task['method']:
+                method_parser = Memory_Parser()
+                method_parser.vars = values
+                length, memory_footprint = method_parser._list_method_handler(task['node'])
+                outputs[t] = (length, memory_footprint, 'list')
+                output_shapes[t] = shapes.get(task['inputs'][0])
+                continue
+            index = next((idx for idx, function in enumerate(functions) if function[0] == task['func_name']), -1)
+            cache_key = None
+            if cache is not None and index != -1 and len(task['args']) == len(functions[index][1]):
+                cache_key = footprint_cache_key(cache, functions[index], [values[arg] for arg in task['args']],
+                                                [shapes.get(arg) for arg in task['args']], data_file_identity)
+                entry = cache.get(cache_key)
+                if entry is not None:
+                    size, length, shape = return_value(entry['return'])
+                    call_results[task['index']] = (entry['lines'], (size, length, shape))
+                    outputs[t] = (length, size, 'list')
+                    output_shapes[t] = shape
+                    continue
+            future = executor.submit(_func_footprint_job, task['func_name'], task['args'], values, shapes, functions, task['code'], task['index'])
+            futures[future] = (t, cache_key)
+        if futures and not progressed:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                t, cache_key = futures.pop(future)
+                lines, (size, length, shape) = future.result()
+                call_results[tasks[t]['index']] = (lines, (size, length, shape))
+                outputs[t] = (length, size, 'list')
+                output_shapes[t] = shape
+                if cache_key is not None:
+                    cache.put(cache_key, {'lines': lines, 'return': [size, length, shape]})
+    return call_results
+def get_main_footprint(entry_point, functions, global_parser, cache=None, executor=None, save_path='temp', data_file_identity=None):
+    '''
+    footprint of every line of the entry point and of every function call, global_parser holds the loaded data.
+    returns (main_lines_footprint, func_lines_footprint), main_lines_footprint is a Live_Vars.
+    '''
+    def get_func_attributes(node, functions):
+        value = node.value
+        func = value.func
+        if isinstance(func, ast.Name):
+            func_name = func.id
+        elif isinstance(func, ast.Attribute):
+            func_name = func.attr
+        args = []
+        for arg in value.args:
+            if isinstance(arg, ast.Name):
+                args.append(arg.id)
+            elif isinstance(arg, ast.Constant):
+                args.append(arg.value)
+            else:
+                args.append(ast.dump(arg))  # fallback for complex args
 
-            return func_name, args
-        def substitute_outer_keys(func_dict):
-            new_dict = defaultdict(dict)
-            
-            for func_name, inner_dict in func_dict.items():
-                # Find the function signature from inner keys (starts with 'def ')
-                func_signature = next((k for k in inner_dict if k.startswith('def ')), None)
-                if func_signature:
-                    # Extract actual signature string inside parentheses
-                    old_key = func_name.split(':')[0].strip()  # Get the main code line before the first colon
-                    new_key = func_signature[4:].strip(':')  # Remove 'def ' and any trailing ':'
-                    new_key = f"{old_key}:{new_key}"  # Combine main code line with function signature
-                    new_dict[new_key] = inner_dict
+        return func_name, args
+    def substitute_outer_keys(func_dict):
+        new_dict = defaultdict(dict)
+        
+        for func_name, inner_dict in func_dict.items():
+            # Find the function signature from inner keys (starts with 'def ')
+            func_signature = next((k for k in inner_dict if k.startswith('def ')), None)
+            if func_signature:
+                # Extract actual signature string inside parentheses
+                old_key = func_name.split(':')[0].strip()  # Get the main code line before the first colon
+                new_key = func_signature[4:].strip(':')  # Remove 'def ' and any trailing ':'
+                new_key = f"{old_key}:{new_key}"  # Combine main code line with function signature
+                new_dict[new_key] = inner_dict
+            else:
+                new_dict[func_name] = inner_dict  # fallback if signature not found
+        
+        return new_dict
+       
+    #! only the target of every line changes, a line stores that one variable
+    main_lines_footprint = Live_Vars(global_parser.vars)
+    func_lines_footprint = defaultdict(dict)
+    #! augmented assignments are already rewritten in the program tree
+    statements = entry_point
+    call_results = {}
+    if executor is not None:
+        call_results = resolve_call_footprints(statements, functions, global_parser, executor, cache, data_file_identity)
+    for i,node in enumerate(statements):
+        if isinstance(node, ast.Assign):
+            targets = [target.id for target in node.targets if isinstance(target, ast.Name)]
+            value = node.value
+            #! assumptions: only 1 return value, return value is of type list
+            main_lines_footprint.record(ast.unparse(node))
+            if isinstance(value, ast.Call):
+                #! handle .copy() method
+                if isinstance(value.func, ast.Attribute):
+                    length,memory_footprint = global_parser._list_method_handler(value)
+                    global_parser.vars[targets[0]] = (length, memory_footprint, 'list')
+                    global_parser._set_shape(targets[0], global_parser.shapes.get(value.func.value.id))
+                    line_code = ast.unparse(node)
+                    key = f"{line_code}#{i}:copy()"
+                    value = {f"return {value.func.value.id}.copy()":memory_footprint}
+                    func_lines_footprint[key] = value
                 else:
-                    new_dict[func_name] = inner_dict  # fallback if signature not found
-            
-            return new_dict
-           
-        tree = ast.parse(entry_point)
-        main_lines_footprint = {}
-        func_lines_footprint = defaultdict(dict)
-        for i,node in enumerate(tree.body):
-            node = AugAssignToAssignTransformer().visit(node)
-            ast.fix_missing_locations(node)
-            if isinstance(node, ast.Assign):
-                targets = [target.id for target in node.targets if isinstance(target, ast.Name)]
-                value = node.value
-                #! assumptions: only 1 return value, return value is of type list
-                main_lines_footprint[ast.unparse(node)] = global_parser.vars.copy()
-                if isinstance(value, ast.Call):
-                    #! handle .copy() method
-                    if isinstance(value.func, ast.Attribute):
-                        length,memory_footprint = global_parser._list_method_handler(value)
-                        global_parser.vars[targets[0]] = (length, memory_footprint, 'list')
-                        line_code = ast.unparse(node)
-                        key = f"{line_code}#{i}:copy()"
-                        value = {f"return {value.func.value.id}.copy()":memory_footprint}
-                        func_lines_footprint[key] = value
+                    func_name, args = get_func_attributes(node, functions)
+                    if i in call_results:
+                        lines, (return_footprint_size,return_footprint_length,return_shape) = call_results[i]
+                        func_lines_footprint[f"{ast.unparse(node)}#{i}:{func_name}"] = lines
                     else:
-                        func_name, args = get_func_attributes(node, functions)
-                        return_footprint_size,return_footprint_length = get_func_footprint(func_name, args, functions,func_lines_footprint,global_parser,ast.unparse(node),i)
-                        global_parser.vars[targets[0]] = (return_footprint_length,return_footprint_size,'list')
-        main_lines_footprint = {
-            outer_key: {
-                inner_key: {'length': val[0], 'size': val[1]}
-                for inner_key, val in inner_dict.items()
-            }
-            for outer_key, inner_dict in main_lines_footprint.items()
-        }        
-        # print("Main Lines Footprint:", main_lines_footprint)
-        json.dump(main_lines_footprint, open('temp/memory_parsed/main_lines_footprint.json', 'w'), indent=4)
-        func_lines_footprint = substitute_outer_keys(func_lines_footprint)
-        # print("Function Lines Footprint:", func_lines_footprint)
-        json.dump(func_lines_footprint, open('temp/memory_parsed/func_lines_footprint.json', 'w'), indent=4)                
-                        
-            
-                
+                        return_footprint_size,return_footprint_length,return_shape = get_func_footprint(func_name, args, functions,func_lines_footprint,global_parser,ast.unparse(node),i,cache,data_file_identity)
+                    global_parser.vars[targets[0]] = (return_footprint_length,return_footprint_size,'list')
+                    global_parser._set_shape(targets[0], return_shape)
+                main_lines_footprint.set(targets[0], global_parser.vars[targets[0]])
+    # print("Main Lines Footprint:", main_lines_footprint)
+    func_lines_footprint = substitute_outer_keys(func_lines_footprint)
+    # print("Function Lines Footprint:", func_lines_footprint)
+    if save_path is not None:
+        main_lines_footprint.save(f'{save_path}/memory_parsed/main_lines_footprint.json')
+        json.dump(func_lines_footprint, open(f'{save_path}/memory_parsed/func_lines_footprint.json', 'w'), indent=4)                
+    return main_lines_footprint, func_lines_footprint
+def load_data_file(program, cache=None, save_path='temp', sample_rows=DATA_SAMPLE_ROWS, confidence=DATA_SIZE_CONFIDENCE):
+    '''
+    Memory_Parser holding the list the data loading block of program builds, as data.
+    its data_model is the sample_data_file() model when sample_rows is not 0.
+    '''
     memory_parser = Memory_Parser()
-    tree = ast.parse(open(file_path, 'r').read())
-    file_name = get_file_name(tree)
-    read_file_block = get_read_file_block(tree)
-    read_file_block = read_file_block.replace("FILE_NAME", f"'{file_name}'")
-    read_file_ast = ast.parse(read_file_block)
-    memory_parser._file_handler(read_file_ast)
+    if program.read_file_block is None:
+        raise ValueError("No try/except block found under __main__")
+    read_file_ast = program.read_file_block
+    data_file_identity = file_identity(program.file_name)
+    file_key = None
+    if cache is not None and data_file_identity is not None:
+        file_key = cache.make_key('datafile', normalized_ast(read_file_ast), data_file_identity, sample_rows, confidence)
+        entry = cache.get(file_key)
+        if entry is not None:
+            memory_parser.vars.update({var: tuple(value) for var, value in entry['vars'].items()})
+            memory_parser.shapes.update({var: tuple(shape) for var, shape in entry['shapes'].items()})
+            memory_parser.data_model = entry['data_model']
+    if file_key is None or entry is None:
+        memory_parser._file_handler(read_file_ast, sample_rows, confidence)
+        if file_key is not None:
+            cache.put(file_key, {'vars': memory_parser.vars, 'shapes': memory_parser.shapes, 'data_model': memory_parser.data_model})
+    if save_path is not None and memory_parser.data_model is not None:
+        json.dump(memory_parser.data_model, open(f'{save_path}/memory_parsed/data_model.json', 'w'), indent=4)
     memory_parser.vars['data'] = memory_parser.vars['lines']
     del memory_parser.vars['lines']  
-    get_main_footprint(entry_point, functions, memory_parser)
-    # print(memory_parser.vars)
-def main():
-    error_file = "errors.txt"
-    if len(sys.argv) < 2:
-        print("Usage: python Parallelizer .py <filename>")
-        sys.exit(1)
-
-    filename = sys.argv[1]
-    # filename= 'testcases/sobel/sobel.py'
-    #! Check for syntax errors
-    if check_syntax_errors(filename, error_file):
+    memory_parser._set_shape('data', memory_parser.shapes.pop('lines', None))
+    return memory_parser
+def get_memory_foortprint(program, cache=None, executor=None, save_path='temp', sample_rows=DATA_SAMPLE_ROWS, confidence=DATA_SIZE_CONFIDENCE):
+    '''
+    footprint of every line of the entry point and of every function call, program is the Parsed_Program.
+    the size of the loaded data comes from sample_rows rows of the data file (upper bound at confidence).
+    returns (main_lines_footprint, func_lines_footprint).
+    '''
+    memory_parser = load_data_file(program, cache, save_path, sample_rows, confidence)
+    return get_main_footprint(program.entry_point_body, program.functions, memory_parser, cache, executor, save_path,
+                              file_identity(program.file_name))
+def _count_ddg(counts, graph):
+    counts['graphs'] = len(graph.ddgs)
+    counts['nodes'] = sum(len(ddg.nodes) for ddg in graph.ddgs)
+    counts['edges'] = sum(len(ddg.edges) for ddg in graph.ddgs)
+def analyse(filename, error_file, cache=None, executor=None, debug_json=False, profiler=None, sample_rows=DATA_SAMPLE_ROWS, confidence=DATA_SIZE_CONFIDENCE):
+    '''
+    runs the analysis stages and leaves their outputs in temp/, every stage is recorded
+    in profiler (a Stage_Profiler) when one is given. sample_rows and confidence are
+    passed to get_memory_foortprint.
+    '''
+    if profiler is None:
+        profiler = Stage_Profiler(trace_memory=False)
+    with profiler.stage('syntax') as counts:
+        #! the file is read and parsed once, every stage gets the same program
+        program = Parsed_Program(filename)
+        counts['lines'] = program.source.count('\n') + 1
+        #! Check for syntax errors
+        syntax_ok = check_syntax_errors(program, error_file)
+    if syntax_ok:
        print(f"1. Syntax check passed for {filename}.")
     
-    graph = build_ddg(filename)
-    functions = None
-    entry_point = None
+    with profiler.stage('ddg') as counts:
+        graph = build_ddg(program, cache, executor)
+        if graph:
+            if debug_json:
+                graph.save_to_json('temp')
+            _count_ddg(counts, graph)
+        elif os.path.exists(f"temp/{DDG_ARTIFACT_NAME}"):
+            #! left by an earlier run, it describes another program
+            os.remove(f"temp/{DDG_ARTIFACT_NAME}")
     if graph:
         print(f"2. DDG built successfully for {filename}.")
         # graph.visualize_graph_data()
-        graph.save_to_json('temp')
-        functions = graph.parser.functions
-        entry_point= graph.parser.entry_point
     else:
         print(f"2. Failed to build DDG for {filename}. Check {error_file} for details.")   
     
-    dep_2d_list = dependency_analyzer('temp')
+    dep_2d_list = []
+    if graph:
+        with profiler.stage('grouping') as counts:
+            dep_2d_list = dependency_analyzer('temp', graph.compact_ddgs)
+            counts['groups'] = sum(len(groups) for groups in dep_2d_list)
+            #! the grouping read the text of every statement, the artifact reuses it instead of unparsing
+            write_artifact(f"temp/{DDG_ARTIFACT_NAME}", graph.compact_ddgs, graph.variables)
     if dep_2d_list:
         print(f"3. Dependency analysis completed for {filename}.")
     
-    get_memory_foortprint(filename,entry_point,functions)
+    with profiler.stage('footprint') as counts:
+        main_lines_footprint, func_lines_footprint = get_memory_foortprint(program,cache,executor,'temp',sample_rows,confidence)
+        counts['main_lines'] = len(main_lines_footprint)
+        counts['calls'] = len(func_lines_footprint)
     print(f"4. Memory footprint analysis completed for {filename}.")
-        
-    
+def run_pipeline(filename, nodes_data, cache=None, executor=None, output_dir=None, error_file="errors.txt", timings=None, profiler=None,
+                 sample_rows=DATA_SAMPLE_ROWS, confidence=DATA_SIZE_CONFIDENCE):
+    '''
+    syntax check, DDG, dependency grouping, memory footprint and scheduling in one process,
+    every stage hands its python objects to the next one. output_dir gets the usual temp/ layout
+    (ddg.bin, ddg_parsed/, memory_parsed/) and the scheduler outputs, nothing is written if it is None.
+    every stage (and scheduler phase) is recorded in profiler when a Stage_Profiler is given,
+    the wall time of every stage is recorded in timings when a dict is given.
+    returns the results of every stage in a dict.
+    '''
+    if profiler is None:
+        profiler = Stage_Profiler(trace_memory=False)
+    if timings is not None:
+        profiler.timings = timings
+    save_path = None
+    if output_dir is not None:
+        save_path = output_dir
+        os.makedirs(os.path.join(output_dir, 'ddg_parsed'), exist_ok=True)
+        os.makedirs(os.path.join(output_dir, 'memory_parsed'), exist_ok=True)
+    with profiler.stage('syntax') as counts:
+        program = Parsed_Program(filename)
+        counts['lines'] = program.source.count('\n') + 1
+        syntax_ok = check_syntax_errors(program, error_file)
+    if not syntax_ok:
+        return None
+    with profiler.stage('ddg') as counts:
+        graph = build_ddg(program, cache, executor)
+        if graph is not None:
+            _count_ddg(counts, graph)
+        elif output_dir is not None and os.path.exists(os.path.join(output_dir, DDG_ARTIFACT_NAME)):
+            #! left by an earlier run, it describes another program
+            os.remove(os.path.join(output_dir, DDG_ARTIFACT_NAME))
+    if graph is None:
+        return None
+    with profiler.stage('grouping') as counts:
+        groups = dependency_analyzer(output_dir, graph.compact_ddgs, save_path)
+        counts['groups'] = sum(len(graph_groups) for graph_groups in groups)
+        if output_dir is not None:
+            #! the grouping read the text of every statement, the artifact reuses it instead of unparsing
+            write_artifact(os.path.join(output_dir, DDG_ARTIFACT_NAME), graph.compact_ddgs, graph.variables)
+    with profiler.stage('footprint') as counts:
+        main_lines_footprint, func_lines_footprint = get_memory_foortprint(program, cache, executor, save_path, sample_rows, confidence)
+        counts['main_lines'] = len(main_lines_footprint)
+        counts['calls'] = len(func_lines_footprint)
+    with profiler.stage('schedule', blocks=len(groups[0])):
+        schedule = run_schedule(groups[0], main_lines_footprint, func_lines_footprint, nodes_data, output_dir, profiler)
+    return {
+        'graph': graph,
+        'groups': groups,
+        'main_lines_footprint': main_lines_footprint,
+        'func_lines_footprint': func_lines_footprint,
+        'schedule': schedule,
+    }
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Analyse a submission: syntax check, DDG, dependency grouping and memory footprint.")
+    parser.add_argument('filename', help='Path to the submission to analyse.')
+    parser.add_argument('--cache-dir', default=os.path.join('temp', 'cache'), help='Folder of the persistent analysis cache.')
+    parser.add_argument('--cache-size', type=int, default=64, help='Maximum cache size in MB before least recently used entries are evicted.')
+    parser.add_argument('--no-cache', action='store_true', help='Re-analyse everything without reading or writing the cache.')
+    parser.add_argument('--debug-json', action='store_true', help='Also write every DDG as temp/graph_N_nodes.json and graph_N_edges.json.')
+    parser.add_argument('--jobs', type=int, default=1, help='Worker processes for per-function DDGs and call site footprints (1 runs serially).')
+    parser.add_argument('--sample-rows', type=int, default=DATA_SAMPLE_ROWS, help='Rows of the data file measured to size the loaded data (0 uses the file size).')
+    parser.add_argument('--size-confidence', type=float, default=DATA_SIZE_CONFIDENCE, help='Confidence of the upper bound used as the size of the loaded data.')
+    parser.add_argument('--profile', metavar='REPORT', help='Write wall/cpu time, peak traced memory and counts of every stage to REPORT (JSON).')
+    parser.add_argument('--profile-table', action='store_true', help='Print the per-stage profile as a table.')
+    return parser
+def run_cli(args, cache=None):
+    '''
+    runs the analysis for parsed command line arguments, cache is the Analysis_Cache to use (None when disabled).
+    '''
+    error_file = "errors.txt"
+    filename = args.filename
+    # filename= 'testcases/sobel/sobel.py'
+    executor = None
+    if args.jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=args.jobs)
+    #! memory tracing slows the analysis down, it is only on when a profile is asked for
+    profiler = Stage_Profiler() if args.profile or args.profile_table else None
+    try:
+        analyse(filename, error_file, cache, executor, args.debug_json, profiler, args.sample_rows, args.size_confidence)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if args.profile:
+            profiler.save(args.profile, file=filename, jobs=args.jobs, cache=cache is not None)
+        if args.profile_table:
+            print(profiler.table())
+    if cache is not None:
+        print(cache.report())
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    cache = None if args.no_cache else Analysis_Cache(args.cache_dir, args.cache_size * 1024 * 1024)
+    run_cli(args, cache)
 
 if __name__ == "__main__":
     main()
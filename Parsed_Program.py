@@ -0,0 +1,106 @@
+import ast
+import py_compile
+import re
+from copy import deepcopy
+from Memory_Estimator import AugAssignToAssignTransformer
+
+#! blocks between two "#-----" lines (data loading, saving the output) are not analysed
+PROTECTED_BLOCK = re.compile(r"#-+\n.*?\n#-+\n", re.DOTALL)
+
+def is_main_guard(node):
+    #! if __name__ == '__main__':
+    test = node.test
+    return (isinstance(test, ast.Compare) and isinstance(test.left, ast.Name) and test.left.id == '__name__'
+            and any(isinstance(c, ast.Constant) and c.value == '__main__' for c in test.comparators))
+
+def protected_lines(source):
+    '''
+    (first, last) line ranges covered by protected blocks.
+    '''
+    spans = []
+    for match in PROTECTED_BLOCK.finditer(source):
+        first = source.count('\n', 0, match.start()) + 1
+        last = first + match.group(0).count('\n') - 1
+        if match.start() > 0 and source[match.start() - 1] != '\n':
+            #! the block starts after code on the same line, that code is kept
+            first += 1
+        spans.append((first, last))
+    return spans
+
+class Protected_Block_Remover(ast.NodeTransformer):
+    def __init__(self, spans):
+        self.spans = spans
+    def visit(self, node):
+        if isinstance(node, ast.stmt) and any(first <= node.lineno and node.end_lineno <= last for first, last in self.spans):
+            return None
+        return super().visit(node)
+
+class Name_To_Constant(ast.NodeTransformer):
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+    def visit_Name(self, node):
+        if node.id == self.name:
+            return ast.copy_location(ast.Constant(value=self.value), node)
+        return node
+
+class Parsed_Program:
+    '''
+    a submission read and parsed once, every stage of the analysis works on this object.
+    tree is the analysed module: protected blocks removed and augmented assignments rewritten.
+    file_name and read_file_block (FILE_NAME substituted) come from the module as written.
+    '''
+    def __init__(self, file_path, source=None):
+        self.file_path = file_path
+        if source is None:
+            with open(file_path, 'r') as f:
+                source = f.read()
+        self.source = source
+        self.error = None
+        self.tree = None
+        self.file_name = None
+        self.read_file_block = None
+        self.functions = []
+        self.entry_point_body = None
+        try:
+            module = ast.parse(source, file_path)
+            #! compiling the tree also reports what the parser accepts (e.g. return outside a function)
+            compile(module, file_path, 'exec', dont_inherit=True)
+        except Exception as e:
+            self.error = e
+            return
+        self._extract_data_loading(module)
+        module = Protected_Block_Remover(protected_lines(source)).visit(module)
+        module = AugAssignToAssignTransformer().visit(module)
+        self.tree = ast.fix_missing_locations(module)
+        self._extract_snippets()
+    @property
+    def syntax_error(self):
+        #! same message py_compile gives, None if the program compiles
+        if self.error is None:
+            return None
+        return py_compile.PyCompileError(type(self.error), self.error, self.file_path).msg
+    def _extract_data_loading(self, module):
+        try_node = None
+        for node in module.body:
+            if isinstance(node, ast.Assign):
+                for target in node.targets:
+                    if isinstance(target, ast.Name) and target.id == 'FILE_NAME' and isinstance(node.value, ast.Constant):
+                        self.file_name = node.value.value
+            elif isinstance(node, ast.If) and is_main_guard(node):
+                try_node = next((inner for inner in node.body if isinstance(inner, ast.Try)), try_node)
+        if try_node is not None:
+            #! removed from tree later on, keep an untouched copy
+            self.read_file_block = Name_To_Constant('FILE_NAME', self.file_name).visit(deepcopy(try_node))
+    def _extract_snippets(self):
+        entry_point = None
+        for node in self.tree.body:
+            if isinstance(node, ast.FunctionDef):
+                #! (name, arguements, body statements)
+                self.functions.append((node.name, [arg.arg for arg in node.args.args], node.body))
+            elif isinstance(node, ast.If):
+                entry_point = node
+        if entry_point is not None:
+            self.entry_point_body = entry_point.body if is_main_guard(entry_point) else [entry_point]
+    def function(self, name):
+        return next((function for function in self.functions if function[0] == name), None)
@@ -0,0 +1,78 @@
+import contextlib
+import json
+import time
+import tracemalloc
+
+class Stage_Profiler:
+    '''
+    records the wall time, cpu time, peak traced memory and item counts of every analysis stage.
+    stages can be nested (the scheduler phases run inside the schedule stage), the peak of a stage
+    includes its children and is measured above the memory in use when the stage started.
+    the wall time of every stage is also stored in timings (seconds by stage name).
+    '''
+    def __init__(self, trace_memory=True, timings=None):
+        self.trace_memory = trace_memory
+        self.timings = timings if timings is not None else {}
+        self.stages = []
+        #! (record, traced memory at start, highest peak seen so far) of the open stages
+        self._stack = []
+        self._started_tracing = False
+    @contextlib.contextmanager
+    def stage(self, name, **counts):
+        '''
+        times the body of the with block, it gets the counts dict of the stage to fill in.
+        '''
+        record = {'stage': name, 'parent': self._stack[-1][0]['stage'] if self._stack else None,
+                  'depth': len(self._stack), 'wall': 0.0, 'cpu': 0.0, 'peak_bytes': None, 'counts': dict(counts)}
+        self.stages.append(record)
+        start_memory = 0
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            start_memory, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                #! the peak is reset for this stage, keep what the parent reached so far
+                self._stack[-1][2] = max(self._stack[-1][2], peak)
+            tracemalloc.reset_peak()
+        frame = [record, start_memory, 0]
+        self._stack.append(frame)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record['counts']
+        finally:
+            record['wall'] = time.perf_counter() - wall
+            record['cpu'] = time.process_time() - cpu
+            self.timings[name] = record['wall']
+            self._stack.pop()
+            if self.trace_memory and tracemalloc.is_tracing():
+                peak = max(tracemalloc.get_traced_memory()[1], frame[2])
+                record['peak_bytes'] = max(peak - start_memory, 0)
+                if self._stack:
+                    self._stack[-1][2] = max(self._stack[-1][2], peak)
+                elif self._started_tracing:
+                    tracemalloc.stop()
+                    self._started_tracing = False
+    def report(self, **meta):
+        '''
+        JSON serializable report, meta (e.g. the analysed file) is stored as is.
+        '''
+        top = [record for record in self.stages if record['depth'] == 0]
+        return dict(meta,
+                    memory_traced=self.trace_memory,
+                    total_wall=sum(record['wall'] for record in top),
+                    total_cpu=sum(record['cpu'] for record in top),
+                    stages=self.stages)
+    def save(self, path, **meta):
+        with open(path, 'w') as f:
+            json.dump(self.report(**meta), f, indent=4)
+    def table(self):
+        from tabulate import tabulate
+        rows = []
+        for record in self.stages:
+            peak = f"{record['peak_bytes'] / 1024:.1f}" if record['peak_bytes'] is not None else '-'
+            counts = ', '.join(f"{key}={value}" for key, value in record['counts'].items())
+            #! tabulate strips leading spaces, nested stages are marked instead
+            rows.append(['- ' * record['depth'] + record['stage'], f"{record['wall'] * 1000:.1f}",
+                         f"{record['cpu'] * 1000:.1f}", peak, counts])
+        return tabulate(rows, headers=['stage', 'wall ms', 'cpu ms', 'peak KiB', 'counts'], tablefmt='github')
@@ -0,0 +1,236 @@
+from Memory_Estimator import Memory_Parser, scaled_data_size, DATA_SAMPLE_ROWS, DATA_SIZE_CONFIDENCE
+from Parsed_Program import Parsed_Program
+from Live_Vars import Live_Vars
+from fractions import Fraction
+import argparse
+import contextlib
+import io
+import json
+
+#! three row and column counts fit every term up to N**2 * M**2 exactly, the check point is off the grid
+GRID_ROWS = (1000, 10000, 100000)
+GRID_COLUMNS = (8, 64, 512)
+CHECK_SIZE = (31623, 181)
+#! the simple form is kept when it is this close (relative) to every point of the grid
+FIT_TOLERANCE = 1e-3
+BILINEAR_TERMS = ((1, 1), (1, 0), (0, 1), (0, 0))
+
+def _term_name(powers):
+    names = [name if power == 1 else f"{name}^{power}" for name, power in zip('NM', powers) if power]
+    return '*'.join(names) or '1'
+
+def _parse_term(name):
+    powers = [0, 0]
+    if name != '1':
+        for factor in name.split('*'):
+            symbol, _, power = factor.partition('^')
+            powers['NM'.index(symbol)] = int(power or 1)
+    return tuple(powers)
+
+def _solve(matrix, vector):
+    #! gauss jordan on fractions, the systems are small and exact
+    size = len(matrix)
+    rows = [[Fraction(value) for value in row] + [Fraction(value)] for row, value in zip(matrix, vector)]
+    for col in range(size):
+        pivot = next(r for r in range(col, size) if rows[r][col] != 0)
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        rows[col] = [value / rows[col][col] for value in rows[col]]
+        for r in range(size):
+            if r != col and rows[r][col] != 0:
+                rows[r] = [value - rows[r][col] * pivot_value for value, pivot_value in zip(rows[r], rows[col])]
+    return [row[size] for row in rows]
+
+def _least_squares(points, values, terms):
+    #! coefficients of terms (powers of N and M) closest to values at points
+    design = [[Fraction(n) ** n_power * Fraction(m) ** m_power for n_power, m_power in terms] for n, m in points]
+    normal = [[sum(row[i] * row[j] for row in design) for j in range(len(terms))] for i in range(len(terms))]
+    return _solve(normal, [sum(row[i] * value for row, value in zip(design, values)) for i in range(len(terms))])
+
+class Size_Expression:
+    '''
+    polynomial in the number of rows N and columns M of the data file, coefficients maps
+    (power of N, power of M) to the coefficient of the term.
+    '''
+    def __init__(self, coefficients):
+        self.coefficients = {powers: coefficient for powers, coefficient in coefficients.items() if coefficient}
+        #! flat terms, calling the expression is a handful of multiplications
+        self._terms = tuple((coefficient, powers[0], powers[1]) for powers, coefficient in self.coefficients.items())
+    def __call__(self, rows, columns):
+        return round(sum(coefficient * rows ** n_power * columns ** m_power for coefficient, n_power, m_power in self._terms))
+    def __str__(self):
+        terms = sorted(self.coefficients.items(), key=lambda item: (-sum(item[0]), -item[0][0]))
+        text = ' + '.join(f"{coefficient:.6g}" + ('' if powers == (0, 0) else f"*{_term_name(powers)}") for powers, coefficient in terms)
+        return text.replace('+ -', '- ') or '0'
+    def to_json(self):
+        return {_term_name(powers): coefficient for powers, coefficient in self.coefficients.items()}
+    @classmethod
+    def from_json(cls, data):
+        return cls({_parse_term(name): coefficient for name, coefficient in data.items()})
+    @classmethod
+    def fit(cls, rows, columns, values):
+        '''
+        expression through values[i][j] at (rows[i], columns[j]). a*N*M + b*N + c*M + d when it is within
+        FIT_TOLERANCE of every value, else one term per power of N below len(rows) times power of M below
+        len(columns). terms worth less than half a byte on the grid are left out.
+        '''
+        points = [(n, m) for n in rows for m in columns]
+        values = [Fraction(value) for row in values for value in row]
+        full = [(n_power, m_power) for n_power in range(len(rows)) for m_power in range(len(columns))]
+        for terms in (BILINEAR_TERMS, full):
+            coefficients = dict(zip(terms, _least_squares(points, values, terms)))
+            largest = {powers: max(abs(Fraction(n) ** powers[0] * m ** powers[1]) for n, m in points) for powers in terms}
+            coefficients = {powers: coefficient for powers, coefficient in coefficients.items() if abs(coefficient) * largest[powers] >= 0.5}
+            error = max(abs(sum(c * n ** p * m ** q for (p, q), c in coefficients.items()) - value) / max(abs(value), 1)
+                        for (n, m), value in zip(points, values))
+            if error <= FIT_TOLERANCE:
+                break
+        return cls({powers: float(coefficient) for powers, coefficient in coefficients.items()})
+
+def _leaves(tree, path=()):
+    #! (path, value) of every number or string in nested dicts
+    for key, value in tree.items():
+        if isinstance(value, dict) and value:
+            yield from _leaves(value, path + (key,))
+        else:
+            yield path + (key,), value
+
+def _rebuild(leaves):
+    tree = {}
+    for path, value in leaves:
+        node = tree
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+    return tree
+
+class Symbolic_Footprint:
+    '''
+    main_lines_footprint (as Live_Vars.to_json() writes it) and func_lines_footprint of a program with a
+    Size_Expression of the rows N and columns M of the data file in place of every number (strings such as
+    aggregations are kept as they are). fit_error is the largest relative error of the expressions at CHECK_SIZE.
+    '''
+    def __init__(self, main_lines_footprint, func_lines_footprint, fit_error=None, meta=None):
+        self.main_lines_footprint = main_lines_footprint
+        self.func_lines_footprint = func_lines_footprint
+        self.fit_error = fit_error
+        self.meta = meta or {}
+    @classmethod
+    def fit(cls, footprint, rows=GRID_ROWS, columns=GRID_COLUMNS, check=CHECK_SIZE, meta=None):
+        '''
+        footprint(rows, columns) is (main_lines_footprint, func_lines_footprint) for a data file of that shape,
+        it is called on every point of the grid and on check.
+        '''
+        grid = [[dict(_leaves(dict(enumerate(footprint(n, m))))) for m in columns] for n in rows]
+        expressions = []
+        for path, value in grid[0][0].items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = Size_Expression.fit(rows, columns, [[grid[i][j][path] for j in range(len(columns))] for i in range(len(rows))])
+            expressions.append((path, value))
+        fit_error = 0.0
+        if check is not None:
+            actual = dict(_leaves(dict(enumerate(footprint(*check)))))
+            for path, expression in expressions:
+                if isinstance(expression, Size_Expression):
+                    fit_error = max(fit_error, abs(expression(*check) - actual[path]) / max(abs(actual[path]), 1))
+        tree = _rebuild(expressions)
+        return cls(tree.get(0, {}), tree.get(1, {}), fit_error, meta)
+    def _map(self, function):
+        leaves = [((0,) + path, value) for path, value in _leaves(self.main_lines_footprint)]
+        leaves += [((1,) + path, value) for path, value in _leaves(self.func_lines_footprint)]
+        tree = _rebuild([(path, function(value) if isinstance(value, Size_Expression) else value) for path, value in leaves])
+        return tree.get(0, {}), tree.get(1, {})
+    def evaluate(self, rows, columns):
+        '''
+        (main_lines_footprint, func_lines_footprint) for a data file of rows rows and columns columns,
+        in the form get_memory_foortprint returns them.
+        '''
+        main_lines_footprint, func_lines_footprint = self._map(lambda expression: expression(rows, columns))
+        return Live_Vars.from_json(main_lines_footprint), func_lines_footprint
+    def to_json(self):
+        main_lines_footprint, func_lines_footprint = self._map(Size_Expression.to_json)
+        return dict(self.meta, fit_error=self.fit_error, main_lines_footprint=main_lines_footprint,
+                    func_lines_footprint=func_lines_footprint)
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_json(), f, indent=4)
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        main_lines_footprint = data.pop('main_lines_footprint')
+        func_lines_footprint = data.pop('func_lines_footprint')
+        fit_error = data.pop('fit_error', None)
+        #! an expression is a dict of terms, the deepest level of both trees
+        def parse(tree, depth):
+            return {key: (parse(value, depth - 1) if depth > 1 else Size_Expression.from_json(value)) if isinstance(value, dict) else value
+                    for key, value in tree.items()}
+        if 'changes' in main_lines_footprint:
+            main_lines_footprint = dict(main_lines_footprint, changes=parse(main_lines_footprint['changes'], 3))
+        else:
+            #! saved before the lines were stored as changes, one snapshot per line
+            main_lines_footprint = parse(main_lines_footprint, 3)
+        return cls(main_lines_footprint, parse(func_lines_footprint, 2), fit_error, data)
+    def table(self, rows=None, columns=None):
+        '''
+        the expression of every line of every function call, with its value for rows and columns when given.
+        '''
+        from tabulate import tabulate
+        lines = []
+        evaluate = rows is not None and columns is not None
+        for call, footprint in self.func_lines_footprint.items():
+            lines.append([call, '', ''] if evaluate else [call, ''])
+            for line, expression in footprint.items():
+                if isinstance(expression, Size_Expression):
+                    line = '- ' + line.splitlines()[0] + (' ...' if '\n' in line else '')
+                    lines.append([line, str(expression), expression(rows, columns)] if evaluate else [line, str(expression)])
+        headers = ['function / line', 'bytes'] + ([f"N={rows} M={columns}"] if evaluate else [])
+        return tabulate(lines, headers=headers, tablefmt='github')
+
+def symbolic_memory_footprint(program, cache=None, sample_rows=DATA_SAMPLE_ROWS, confidence=DATA_SIZE_CONFIDENCE):
+    '''
+    Symbolic_Footprint of program (a Parsed_Program), the data file is measured once and the entry point
+    is analysed for data files of every size of the grid shaped like it. sample_rows can not be 0, the
+    shape of a row comes from the sampled rows.
+    '''
+    #! the scheduler loads saved expressions without the analysis modules
+    from Parallelizer import load_data_file, get_main_footprint
+    data_parser = load_data_file(program, cache, None, sample_rows or DATA_SAMPLE_ROWS, confidence)
+    model = data_parser.data_model
+    def footprint(rows, columns):
+        parser = Memory_Parser()
+        parser.vars = dict(data_parser.vars)
+        parser.vars['data'] = (rows, scaled_data_size(model, rows, columns), 'list')
+        parser.shapes = dict(data_parser.shapes, data=(rows, columns))
+        #! the estimator reports the lines it rewrites, once per grid point is noise
+        with contextlib.redirect_stdout(io.StringIO()):
+            main_lines_footprint, func_lines_footprint = get_main_footprint(program.entry_point_body, program.functions, parser, save_path=None)
+        #! only the changes of every line are fitted
+        return main_lines_footprint.to_json(), func_lines_footprint
+    meta = {'file': program.file_path, 'data_file': program.file_name,
+            'measured': {'rows': model['rows'], 'columns': len(model['columns'])}}
+    return Symbolic_Footprint.fit(footprint, meta=meta)
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory footprints of a submission as expressions of the rows N and columns M of its data file.")
+    parser.add_argument('filename', help='Path to the submission to analyse.')
+    parser.add_argument('--rows', type=int, help='Also evaluate the expressions for a data file of this many rows (needs --columns).')
+    parser.add_argument('--columns', type=int, help='Number of columns used with --rows.')
+    parser.add_argument('--save', metavar='JSON', help='Write the expressions to JSON (scheduler.py --symbolic reads it).')
+    parser.add_argument('--sample-rows', type=int, default=DATA_SAMPLE_ROWS, help='Rows of the data file measured to know the size of a row.')
+    parser.add_argument('--size-confidence', type=float, default=DATA_SIZE_CONFIDENCE, help='Confidence of the upper bound of the data size.')
+    args = parser.parse_args()
+    if (args.rows is None) != (args.columns is None):
+        parser.error('--rows and --columns go together')
+
+    program = Parsed_Program(args.filename)
+    if program.error is not None:
+        parser.exit(1, f"{program.syntax_error}\n")
+    symbolic = symbolic_memory_footprint(program, None, args.sample_rows, args.size_confidence)
+    print(symbolic.table(args.rows, args.columns))
+    print(f"\nN = rows, M = columns of {program.file_name} (measured: {symbolic.meta['measured']['rows']} x "
+          f"{symbolic.meta['measured']['columns']}), largest fit error {symbolic.fit_error:.2%}.")
+    if args.save:
+        symbolic.save(args.save)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#! Compare the memory and traversal cost of the object DDG against the array backed Compact_DDG.
+#! usage: python benchmarks/bench_compact_ddg.py [--sizes 1000 10000 100000] [--repeat 3]
+import argparse
+import ast
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from DDG import DDG_Wrapper, Compact_DDG, Variable_Table
+from Parallelizer import group_by_needs_with_wait_index
+from bench_ddg import generate_program
+
+
+def object_nbytes(ddg):
+    '''
+    bytes held by the DDG_Node/DDG_Edge objects, their attribute dicts and has/needs/dependency lists
+    (statement text and ASTs excluded, as in Compact_DDG.nbytes).
+    '''
+    total = sys.getsizeof(ddg.nodes) + sys.getsizeof(ddg.edges)
+    for node in ddg.nodes:
+        total += sys.getsizeof(node) + sys.getsizeof(node.__dict__) + sys.getsizeof(node.has) + sys.getsizeof(node.needs)
+    for edge in ddg.edges:
+        total += sys.getsizeof(edge) + sys.getsizeof(edge.__dict__) + sys.getsizeof(edge.dependencies)
+    return total
+
+
+def traverse_objects(ddg):
+    #! what a consumer of the objects does: index edges by destination then walk every node
+    incoming = {}
+    for edge in ddg.edges:
+        incoming.setdefault(edge.dest, []).append(edge)
+    count = 0
+    for node in ddg.nodes:
+        count += len(node.needs)
+        for edge in incoming.get(node.line_number, ()):
+            count += len(edge.dependencies)
+    return count
+
+
+def traverse_compact(graph):
+    count = 0
+    needs_offsets, in_offsets, dep_offsets = graph.needs_offsets, graph.in_offsets, graph.dep_offsets
+    for i in range(len(graph)):
+        count += needs_offsets[i + 1] - needs_offsets[i]
+        for e in range(in_offsets[i], in_offsets[i + 1]):
+            count += dep_offsets[e + 1] - dep_offsets[e]
+    return count
+
+
+def best_of(repeat, func, *args):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench(n_statements, repeat, group_limit=100000):
+    graph = DDG_Wrapper(ast.parse(generate_program(n_statements)))
+    graph.build_ddgs()
+    ddg = graph.ddgs[0]
+    #! materializes the statement text first so neither side pays for unparsing
+    node_json, edge_json = ddg.save_to_json()
+    nodes, edges = json.loads(node_json), json.loads(edge_json)
+    compact = Compact_DDG.from_ddg(ddg, Variable_Table())
+    assert traverse_objects(ddg) == traverse_compact(compact)
+    row = {
+        "statements": n_statements,
+        "object bytes": object_nbytes(ddg),
+        "compact bytes": compact.nbytes(),
+        "object walk": best_of(repeat, traverse_objects, ddg),
+        "compact walk": best_of(repeat, traverse_compact, compact),
+    }
+    if n_statements <= group_limit:
+        row["group dicts"] = best_of(repeat, group_by_needs_with_wait_index, nodes, edges)
+        row["group compact"] = best_of(repeat, group_by_needs_with_wait_index, compact)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and traversal benchmark of the compact DDG.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--group-limit", type=int, default=100000, help="largest size group_by_needs_with_wait_index is timed on")
+    args = parser.parse_args()
+    print(f"{'stmts':>8} {'object MB':>10} {'compact MB':>11} {'ratio':>6} {'obj walk s':>11} {'csr walk s':>11} {'group dicts s':>14} {'group compact s':>16}")
+    for n in args.sizes:
+        row = bench(n, args.repeat, args.group_limit)
+        group_dicts = f"{row['group dicts']:.3f}" if "group dicts" in row else "-"
+        group_compact = f"{row['group compact']:.3f}" if "group compact" in row else "-"
+        print(f"{row['statements']:>8} {row['object bytes'] / 2**20:>10.2f} {row['compact bytes'] / 2**20:>11.2f} "
+              f"{row['object bytes'] / row['compact bytes']:>5.1f}x {row['object walk']:>11.4f} {row['compact walk']:>11.4f} "
+              f"{group_dicts:>14} {group_compact:>16}")
+
+
+if __name__ == "__main__":
+    main()
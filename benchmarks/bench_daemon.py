@@ -0,0 +1,96 @@
+#! Compare the latency of a cold Parallelizer.py run against the same request sent to a warm Analysis_Server.py.
+#! usage: python benchmarks/bench_daemon.py [--files testcases/*/<name>.py] [--repeat 3]
+import argparse
+import glob
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from Batch_Runner import get_data_file_name
+
+
+def default_files():
+    #! the submission of every testcase folder is the file named after the folder
+    return [path for path in sorted(glob.glob(os.path.join(ROOT, "testcases", "*", "*.py")))
+            if os.path.basename(os.path.dirname(path)) == os.path.splitext(os.path.basename(path))[0]]
+
+
+def prepare_workspace(files):
+    folder = tempfile.mkdtemp(prefix="bench_daemon_")
+    os.makedirs(os.path.join(folder, "temp", "ddg_parsed"))
+    os.makedirs(os.path.join(folder, "temp", "memory_parsed"))
+    for path in files:
+        file_name = get_data_file_name(path)
+        if file_name and not os.path.exists(os.path.join(folder, file_name)):
+            #! a small numeric table, only its size matters to the analysis
+            with open(os.path.join(folder, file_name), "w") as f:
+                f.write(",".join(f"c{i}" for i in range(8)) + "\n")
+                for row in range(50):
+                    f.write(",".join(str(row * 8 + i) for i in range(8)) + "\n")
+    return folder
+
+
+def wait_for_server(socket_path, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(socket_path)
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("analysis server did not start")
+
+
+def best_of(repeat, command, cwd):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold CLI vs warm daemon latency.")
+    parser.add_argument("--files", nargs="+", default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    files = [os.path.abspath(path) for path in (args.files or default_files())]
+    folder = prepare_workspace(files)
+    socket_path = os.path.join(folder, "analysis.sock")
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, "Analysis_Server.py"), "--socket", socket_path],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_server(socket_path)
+        cold = [sys.executable, os.path.join(ROOT, "Parallelizer.py")]
+        client = [sys.executable, os.path.join(ROOT, "Analysis_Client.py"), "--socket", socket_path]
+        print(f"{'program':<36} {'cold CLI ms':>12} {'daemon ms':>10} {'daemon+cache ms':>16} {'speedup':>8}")
+        totals = [0.0, 0.0, 0.0]
+        for path in files:
+            row = [
+                best_of(args.repeat, cold + [path, "--no-cache"], folder),
+                best_of(args.repeat, client + [path, "--no-cache"], folder),
+                #! the first repeat fills the cache, the best one is a warm hit
+                best_of(args.repeat + 1, client + [path], folder),
+            ]
+            totals = [total + value for total, value in zip(totals, row)]
+            print(f"{os.path.basename(path):<36} {row[0] * 1000:>12.1f} {row[1] * 1000:>10.1f} {row[2] * 1000:>16.1f} {row[0] / row[2]:>7.1f}x")
+        print(f"{'total':<36} {totals[0] * 1000:>12.1f} {totals[1] * 1000:>10.1f} {totals[2] * 1000:>16.1f} {totals[0] / totals[2]:>7.1f}x")
+        subprocess.run(client + ["--shutdown-server"], stdout=subprocess.DEVNULL)
+        server.wait(timeout=10)
+    finally:
+        if server.poll() is None:
+            server.terminate()
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#! Profile of a large CSV: the previous line iterating _file_handler against profile_data_file (mmap + numpy).
+#! usage: python benchmarks/bench_data_profile.py [--mb 256] [--repeat 3] [--file data.csv]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from Memory_Estimator import profile_data_file
+
+
+def write_csv(path, mb):
+    row = b"".join(b"%d,%d.5,name %d,%d\n" % (i, i * 3, i % 97, i % 7) for i in range(1000))
+    with open(path, "wb") as f:
+        f.write(b"id,value,name,group\n")
+        for _ in range(mb * 1024 * 1024 // len(row) + 1):
+            f.write(row)
+
+
+def line_iteration(path):
+    #! what _file_handler did before: size, one pass counting lines, one more read for the first line
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        rows = sum(1 for _ in f)
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        first_line = f.readline()
+        columns = len(first_line.strip().split()) if first_line else 0
+    return {"size": size, "rows": rows, "columns": columns}
+
+
+def best_of(repeat, func, path):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the data file profile on a large CSV.")
+    parser.add_argument("--mb", type=int, default=256, help="size of the generated CSV")
+    parser.add_argument("--file", help="profile this file instead of generating one")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    folder = None
+    path = args.file
+    if path is None:
+        folder = tempfile.mkdtemp(prefix="bench_data_profile_")
+        path = os.path.join(folder, "data.csv")
+        write_csv(path, args.mb)
+    try:
+        print(f"{path}: {os.path.getsize(path) / 1024 / 1024:.0f} MB")
+        old, old_result = best_of(args.repeat, line_iteration, path)
+        new, new_result = best_of(args.repeat, profile_data_file, path)
+        print(f"  line iteration     {old * 1000:>9.1f} ms  rows={old_result['rows']} columns={old_result['columns']}")
+        print(f"  profile_data_file  {new * 1000:>9.1f} ms  rows={new_result['rows']} columns={new_result['columns']}")
+        print(f"  row lengths: {new_result['row_length_histogram']}")
+        if old_result["rows"] != new_result["rows"]:
+            sys.exit("row counts differ")
+    finally:
+        if folder is not None:
+            os.remove(path)
+            os.rmdir(folder)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#! Benchmark DDG construction on synthetic programs of increasing size.
+#! usage: python benchmarks/bench_ddg.py [--sizes 1000 10000 100000] [--repeat 1] [--files testcases/*/*.py]
+import argparse
+import ast
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from DDG import DDG_Wrapper
+from Parallelizer import build_ddg
+from Parsed_Program import Parsed_Program
+
+
+def generate_program(n_statements, n_functions=4):
+    '''
+    builds a submission-like program with a few user functions and an entry point
+    of n_statements calls chained through previously defined variables.
+    '''
+    lines = []
+    for f in range(n_functions):
+        lines.append(f"def func{f}(x, y):")
+        lines.append("    result = []")
+        lines.append("    for item in x:")
+        lines.append("        result.append(item)")
+        lines.append("    total = len(result) + len(y)")
+        lines.append("    aggregation = \"c:result\"")
+        lines.append("    return result")
+    lines.append("if __name__ == '__main__':")
+    lines.append("    v0 = data")
+    for i in range(1, n_statements):
+        a = f"v{i - 1}"
+        b = f"v{(i * 7) % i}"
+        lines.append(f"    v{i} = func{i % n_functions}({a}, {b})")
+    return "\n".join(lines) + "\n"
+
+
+def bench(n_statements, repeat=1):
+    tree = ast.parse(generate_program(n_statements))
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        graph = DDG_Wrapper(tree)
+        graph.build_ddgs()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_file(file_path, repeat=1):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        graph = build_ddg(Parsed_Program(file_path))
+        #! statement text is only materialized when it is exported
+        for ddg in graph.ddgs:
+            ddg.save_to_json()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DDG construction scaling benchmark.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='Number of entry point statements per synthetic program.')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per size (best time is reported).')
+    parser.add_argument('--files', nargs='*', default=[], help='Submissions to time through build_ddg and JSON export.')
+    args = parser.parse_args()
+
+    if args.files:
+        total = 0
+        print(f"{'file':<60} {'ms':>10}")
+        for file_path in args.files:
+            elapsed = bench_file(file_path, args.repeat)
+            total += elapsed
+            print(f"{file_path:<60} {elapsed * 1e3:>10.2f}")
+        print(f"{'total':<60} {total * 1e3:>10.2f}")
+        return
+
+    print(f"{'statements':>12} {'seconds':>10} {'us/stmt':>10} {'scaling':>10}")
+    previous = None
+    for n in args.sizes:
+        elapsed = bench(n, args.repeat)
+        scaling = f"{elapsed / previous[1] / (n / previous[0]):.2f}" if previous else "-"
+        print(f"{n:>12} {elapsed:>10.3f} {elapsed / n * 1e6:>10.1f} {scaling:>10}")
+        previous = (n, elapsed)
+    print("scaling = time ratio / size ratio (1.0 means linear)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#! Accuracy of the memory estimator: every testcase runs on generated data of several sizes, the real peak of every
+#! function call (tracemalloc, per line) and of the whole run (RSS) is compared with the static estimates.
+#! usage: python benchmarks/bench_estimate_accuracy.py [--rows 50 200 800] [--timeout 120] [--history FILE] [programs ...]
+import argparse
+import contextlib
+import datetime
+import glob
+import io
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from Parsed_Program import Parsed_Program
+from Parallelizer import get_memory_foortprint
+from scheduler import calculate_peak_memory_for_statements, function_peak_memory
+
+CALIBRATOR = os.path.join(ROOT, "Footprint_Calibrator.py")
+#! the testcases read numbers, images are 32 x 32 pixels per row
+COLUMNS = {"pixels.csv": 1024}
+DEFAULT_COLUMNS = 8
+HISTORY = os.path.join(ROOT, "benchmarks", "estimate_accuracy_history.jsonl")
+
+
+def write_csv(path, rows, columns, seed):
+    generator = random.Random(seed)
+    with open(path, "w") as f:
+        f.write(",".join(f"c{i}" for i in range(columns)) + "\n")
+        for _ in range(rows):
+            f.write(",".join(str(generator.randint(0, 255)) for _ in range(columns)) + "\n")
+
+
+def run_child(command, timeout):
+    #! (exit status, peak RSS in bytes) of a child, os.wait4 gives the usage of that child alone
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    timer = threading.Timer(timeout, process.kill)
+    timer.start()
+    try:
+        _, status, usage = os.wait4(process.pid, 0)
+    finally:
+        timer.cancel()
+    process.returncode = os.waitstatus_to_exitcode(status)
+    stderr = process.stderr.read().decode(errors="replace")
+    process.stderr.close()
+    return process.returncode, usage.ru_maxrss * 1024, stderr
+
+
+def measure(program_path, rows, timeout, folder, seed):
+    '''
+    static estimates and measurements of one program on a generated file of rows data rows.
+    '''
+    with open(program_path) as f:
+        source = f.read()
+    file_name = Parsed_Program(program_path).file_name
+    columns = COLUMNS.get(os.path.basename(file_name or ""), DEFAULT_COLUMNS)
+    data_path = os.path.join(folder, f"data_{rows}.csv")
+    write_csv(data_path, rows, columns, seed)
+    copy_path = os.path.join(folder, os.path.basename(program_path))
+    with open(copy_path, "w") as f:
+        f.write(re.sub(r"^FILE_NAME\s*=.*$", f"FILE_NAME = {data_path!r}", source, count=1, flags=re.M))
+    result = {"rows": rows, "columns": columns, "calls": {}}
+
+    program = Parsed_Program(copy_path)
+    try:
+        #! the estimator reports the lines it rewrites
+        with contextlib.redirect_stdout(io.StringIO()):
+            main_lines, func_lines = get_memory_foortprint(program, save_path=None)
+    except Exception as e:
+        result["error"] = f"estimate: {type(e).__name__}: {e}"
+        return result
+    statements = list(main_lines)
+    result["program_estimate"] = calculate_peak_memory_for_statements(statements, main_lines, func_lines,
+                                                                      {stmt: i for i, stmt in enumerate(statements)})
+
+    result_path = os.path.join(folder, f"measured_{rows}.json")
+    status, rss, stderr = run_child([sys.executable, CALIBRATOR, "--worker", copy_path, data_path, result_path], timeout)
+    if status != 0:
+        result["error"] = f"run: {(stderr.strip().splitlines() or ['killed after timeout'])[-1]}"
+        return result
+    with open(result_path) as f:
+        measured = json.load(f)
+    result["program_rss"] = rss
+    for call, lines in func_lines.items():
+        estimate = function_peak_memory(lines)
+        actual = function_peak_memory(measured.get(call, {}))
+        result["calls"][call] = {"estimate": estimate, "measured": actual,
+                                 "error": (estimate - actual) / actual if actual else None}
+    return result
+
+
+def summary(results):
+    errors = [abs(call["error"]) for result in results for call in result["calls"].values() if call["error"] is not None]
+    if not errors:
+        return {"calls": 0}
+    return {"calls": len(errors), "median_abs_error": statistics.median(errors), "mean_abs_error": statistics.fmean(errors),
+            "max_abs_error": max(errors)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory estimates with measured peaks on generated data.")
+    parser.add_argument("programs", nargs="*", help="submissions to measure (default: every testcase)")
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 200, 800], help="data rows of the generated files")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds a run may take before it is stopped")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history", default=HISTORY, help="JSON lines file the summary of every run is appended to")
+    parser.add_argument("--no-history", action="store_true", help="do not append this run to the history")
+    args = parser.parse_args()
+    from tabulate import tabulate
+
+    programs = args.programs or sorted(glob.glob(os.path.join(ROOT, "testcases", "*", "*.py")))
+    programs = [path for path in programs if Parsed_Program(path).read_file_block is not None and Parsed_Program(path).functions]
+    table = []
+    results = {}
+    for path in programs:
+        name = os.path.splitext(os.path.basename(path))[0]
+        results[name] = []
+        #! RSS of a worker that stops once the program is parsed
+        baseline = run_child([sys.executable, "-c", f"import sys; sys.path.insert(0, {ROOT!r}); import Footprint_Calibrator; "
+                              f"Footprint_Calibrator.Parsed_Program({path!r})"], args.timeout)[1]
+        for rows in args.rows:
+            with tempfile.TemporaryDirectory(prefix="bench_accuracy_") as folder:
+                result = measure(path, rows, args.timeout, folder, args.seed)
+            results[name].append(result)
+            if "error" in result:
+                table.append([name, rows, result["error"], "", "", ""])
+                continue
+            for call, numbers in result["calls"].items():
+                error = "" if numbers["error"] is None else f"{numbers['error']:+.1%}"
+                table.append([name, rows, call.split("#")[0], numbers["estimate"], numbers["measured"], error])
+            rss = max(result["program_rss"] - baseline, 0)
+            error = f"{(result['program_estimate'] - rss) / rss:+.1%}" if rss else ""
+            table.append([name, rows, "(whole run, RSS above start)", result["program_estimate"], rss, error])
+    print(tabulate(table, headers=["program", "rows", "call", "estimate", "measured", "error"], tablefmt="github"))
+
+    by_size = {rows: summary([result for runs in results.values() for result in runs if result["rows"] == rows]) for rows in args.rows}
+    overall = summary([result for runs in results.values() for result in runs])
+    print()
+    for rows, numbers in by_size.items():
+        if numbers["calls"]:
+            print(f"{rows:>6} rows: median |error| {numbers['median_abs_error']:.1%}  mean {numbers['mean_abs_error']:.1%}  "
+                  f"max {numbers['max_abs_error']:.1%}  ({numbers['calls']} calls)")
+    if not overall["calls"]:
+        return
+    print(f"   all rows: median |error| {overall['median_abs_error']:.1%}  mean {overall['mean_abs_error']:.1%}")
+
+    previous = None
+    if os.path.exists(args.history):
+        with open(args.history) as f:
+            lines = [line for line in f if line.strip()]
+        previous = json.loads(lines[-1]) if lines else None
+    if previous is not None and previous.get("rows") == args.rows:
+        change = overall["median_abs_error"] - previous["summary"]["median_abs_error"]
+        print(f"   previous run ({previous['commit']}): median |error| {previous['summary']['median_abs_error']:.1%} ({change:+.1%})")
+    if not args.no_history:
+        entry = {"time": datetime.datetime.now().isoformat(timespec="seconds"), "commit": git_commit(), "rows": args.rows,
+                 "seed": args.seed, "summary": overall, "by_rows": {str(rows): numbers for rows, numbers in by_size.items()},
+                 "calls": {f"{name}:{call.split('#')[0]}": {str(result["rows"]): result["calls"][call]["error"] for result in runs if call in result["calls"]}
+                           for name, runs in results.items() for result in runs for call in result["calls"]}}
+        with open(args.history, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#! Micro-benchmark of group_by_needs_with_wait_index on large entry points.
+#! usage: python benchmarks/bench_group.py [--sizes 1000 10000 50000] [--repeat 3]
+import argparse
+import ast
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from DDG import DDG_Wrapper
+from Parallelizer import group_by_needs_with_wait_index
+from bench_ddg import generate_program
+
+
+def best_of(repeat, *args):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        group_by_needs_with_wait_index(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling of group_by_needs_with_wait_index with the entry point size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(f"{'stmts':>8} {'dicts s':>9} {'compact s':>10} {'us/stmt':>8}")
+    for n in args.sizes:
+        graph = DDG_Wrapper(ast.parse(generate_program(n)))
+        graph.build_ddgs()
+        node_json, edge_json = graph.ddgs[0].save_to_json()
+        nodes, edges = json.loads(node_json), json.loads(edge_json)
+        compact = graph.compact_ddgs[0]
+        dicts = best_of(args.repeat, nodes, edges)
+        arrays = best_of(args.repeat, compact)
+        print(f"{n:>8} {dicts:>9.3f} {arrays:>10.3f} {dicts / n * 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#! Startup budget check: cold import of Parallelizer measured with -X importtime.
+#! usage: python benchmarks/bench_import.py [--budget-ms 100] [--repeat 5] [--module Parallelizer]
+#! exits with status 1 when the import goes over budget or loads a module that should stay lazy.
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+#! only needed by visualization/debug paths, importing them at startup is a regression
+LAZY_MODULES = ['matplotlib', 'networkx', 'tabulate', 'termcolor', 'pandas', 'numpy']
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(module, pycache):
+    '''
+    runs a fresh interpreter importing module and returns {module name: (self us, cumulative us)}
+    for the top level imports of every module it loaded.
+    '''
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=pycache)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            times[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if a cold import of the analysis modules goes over budget.")
+    parser.add_argument("--module", default="Parallelizer")
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports listed")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_import_") as pycache:
+        #! the first run only compiles the bytecode, the budget is about importing it
+        import_times(args.module, pycache)
+        runs = [import_times(args.module, pycache) for _ in range(args.repeat)]
+    best = min(runs, key=lambda times: times[args.module][1])
+    total_ms = best[args.module][1] / 1000
+
+    print(f"{'module':<40} {'self ms':>8} {'cumulative ms':>14}")
+    for name, (self_us, cumulative_us) in sorted(best.items(), key=lambda item: -item[1][1])[:args.top]:
+        print(f"{name:<40} {self_us / 1000:>8.1f} {cumulative_us / 1000:>14.1f}")
+
+    failures = []
+    loaded = sorted({name for name in best for lazy in LAZY_MODULES if name == lazy or name.startswith(lazy + ".")})
+    if loaded:
+        failures.append(f"modules that should load lazily were imported: {', '.join(loaded)}")
+    if total_ms > args.budget_ms:
+        failures.append(f"import {args.module} took {total_ms:.1f} ms, budget is {args.budget_ms:.1f} ms")
+    print(f"\nimport {args.module}: {total_ms:.1f} ms (best of {args.repeat}), budget {args.budget_ms:.1f} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#! Benchmark the analysis with --jobs on a synthetic pipeline of many user functions.
+#! usage: python benchmarks/bench_jobs.py [--functions 40] [--statements 30] [--jobs 1 2 4] [--repeat 1]
+import argparse
+import contextlib
+import csv
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from Parallelizer import analyse
+
+
+def generate_pipeline(n_functions=40, n_statements=30):
+    '''
+    builds a submission with n_functions stages of n_statements each, half of the
+    stages read the data directly and the other half chain on the previous stage.
+    '''
+    lines = ["import csv", "FILE_NAME = 'test.csv'"]
+    for f in range(n_functions):
+        lines.append(f"def stage{f}(data):")
+        lines.append("    header = data[0]")
+        lines.append("    rows = data[1:]")
+        lines.append("    new_data = [header]")
+        for s in range(n_statements):
+            lines.append(f"    tmp{s} = [{s}]")
+            lines.append(f"    tmp{s}.append({s})")
+        lines.append("    for row in rows:")
+        lines.append("        val = int(row[0])")
+        lines.append("        new_val = val + 1")
+        lines.append("        to_add = str(new_val)")
+        lines.append("        new_data.append([to_add])")
+        lines.append("    aggregation = \"c:new_data\"")
+        lines.append("    return new_data")
+    lines.append("if __name__ == '__main__':")
+    lines.append("#" + "-" * 105)
+    lines.append("    def infer_type(value):")
+    lines.append("        try:")
+    lines.append("            return int(value)")
+    lines.append("        except ValueError:")
+    lines.append("            return value.strip()")
+    lines.append("    try:")
+    lines.append("        with open(FILE_NAME, 'r') as file:")
+    lines.append("            lines = file.readlines()")
+    lines.append("            data = [[infer_type(cell) for cell in line.strip().split(',')] for line in lines]")
+    lines.append("    except FileNotFoundError:")
+    lines.append("        print('File not found.')")
+    lines.append("#" + "-" * 105)
+    for f in range(n_functions):
+        source = "data" if f % 2 == 0 or f == 1 else f"r{f - 1}"
+        lines.append(f"    r{f} = stage{f}({source})")
+    lines.append(f"    output = r{n_functions - 1}")
+    return "\n".join(lines) + "\n"
+
+
+def prepare_workspace(n_functions, n_statements, n_rows=20000):
+    folder = tempfile.mkdtemp(prefix="bench_jobs_")
+    os.makedirs(os.path.join(folder, "temp", "ddg_parsed"))
+    os.makedirs(os.path.join(folder, "temp", "memory_parsed"))
+    with open(os.path.join(folder, "submission.py"), "w") as f:
+        f.write(generate_pipeline(n_functions, n_statements))
+    with open(os.path.join(folder, "test.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["value", "label"])
+        for i in range(n_rows):
+            writer.writerow([i, f"row{i}"])
+    return folder
+
+
+def read_outputs(folder):
+    outputs = {}
+    for dirpath, _, filenames in os.walk(os.path.join(folder, "temp")):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            with open(path, "rb") as f:
+                outputs[os.path.relpath(path, folder)] = f.read()
+    return outputs
+
+
+def run(folder, jobs):
+    cwd = os.getcwd()
+    os.chdir(folder)
+    try:
+        executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+        try:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                analyse("submission.py", "errors.txt", None, executor)
+            elapsed = time.perf_counter() - start
+        finally:
+            if executor is not None:
+                executor.shutdown()
+    finally:
+        os.chdir(cwd)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial and process pool analysis of a many-function pipeline.")
+    parser.add_argument("--functions", type=int, default=40)
+    parser.add_argument("--statements", type=int, default=30, help="extra statements per function")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    folder = prepare_workspace(args.functions, args.statements)
+    try:
+        print(f"{args.functions} functions, {os.cpu_count()} CPUs available")
+        print(f"{'jobs':>6} {'time (s)':>10} {'speedup':>8} {'identical':>10}")
+        reference = None
+        baseline = None
+        for jobs in args.jobs:
+            best = min(run(folder, jobs) for _ in range(args.repeat))
+            outputs = read_outputs(folder)
+            if reference is None:
+                reference, baseline = outputs, best
+            print(f"{jobs:>6} {best:>10.3f} {baseline / best:>7.2f}x {str(outputs == reference):>10}")
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    main()
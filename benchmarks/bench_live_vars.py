@@ -0,0 +1,65 @@
+#! Live variables of an entry point of n lines: a copy of every variable per line against Live_Vars, which
+#! stores the one variable each line assigns. time to build, JSON size and time of the scheduler's lookups.
+#! usage: python benchmarks/bench_live_vars.py [--max-power 3] [--vars 50] [--repeat 3]
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from Live_Vars import Live_Vars
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def copies(lines, initial):
+    #! what get_main_footprint stored before, a snapshot of every variable per line
+    current = dict(initial)
+    snapshots = {}
+    for i in range(lines):
+        snapshots[f"x{i} = f(x{i - 1})"] = {var: {'length': value[0], 'size': value[1]} for var, value in current.items()}
+        current[f"x{i}"] = (i, 1000 + i, 'list')
+    return snapshots
+
+
+def deltas(lines, initial):
+    live_vars = Live_Vars(initial)
+    for i in range(lines):
+        live_vars.record(f"x{i} = f(x{i - 1})")
+        live_vars.set(f"x{i}", (i, 1000 + i, 'list'))
+    return live_vars
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and size of per-line live variable snapshots.")
+    parser.add_argument("--max-power", type=int, default=3, help="largest entry point is 10 ** max-power lines (the copies grow as its square)")
+    parser.add_argument("--vars", type=int, default=50, help="variables alive before the first line")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    initial = {f"v{i}": (i, 100 * i, 'list') for i in range(args.vars)}
+    for power in range(1, args.max_power + 1):
+        lines = 10 ** power
+        statements = [f"x{i} = f(x{i - 1})" for i in range(lines)]
+        old, new = copies(lines, initial), deltas(lines, initial)
+        old_build = best_of(args.repeat, lambda: copies(lines, initial))
+        new_build = best_of(args.repeat, lambda: deltas(lines, initial))
+        old_size, new_size = len(json.dumps(old)), len(json.dumps(new.to_json()))
+        #! the scheduler reads the total of a line and single arguments
+        old_query = best_of(args.repeat, lambda: [(sum(v['size'] for v in old[s].values()), old[s].get('v0')) for s in statements])
+        new_query = best_of(args.repeat, lambda: [(new.total_size(s), new.value(s, 'v0')) for s in statements])
+        print(f"10^{power:<3} build {old_build * 1e3:>9.2f} -> {new_build * 1e3:>7.2f} ms   json {old_size:>11} -> {new_size:>9} bytes"
+              f"   lookups {old_query * 1e3:>9.2f} -> {new_query * 1e3:>7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#! Time of the loop accounting of Memory_Parser as the number of iterations grows, it should stay flat.
+#! usage: python benchmarks/bench_loop_footprint.py [--max-power 8] [--repeat 5]
+import argparse
+import ast
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from Memory_Estimator import Memory_Parser
+
+STATEMENTS = {
+    'append': "x.append(d[0])",
+    'extend': "x.extend([1, 2.5, 'abc', y])",
+    'pop': "x.pop()",
+}
+
+
+def new_parser(iterations):
+    parser = Memory_Parser()
+    parser.vars = {'x': (iterations + 1, 120 * (iterations + 1), 'list'), 'y': (28, 28, 'int'),
+                   'd': (1000, 180000, 'list')}
+    return parser
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the loop accounting of the memory estimator.")
+    parser.add_argument("--max-power", type=int, default=8, help="largest loop is 10 ** max-power iterations")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    for name, code in STATEMENTS.items():
+        tree = ast.parse(code).body[0]
+        handler = Memory_Parser._deletion_handler if name == 'pop' else Memory_Parser._insertion_handler
+        loop = ast.parse(f"for i in range(10):\n    {code}\n").body[0]
+        print(name)
+        for power in range(1, args.max_power + 1):
+            iterations = 10 ** power
+            loop.iter.args[0].value = iterations
+            repeated = best_of(args.repeat, lambda: handler(new_parser(iterations), tree, iterations))
+            in_loop = best_of(args.repeat, lambda: new_parser(iterations)._handle_loop_footprint(loop))
+            print(f"  10^{power:<3} in_loop {repeated * 1e6:>8.1f} us   for loop {in_loop * 1e6:>8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
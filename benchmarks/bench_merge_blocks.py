@@ -0,0 +1,111 @@
+#! Time of process_and_merge_blocks and consolidate_to_block_format on synthetic block DAGs as the number of blocks grows.
+#! every block assigns a few variables and depends on up to --fan-in earlier blocks, a node fits about --fit blocks.
+#! every merged program is checked to read no variable before a block produces it.
+#! usage: python benchmarks/bench_merge_blocks.py [--blocks 100 300 1000 3000] [--fan-in 2] [--fit 4] [--repeat 1]
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from Live_Vars import Live_Vars
+from scheduler import process_and_merge_blocks, consolidate_to_block_format, as_func_footprints
+
+
+def synthetic_program(n_blocks, fan_in, fit, seed):
+    '''
+    (blocks, live vars, function footprints, nodes) of a program of n_blocks blocks.
+    '''
+    generator = random.Random(seed)
+    blocks, live_vars, func_footprints = [], Live_Vars({'data': (1000, 50000, 'list')}), {}
+    for i in range(n_blocks):
+        dependencies = sorted(generator.sample(range(i), min(i, generator.randint(1, fan_in)))) if i else []
+        #! keys are 'var:i' with i the index of the block it comes from, as the grouping writes them
+        keys = [f"v{d}_0:{d}" for d in dependencies] or ["data:none"]
+        args = ', '.join(key.split(':')[0] for key in keys)
+        statements = []
+        for j in range(generator.randint(1, 3)):
+            statement = f"v{i}_{j} = f{i}_{j}({args})"
+            statements.append(statement)
+            live_vars.record(statement)
+            live_vars.set(f"v{i}_{j}", (100, generator.randint(1000, 5000), 'list'))
+            func_footprints[f"{statement}#{len(func_footprints)}:f{i}_{j}(a)"] = {"def f(a):": 0, "return a": generator.randint(1000, 20000)}
+        blocks.append({"key": keys, "statements": statements})
+    nodes = [{"name": "node1", "memory": 15000 * fit}, {"name": "node2", "memory": 25000 * fit}]
+    return blocks, live_vars, func_footprints, nodes
+
+
+def check_order(blocks):
+    '''
+    every argument of every statement of the blocks, in order, is assigned by an earlier statement.
+    '''
+    assigned = {'data'}
+    for i, block in enumerate(blocks):
+        for statement in block['statements']:
+            target, call = statement.split(' = ')
+            args = {arg.strip() for arg in call[call.index('(') + 1:-1].split(',') if arg.strip()}
+            assert args <= assigned, f"block {i} runs '{statement}' before {sorted(args - assigned)} is assigned"
+            assigned.add(target)
+
+
+def check_chain():
+    '''
+    c reads a from block 0 and b from block 1: it may only be appended after b.
+    '''
+    blocks = [{"key": ["data:none"], "statements": ["a = f(data)"]},
+              {"key": ["a:0"], "statements": ["b = g(a)"]},
+              {"key": ["a:0", "b:1"], "statements": ["c = h(a, b)"]}]
+    live_vars = Live_Vars({'data': (10, 100, 'list')})
+    for statement in ["a = f(data)", "b = g(a)", "c = h(a, b)"]:
+        live_vars.record(statement)
+        live_vars.set(statement.split(' = ')[0], (10, 100, 'list'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        final_blocks, _ = process_and_merge_blocks(blocks, [{"name": "node1", "memory": 10000}], {}, live_vars)
+    check_order(final_blocks)
+    assert [block['statements'] for block in final_blocks] == [["a = f(data)", "b = g(a)", "c = h(a, b)"]], final_blocks
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time block merging of the scheduler on synthetic DAGs.")
+    parser.add_argument("--blocks", type=int, nargs="+", default=[100, 300, 1000, 3000])
+    parser.add_argument("--fan-in", type=int, default=2, help="most blocks a block depends on")
+    parser.add_argument("--fit", type=int, default=4, help="the largest node holds about this many blocks")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+    check_chain()
+    for n_blocks in args.blocks:
+        blocks, live_vars, func_footprints, nodes = synthetic_program(n_blocks, args.fan_in, args.fit, args.seed)
+        #! run_schedule indexes the footprints once for every phase
+        func_footprints = as_func_footprints(func_footprints)
+        stmt_to_idx_map = {stmt: i for i, block in enumerate(blocks) for stmt in block['statements']}
+        def merge():
+            #! every merge is printed
+            with contextlib.redirect_stdout(io.StringIO()):
+                return process_and_merge_blocks(blocks, nodes, func_footprints, live_vars)
+        elapsed, (final_blocks, scheduling_info) = best_of(args.repeat, merge)
+        check_order(final_blocks)
+        def consolidate():
+            with contextlib.redirect_stdout(io.StringIO()):
+                return consolidate_to_block_format(final_blocks, scheduling_info, nodes, live_vars, func_footprints, stmt_to_idx_map)
+        consolidate_elapsed, (_, consolidated) = best_of(args.repeat, consolidate)
+        print(f"{n_blocks:>6} blocks -> {len(final_blocks):>5} merged {elapsed:>8.3f} s ({elapsed / n_blocks * 1e3:>6.3f} ms per block)"
+              f"   -> {len(consolidated):>5} consolidated {consolidate_elapsed:>7.3f} s")
+
+
+if __name__ == "__main__":
+    main()
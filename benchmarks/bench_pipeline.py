@@ -0,0 +1,96 @@
+#! Compare the file based pipeline (Parallelizer.py then scheduler.py) against the in-memory run_pipeline.
+#! usage: python benchmarks/bench_pipeline.py [--files sample_submission.py] [--repeat 5] [--cli]
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from Parallelizer import analyse, run_pipeline
+from scheduler import run_schedule
+
+NODES = [{"name": "node1", "memory": 3000}, {"name": "node2", "memory": 9000}]
+
+
+def prepare_workspace():
+    folder = tempfile.mkdtemp(prefix="bench_pipeline_")
+    with open(os.path.join(folder, "test.csv"), "w") as f:
+        f.write("ID,Name,Age,Country,Email\n")
+        for i in range(1, 10):
+            f.write(f"{i},Name {i},{20 + i},Country,user{i}@example.com\n")
+    with open(os.path.join(folder, "nodes.json"), "w") as f:
+        json.dump(NODES, f)
+    return folder
+
+
+def reset_temp(folder):
+    shutil.rmtree(os.path.join(folder, "temp"), ignore_errors=True)
+    os.makedirs(os.path.join(folder, "temp", "ddg_parsed"))
+    os.makedirs(os.path.join(folder, "temp", "memory_parsed"))
+
+
+def staged(file_path):
+    #! what the CLIs do, in one process: every stage goes through temp/
+    analyse(file_path, "errors.txt")
+    with open("temp/ddg_parsed/main_lists.json") as f: blocks = json.load(f)
+    with open("temp/memory_parsed/main_lines_footprint.json") as f: live_vars = json.load(f)
+    with open("temp/memory_parsed/func_lines_footprint.json") as f: func_footprints = json.load(f)
+    with open("nodes.json") as f: nodes = json.load(f)
+    run_schedule(blocks, live_vars, func_footprints, nodes, ".")
+
+
+def in_memory(file_path):
+    run_pipeline(file_path, NODES)
+
+
+def cli(file_path):
+    subprocess.run([sys.executable, os.path.join(ROOT, "Parallelizer.py"), file_path, "--no-cache"], check=True, stdout=subprocess.DEVNULL)
+    subprocess.run([sys.executable, os.path.join(ROOT, "scheduler.py"), "temp/ddg_parsed/main_lists.json",
+                    "temp/memory_parsed/main_lines_footprint.json", "temp/memory_parsed/func_lines_footprint.json",
+                    "nodes.json"], check=True, stdout=subprocess.DEVNULL)
+
+
+def best_of(repeat, folder, func, file_path):
+    best = None
+    for _ in range(repeat):
+        reset_temp(folder)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            func(file_path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="File based vs in-memory pipeline on small submissions.")
+    parser.add_argument("--files", nargs="+", default=[os.path.join(ROOT, "sample_submission.py")])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--cli", action="store_true", help="also time the two command line tools as subprocesses")
+    args = parser.parse_args()
+    folder = prepare_workspace()
+    cwd = os.getcwd()
+    os.chdir(folder)
+    try:
+        modes = [("staged (temp/ files)", staged), ("in-memory run_pipeline", in_memory)]
+        if args.cli:
+            modes.insert(0, ("CLI subprocesses", cli))
+        for file_path in args.files:
+            file_path = os.path.abspath(os.path.join(cwd, file_path))
+            print(os.path.basename(file_path))
+            for name, func in modes:
+                print(f"  {name:<24} {best_of(args.repeat, folder, func, file_path) * 1000:>9.1f} ms")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(folder)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,26 +3,67 @@ import argparse
 import ast
 import re
 import math
+import heapq
+import os
+from Stage_Profiler import Stage_Profiler
+from Live_Vars import Live_Vars, as_live_vars
 
 # ==============================================================================
 # 1. CORE MEMORY CALCULATION LOGIC 
 # ==============================================================================
+def function_peak_memory(func_mem_dict):
+    """Peak of the per-line timeline of a function call (every line holds the live size while it runs)."""
+    mem_values = [v for v in func_mem_dict.values() if isinstance(v, (int, float))]
+    return max(mem_values) if mem_values else 0
+
+# A footprint key is "<stmt>#<i>:<signature>" (i is the position of the call in the entry point),
+# older files have "<stmt>:<signature>".
+INDEXED_KEY = re.compile(r"(.*)#\d+:", re.S)
+SIGNATURE = re.compile(r"[A-Za-z_]\w*\(.*\)\Z", re.S)
+
+def footprint_statement(key):
+    """The statement a function footprint key belongs to."""
+    match = INDEXED_KEY.match(key)
+    if match:
+        return match.group(1)
+    for position, char in enumerate(key):
+        if char == ':' and SIGNATURE.match(key, position + 1):
+            return key[:position]
+    return key
+
+class Func_Footprints(dict):
+    """
+    Function footprints with an index of every statement to its first footprint key, built once. A statement
+    only finds the footprint of its own text: x = f(a) does not match x = f(ab).
+    """
+    def __init__(self, footprints=()):
+        super().__init__(footprints)
+        self.keys_by_statement = {}
+        for key in self:
+            self.keys_by_statement.setdefault(footprint_statement(key), key)
+        self._peaks = {}
+    def key_for(self, stmt):
+        return self.keys_by_statement.get(stmt)
+    def peak(self, stmt):
+        """Peak of the function call of stmt, 0 when it has no footprint."""
+        if stmt not in self._peaks:
+            key = self.keys_by_statement.get(stmt)
+            self._peaks[stmt] = function_peak_memory(self[key]) if key is not None and self[key] else 0
+        return self._peaks[stmt]
+
+def as_func_footprints(func_footprints_data):
+    return func_footprints_data if isinstance(func_footprints_data, Func_Footprints) else Func_Footprints(func_footprints_data)
 def calculate_peak_memory_for_statements(statements, live_vars_data, func_footprints_data, stmt_to_idx_map):
     """Calculates the true peak memory for a list of statements by simulating its execution."""
+    func_footprints_data = as_func_footprints(func_footprints_data)
     peak_memory_for_block = 0
     for stmt in statements:
-        live_vars_at_line = live_vars_data.get(stmt, {})
-        sum_of_live_vars = sum(var_info['size'] for var_info in live_vars_at_line.values())
+        sum_of_live_vars = live_vars_data.total_size(stmt)
         
         func_execution_size = 0
         original_idx = stmt_to_idx_map.get(stmt)
         if original_idx is not None:
-            key_prefix_to_find = f"{stmt}"
-            found_key = next((k for k in func_footprints_data if k.startswith(key_prefix_to_find)), None)
-            if found_key:
-                func_mem_dict = func_footprints_data[found_key]
-                if func_mem_dict:
-                    func_execution_size = list(func_mem_dict.values())[-1]
+            func_execution_size = func_footprints_data.peak(stmt)
         
         instantaneous_memory = sum_of_live_vars + func_execution_size
         if instantaneous_memory > peak_memory_for_block:
@@ -62,6 +103,7 @@ def calculate_peak_memory_for_merged_block(
     Calculates the peak memory for a specific block (or a potential merged block),
     considering only its external dependencies (from keys) and internally created variables.
     """
+    func_footprints_data = as_func_footprints(func_footprints_data)
     peak_memory_for_block = 0
     # A simple way to parse the variable being created (e.g., "z" from "z = add1(data)")
     get_lhs_var = lambda s: s.split(' ')[0]
@@ -77,11 +119,8 @@ def calculate_peak_memory_for_merged_block(
         func_execution_size = 0
         original_idx = stmt_to_idx_map.get(stmt)
         if original_idx is not None:
-            key_prefix_to_find = f"{stmt}"
-            found_key = next((k for k in func_footprints_data if k.startswith(key_prefix_to_find)), None)
-            if found_key and func_footprints_data[found_key]:
-                # The peak memory inside a function is its final memory state
-                func_execution_size = list(func_footprints_data[found_key].values())[-1]
+            # The peak memory inside a function is the highest point of its timeline
+            func_execution_size = func_footprints_data.peak(stmt)
 
         # 2. Identify all variables that should be live at this point *within this block's context*.
         # These are the external dependencies PLUS any variables created in previous statements of this block.
@@ -90,11 +129,7 @@ def calculate_peak_memory_for_merged_block(
 
         # 3. Sum the sizes of only these relevant live variables.
         # We look up their sizes in the global live_vars_data for the current statement.
-        live_vars_at_line = live_vars_data.get(stmt, {})
-        sum_of_relevant_live_vars = sum(
-            var_info['size'] for var_name, var_info in live_vars_at_line.items()
-            if var_name in relevant_vars
-        )
+        sum_of_relevant_live_vars = sum(live_vars_data.size(stmt, var_name) for var_name in relevant_vars)
         
         # 4. Update the set of internally created variables *after* calculating memory for the current line.
         created_internal_vars.add(get_lhs_var(stmt))
@@ -108,131 +143,168 @@ def calculate_peak_memory_for_merged_block(
 # ==============================================================================
 # 2.1. MERGING EXECUTION BLOCKS
 # ==============================================================================
+def key_block(key):
+    """
+    Index of the block a key 'var:i' depends on, None for 'var:none'. The grouping numbers the blocks from 0
+    and every phase of the scheduler reads and writes the keys the same way.
+    """
+    var, _, index_str = key.partition(':')
+    return int(index_str) if var != 'none' and index_str.isdigit() else None
+
+def _external_vars(keys):
+    return {k.split(':')[0] for k in keys if k.split(':')[0] != 'none'}
+
+def _block_timeline(statements, external_vars, statement_sizes, live_vars_data):
+    """
+    Memory of every statement of a block, as calculate_peak_memory_for_merged_block adds it up, and the
+    position of the first statement creating each variable of the block.
+    """
+    timeline, created = [], {}
+    for position, stmt in enumerate(statements):
+        relevant_vars = external_vars.union(created)
+        timeline.append(sum(live_vars_data.size(stmt, var) for var in relevant_vars) + statement_sizes[stmt])
+        created.setdefault(stmt.split(' ')[0], position)
+    return timeline, created
+
+def _merged_timeline(target, source, merged_vars, live_vars_data):
+    """
+    Timeline of the target's statements followed by the source's when the merged block depends on merged_vars,
+    from the timelines of both blocks: a statement only looks up the variables the merge adds to or takes away
+    from what it sees.
+    """
+    def shifted(block, added, removed):
+        for position, (stmt, value) in enumerate(zip(block['statements'], block['timeline'])):
+            #! variables created before a statement of the block were already counted for it
+            value += sum(live_vars_data.size(stmt, var) for var in added if block['created'].get(var, position) >= position)
+            value -= sum(live_vars_data.size(stmt, var) for var in removed if block['created'].get(var, position) >= position)
+            yield value
+    #! the target's statements keep their variables and see the source's dependencies
+    timeline = list(shifted(target, merged_vars - target['vars'], ()))
+    #! the source's statements also see everything the target creates
+    seen_by_source = merged_vars.union(target['created'])
+    timeline.extend(shifted(source, seen_by_source - source['vars'], source['vars'] - seen_by_source))
+    return timeline
+
 def process_and_merge_blocks(blocks_data, nodes_data, func_footprints_data, live_vars_data):
-    """Attempt 2: Merges blocks based on dependencies and memory, then schedules the final blocks."""
+    """
+    Attempt 2: Merges blocks based on dependencies and memory, then schedules the final blocks.
+    Blocks are the sets of a union-find over the initial block ids (a key 'var:i' points to block i), every
+    feasible merge of a dependent into a block it depends on waits in a heap ranked by the peak of the merged
+    block and the one with the lowest peak is done first. A dependent is only appended to a block that comes
+    after everything else it depends on, so no statement reads a variable before it is produced. Only the
+    merges of the merged blocks are re-ranked, keys are mapped to the final block indices once at the end.
+    """
     print("\n--- Attempt 2: Merging execution blocks to find a feasible schedule ---")
-    
+
     if not nodes_data:
         print("Error: No node data provided.")
         return blocks_data, []
     max_node_memory = max(node['memory'] for node in nodes_data)
     print(f"System's Maximum Node Memory for merging: {max_node_memory}")
-    
-    stmt_to_idx_map = {stmt: i for i, block in enumerate(blocks_data) for stmt in block['statements']}
-    
-    blocks = json.loads(json.dumps(blocks_data)) 
-    merged_in_pass, pass_num = True, 1
-    
-    while merged_in_pass:
-        print(f"\n--- Starting Pass #{pass_num} ---")
-        merged_in_pass = False
-        source_idx = 0
-        while source_idx < len(blocks):
-            current_block = blocks[source_idx]
-            did_merge_and_restart = False
-            
-            # Create a copy of keys to iterate over, as we might modify the original
-            for key_str in list(current_block['key']):
-                try:
-                    var, index_str = key_str.split(':')
-                    if var == 'none' or index_str == 'none' or not index_str.isdigit():
-                        continue
-                    
-                    ### BUG FIX 1: Convert 1-based key to 0-based index ###
-                    # The keys in the file are 1-based, but Python lists are 0-based.
-                    target_idx = int(index_str) - 1
-
-                    # A block cannot depend on itself. Also check for invalid indices.
-                    if target_idx == source_idx or target_idx < 0 or target_idx >= len(blocks):
-                        continue
-
-                except (ValueError, IndexError):
-                    continue
-
-                target_block = blocks[target_idx]
-                
-                # The dependent block's statements must come AFTER the precedent's statements.
-                # `current_block` depends on `target_block`.
-                temp_merged_statements = target_block['statements'] + current_block['statements']
-                
-                # Combine keys, removing keys that are now internal to the merged block.
-                # The dependency of `current_block` on `target_block` is resolved by the merge.
-                temp_merged_keys = [k for k in current_block['key'] if k != key_str] + target_block['key']
-                temp_merged_keys = list(dict.fromkeys(temp_merged_keys)) # Remove duplicates
-
-                merged_footprint = calculate_peak_memory_for_merged_block(
-                    temp_merged_statements,
-                    temp_merged_keys,
-                    live_vars_data,
-                    func_footprints_data,
-                    stmt_to_idx_map
-                )
-                
-                if merged_footprint <= max_node_memory:
-                    print(f"  -> Merge PASSED: block {source_idx} (dep) into block {target_idx} (precedent). New Peak: {merged_footprint}")
-                    
-                    # Perform the merge: append dependent statements to precedent statements
-                    target_block['statements'].extend(current_block['statements'])
-                    target_block['key'] = temp_merged_keys # Use the already calculated keys
-                    
-                    # The block at source_idx is being removed.
-                    removed_block_key_val = source_idx + 1
-                    blocks.pop(source_idx)
-                    
-                    # After removing, the target block might have a new index if it was after the source.
-                    merge_target_new_idx = target_idx if target_idx < source_idx else target_idx - 1
-                    merge_target_new_key_val = merge_target_new_idx + 1
-
-                    ### BUG FIX 2: Correctly re-index all keys in the system ###
-                    for block_to_update in blocks:
-                        new_keys = []
-                        for k in block_to_update['key']:
-                            k_var, k_idx_str = k.split(':')
-                            if not k_idx_str.isdigit():
-                                new_keys.append(k)
-                                continue
-                            
-                            k_idx_val = int(k_idx_str)
-                            
-                            if k_idx_val == removed_block_key_val:
-                                # Dependency pointed to the removed block, so remap it to the merge target.
-                                new_keys.append(f"{k_var}:{merge_target_new_key_val}")
-                            elif k_idx_val > removed_block_key_val:
-                                # Dependency pointed to a block after the removed one, so its index shifts down.
-                                new_keys.append(f"{k_var}:{k_idx_val - 1}")
-                            else:
-                                # Dependency is unaffected.
-                                new_keys.append(k)
-                        block_to_update['key'] = new_keys
-
-                    merged_in_pass = True
-                    did_merge_and_restart = True
-                    break # Exit the keys loop for the current_block
-            
-            if did_merge_and_restart:
-                # The `blocks` list has changed, so restart the scan from the beginning.
-                source_idx = 0
-            else:
-                # No merge was performed for this block, move to the next one.
-                source_idx += 1
-        
-        pass_num += 1
+    live_vars_data = as_live_vars(live_vars_data)
+    func_footprints_data = as_func_footprints(func_footprints_data)
+
+    statement_sizes = {stmt: func_footprints_data.peak(stmt) for block in blocks_data for stmt in block['statements']}
+    parent = list(range(len(blocks_data)))
+    def find(block_id):
+        while parent[block_id] != block_id:
+            parent[block_id] = parent[parent[block_id]]
+            block_id = parent[block_id]
+        return block_id
+    def target_of(key):
+        #! root of the block a key points to, None for 'none' and indices outside the blocks
+        index = key_block(key)
+        if index is None or index >= len(blocks_data):
+            return None
+        return find(index)
+    def canonical(key):
+        target = target_of(key)
+        return key if target is None else (key.split(':')[0], target)
+
+    blocks = []
+    for block in blocks_data:
+        external_vars = _external_vars(block['key'])
+        timeline, created = _block_timeline(block['statements'], external_vars, statement_sizes, live_vars_data)
+        blocks.append({'statements': list(block['statements']), 'key': list(block['key']), 'vars': external_vars,
+                       'created': created, 'timeline': timeline, 'version': 0})
+    dependents = [set() for _ in blocks_data]  #! roots with a key pointing into the block (some may be merged since)
+
+    def merge_result(source_id, target_id, key):
+        source, target = blocks[source_id], blocks[target_id]
+        resolved = canonical(key)
+        merged_keys = {}
+        for k in [k for k in source['key'] if canonical(k) != resolved] + target['key']:
+            merged_keys.setdefault(canonical(k), k)
+        merged_keys = list(merged_keys.values())
+        merged_vars = _external_vars(merged_keys)
+        return merged_keys, merged_vars, _merged_timeline(target, source, merged_vars, live_vars_data)
+
+    candidates = []
+    def push_candidates(source_id, only_target=None):
+        #! a merged block takes the place of its target, every other block the source reads from must come first
+        targets = {target_of(key) for key in blocks[source_id]['key']} - {None, source_id}
+        latest = max(targets, default=None)
+        for position, key in enumerate(blocks[source_id]['key']):
+            target_id = target_of(key)
+            if target_id is None or target_id == source_id or (only_target is not None and target_id != only_target):
+                continue
+            dependents[target_id].add(source_id)
+            if target_id > source_id or target_id < latest:
+                continue
+            peak = max(merge_result(source_id, target_id, key)[2], default=0)
+            if peak <= max_node_memory:
+                heapq.heappush(candidates, (peak, source_id, position, target_id, key,
+                                            blocks[source_id]['version'], blocks[target_id]['version']))
+
+    for block_id in range(len(blocks)):
+        push_candidates(block_id)
+    while candidates:
+        peak, source_id, _, target_id, key, source_version, target_version = heapq.heappop(candidates)
+        if (find(source_id) != source_id or find(target_id) != target_id or blocks[source_id]['version'] != source_version
+                or blocks[target_id]['version'] != target_version):
+            continue #! one of the blocks was merged since the merge was ranked
+        print(f"  -> Merge PASSED: block {source_id} (dep) into block {target_id} (precedent). New Peak: {peak}")
+        source, target = blocks[source_id], blocks[target_id]
+        merged_keys, merged_vars, timeline = merge_result(source_id, target_id, key)
+        offset = len(target['statements'])
+        for var, position in source['created'].items():
+            target['created'].setdefault(var, position + offset)
+        target['statements'].extend(source['statements'])
+        target.update({'key': merged_keys, 'vars': merged_vars, 'timeline': timeline, 'version': target['version'] + 1})
+        parent[source_id] = target_id
+        blocks[source_id] = None
+        source_dependents = {find(block_id) for block_id in dependents[source_id]}
+        merged_dependents = {find(block_id) for block_id in dependents[target_id]} | source_dependents
+        merged_dependents.discard(target_id)
+        dependents[target_id], dependents[source_id] = merged_dependents, set()
+        push_candidates(target_id)
+        for dependent_id in merged_dependents:
+            #! the source's dependents now read from an earlier block, merges they had to wait for may be possible
+            push_candidates(dependent_id, only_target=None if dependent_id in source_dependents else target_id)
 
     print("\n--- Merging Complete. Calculating final scheduling info. ---")
+    roots = [block_id for block_id in range(len(blocks)) if find(block_id) == block_id]
+    final_index = {root: i for i, root in enumerate(roots)}
+    removed = len(blocks) - len(roots)
+    def final_key(key):
+        index = key_block(key)
+        if index is None:
+            return key
+        var = key.split(':')[0]
+        if index >= len(blocks_data):
+            return f"{var}:{index - removed}"
+        return f"{var}:{final_index[find(index)]}"
+    final_blocks = []
     block_scheduling_info = []
     sorted_nodes = sorted(nodes_data, key=lambda x: x['memory'])
-    for i, block in enumerate(blocks):
-        final_peak_memory = calculate_peak_memory_for_merged_block(
-            block['statements'],
-            block['key'],
-            live_vars_data,
-            func_footprints_data,
-            stmt_to_idx_map
-        )
+    for i, root in enumerate(roots):
+        block = blocks[root]
+        final_blocks.append(dict(blocks_data[root], key=[final_key(k) for k in block['key']], statements=block['statements']))
+        final_peak_memory = max(block['timeline'], default=0)
         fitting_node = next((node for node in sorted_nodes if node['memory'] >= final_peak_memory), None)
         block_scheduling_info.append({"block_index": i, "statements": block['statements'], "peak_memory": final_peak_memory, "fitting_node": fitting_node})
         print(f"Final Block {i}: Peak Memory = {final_peak_memory}, Recommended Node = {fitting_node['name'] if fitting_node else 'None'}")
-    return blocks, block_scheduling_info
+    return final_blocks, block_scheduling_info
 
 # ==============================================================================
 # 3. CONSOLIDATION AND SCHEDULING INFO
@@ -319,20 +391,17 @@ def consolidate_to_block_format(
         for key_str in block['key']:
             try:
                 var, index_str = key_str.split(':')
-                if not index_str.isdigit():
+                old_dep_index = key_block(key_str)
+                if old_dep_index is None:
                     updated_keys.add(key_str)
                     continue
                 
-                # --- BUG FIX 1: Convert 1-based key from file to 0-based index for logic ---
-                old_dep_index_0_based = int(index_str) - 1
-                
                 # Find the new index that the old dependency now maps to
-                new_dep_index = old_to_new_index_map.get(old_dep_index_0_based)
+                new_dep_index = old_to_new_index_map.get(old_dep_index)
                 
                 # Only keep the key if it points to a DIFFERENT consolidated block
                 if new_dep_index is not None and new_dep_index != new_idx:
-                    # --- BUG FIX 2: Convert new 0-based index back to 1-based for consistent output ---
-                    updated_keys.add(f"{var}:{new_dep_index + 1}")
+                    updated_keys.add(f"{var}:{new_dep_index}")
             except (ValueError, IndexError):
                 updated_keys.add(key_str)
                 
@@ -369,6 +438,163 @@ def consolidate_to_block_format(
 
     return final_consolidated_blocks, consolidated_schedule_info
 # ==============================================================================
+# 3.1. MAKESPAN SCHEDULING (HEFT)
+# ==============================================================================
+# Seconds are predicted for a node of speed 1.0: a statement without a runtime estimate moves the bytes of its
+# function call and of its inputs at DEFAULT_THROUGHPUT, data sent between nodes moves at the bandwidth.
+DEFAULT_THROUGHPUT = 50e6
+DEFAULT_BANDWIDTH = 100e6
+
+def _producer_block(key, consumer):
+    """Index of the block a key 'var:i' of block consumer reads var from (see key_block), None when there is none."""
+    index = key_block(key)
+    return index if index is not None and index < consumer else None
+
+def _block_work(block, index, runtimes, live_vars_data, func_footprints_data):
+    """Predicted seconds of a block on a node of speed 1.0."""
+    if str(index) in runtimes:
+        return float(runtimes[str(index)])
+    work = 0.0
+    for stmt in block['statements']:
+        if stmt in runtimes:
+            work += float(runtimes[stmt])
+        else:
+            inputs = sum(live_vars_data.size(stmt, var) for var in _external_vars(block['key']))
+            work += (func_footprints_data.peak(stmt) + inputs) / DEFAULT_THROUGHPUT
+    return work
+
+def _earliest_slot(busy, ready, duration):
+    """Earliest start at or after ready where a task of duration fits between the busy (start, finish) intervals."""
+    start = ready
+    for busy_start, busy_finish in busy:
+        if start + duration <= busy_start:
+            break
+        start = max(start, busy_finish)
+    return start
+
+def schedule_heft(blocks_data, nodes_data, live_vars_data, func_footprints_data, runtimes=None, bandwidth=DEFAULT_BANDWIDTH):
+    """
+    Assigns blocks to nodes to minimize the predicted makespan (HEFT): blocks are taken by decreasing upward rank
+    (their time plus the longest path of time and transfers after them) and every block goes to the node where it
+    finishes first, in the earliest idle slot of that node. A node only runs blocks whose peak memory it holds.
+    runtimes maps a block index or a statement to seconds on a node of speed 1.0, nodes may have a "speed"
+    (default 1.0) and a "bandwidth" in bytes per second, both above 0. Blocks no node holds are split over every
+    node like plan_data_parallelization chunks them, without a usable node every block is unschedulable.
+    Returns (consolidated_schedule, consolidated_schedule_info, scheduling_info) in the formats of
+    consolidate_to_block_format and process_and_merge_blocks, blocks in the order they start.
+    """
+    print("\n--- Makespan Scheduling: upward rank list scheduling (HEFT) with memory limits ---")
+    live_vars_data = as_live_vars(live_vars_data)
+    func_footprints_data = as_func_footprints(func_footprints_data)
+    runtimes = runtimes or {}
+    stmt_to_idx_map = {stmt: i for i, block in enumerate(blocks_data) for stmt in block['statements']}
+    nodes = []
+    for node in nodes_data:
+        if float(node.get('speed', 1.0)) > 0 and float(node.get('bandwidth', bandwidth)) > 0:
+            nodes.append(node)
+        else:
+            print(f"Error: Node '{node['name']}' needs a speed and a bandwidth above 0, it is left out.")
+    if not nodes:
+        print("Error: No node can run blocks. Every block is unschedulable.")
+    speeds = [float(node.get('speed', 1.0)) for node in nodes]
+    bandwidths = [float(node.get('bandwidth', bandwidth)) for node in nodes]
+    mean_bandwidth = sum(bandwidths) / len(bandwidths) if nodes else bandwidth
+
+    n_blocks = len(blocks_data)
+    peaks, works, eligible = [], [], []
+    predecessors = [{} for _ in range(n_blocks)]  #! producer -> bytes the block reads from it
+    successors = [[] for _ in range(n_blocks)]
+    for i, block in enumerate(blocks_data):
+        peaks.append(calculate_peak_memory_for_merged_block(block['statements'], block['key'], live_vars_data, func_footprints_data, stmt_to_idx_map))
+        works.append(_block_work(block, i, runtimes, live_vars_data, func_footprints_data))
+        eligible.append([p for p, node in enumerate(nodes) if node['memory'] >= peaks[i]])
+        for key in block['key']:
+            producer = _producer_block(key, i)
+            if producer is not None:
+                data = live_vars_data.size(block['statements'][0], key.split(':')[0]) if block['statements'] else 0
+                if producer not in predecessors[i]:
+                    successors[producer].append(i)
+                predecessors[i][producer] = predecessors[i].get(producer, 0) + data
+
+    def duration(i, p):
+        return works[i] / speeds[p]
+    def mean_duration(i):
+        if not eligible[i]:
+            return works[i] / sum(speeds) if nodes else 0.0
+        return sum(duration(i, p) for p in eligible[i]) / len(eligible[i])
+
+    #! producers come before their blocks, the ranks are filled from the last block up
+    ranks = [0.0] * n_blocks
+    for i in reversed(range(n_blocks)):
+        ranks[i] = mean_duration(i) + max((predecessors[s][i] / mean_bandwidth + ranks[s] for s in successors[i]), default=0.0)
+    order = sorted(range(n_blocks), key=lambda i: (-ranks[i], i))
+
+    busy = [[] for _ in nodes]
+    placement, start_times, finish_times = {}, {}, {}
+    def arrival(producer, consumer, p):
+        #! data of a block split over the nodes comes from the aggregator
+        if placement[producer] == p:
+            return finish_times[producer]
+        link = bandwidths[p] if placement[producer] is None else min(bandwidths[p], bandwidths[placement[producer]])
+        return finish_times[producer] + predecessors[consumer][producer] / link
+    for current in order:
+        if eligible[current]:
+            best = None
+            for p in eligible[current]:
+                ready = max((arrival(producer, current, p) for producer in predecessors[current]), default=0.0)
+                start = _earliest_slot(busy[p], ready, duration(current, p))
+                if best is None or start + duration(current, p) < best[1]:
+                    best = (start, start + duration(current, p), p)
+            start, finish, p = best
+            placement[current] = p
+            busy[p].append((start, finish))
+            busy[p].sort()
+        elif not nodes:
+            start = finish = 0.0
+            placement[current] = None
+        else:
+            #! every node works on a chunk, the block starts once all of them are free
+            ready = max((finish_times[producer] + predecessors[current][producer] / mean_bandwidth for producer in predecessors[current]), default=0.0)
+            start = max([ready] + [intervals[-1][1] for intervals in busy if intervals])
+            finish = start + works[current] / sum(speeds)
+            placement[current] = None
+            for intervals in busy:
+                intervals.append((start, finish))
+        start_times[current], finish_times[current] = start, finish
+
+    schedule_order = sorted(range(n_blocks), key=lambda i: (start_times[i], -ranks[i], i))
+    new_index = {block: position for position, block in enumerate(schedule_order)}
+    consolidated_schedule, consolidated_schedule_info, scheduling_info = [], [], []
+    for position, i in enumerate(schedule_order):
+        block = blocks_data[i]
+        keys = set()
+        for key in block['key']:
+            if not key.partition(':')[2].isdigit():
+                keys.add(key)
+                continue
+            producer = _producer_block(key, i)
+            if producer is not None:
+                keys.add(f"{key.split(':')[0]}:{new_index[producer]}")
+        keys = sorted(keys)
+        node = nodes[placement[i]] if placement[i] is not None else None
+        consolidated_schedule.append({"key": keys, "statements": block['statements']})
+        consolidated_schedule_info.append({
+            "consolidated_block_index": position,
+            "peak_memory": peaks[i],
+            "assigned_node": node,
+            "is_schedulable": node is not None,
+            "key": keys,
+            "statements": block['statements'],
+            "start": start_times[i],
+            "finish": finish_times[i]
+        })
+        scheduling_info.append({"block_index": i, "statements": block['statements'], "peak_memory": peaks[i], "fitting_node": node,
+                                "rank": ranks[i], "start": start_times[i], "finish": finish_times[i]})
+        print(f"Block {i} -> {node['name'] if node else 'split over every node' if nodes else 'unschedulable'}: {start_times[i]:.3f}s to {finish_times[i]:.3f}s (rank {ranks[i]:.3f})")
+    makespan = max(finish_times.values(), default=0.0)
+    print(f"Predicted makespan: {makespan:.3f}s")
+    return consolidated_schedule, consolidated_schedule_info, scheduling_info
+# ==============================================================================
 # 4. PARALLELIZATION WITH DEFERRAL LOGIC
 # ==============================================================================
 def get_iterable_name(node):
@@ -451,6 +677,7 @@ def plan_data_parallelization(
     if not nodes_data:
         print("Error: No node data available for parallelization planning.")
         return {}
+    func_footprints_data = as_func_footprints(func_footprints_data)
         
     sorted_nodes = sorted(nodes_data, key=lambda x: x['memory'])
     smallest_node_memory = sorted_nodes[0]['memory']
@@ -493,7 +720,7 @@ def plan_data_parallelization(
         func_name_or_method, args_str = match.groups()
         arg_names = [arg.strip() for arg in args_str.split(',') if arg.strip()]
 
-        found_key = next((k for k in func_footprints_data if k.startswith(statement)), None)
+        found_key = func_footprints_data.key_for(statement)
         if not found_key:
             print(f"  -> Feasibility Check FAILED: No function footprint data found for '{statement}'.")
             parallelization_plan[statement] = {"status": "Failed: Infeasible", "reason": "No footprint data found to reconstruct source."}
@@ -509,12 +736,8 @@ def plan_data_parallelization(
         print("  -> Feasibility Check PASSED.")
 
         # --- The rest of the calculation logic proceeds as before ---
-        live_vars_at_line = live_vars_data.get(statement, {})
-        # ... (and so on) ...
-
-        sum_of_args_size = sum(live_vars_at_line[arg]['size'] for arg in arg_names if arg in live_vars_at_line)
-        mem_values = [v for v in func_footprints_data[found_key].values() if isinstance(v, (int, float))]
-        func_execution_size = mem_values[-1] if mem_values else 0
+        sum_of_args_size = sum(live_vars_data.size(statement, arg) for arg in arg_names)
+        func_execution_size = function_peak_memory(func_footprints_data[found_key])
         total_required_mem = sum_of_args_size + func_execution_size
         num_chunks = math.ceil(total_required_mem / smallest_node_memory)
         
@@ -526,7 +749,7 @@ def plan_data_parallelization(
         chunks_per_argument = {}
         # Iterate through each argument that was parsed from the function call
         for arg_name in arg_names:
-            arg_info = live_vars_at_line.get(arg_name)
+            arg_info = live_vars_data.value(statement, arg_name)
 
             # Only create chunks for arguments that have a 'length' attribute
             if not arg_info or 'length' not in arg_info:
@@ -597,16 +820,18 @@ def generate_execution_plan(
     parallelization_plan,
     nodes_data,
     live_vars_data,
-    func_footprints_data # Required
+    func_footprints_data, # Required
+    output_dir="."
 ):
     """
     Generates a master schedule, and COMPLETE, well-structured, executable
     Python scripts and data files for each node.
+    Returns the generated files as {file name: content}, they are written to output_dir unless it is None.
     """
     print("\n--- Generating Final Execution Plan (Executable Code) ---")
     
     # --- Phase 0: Setup ---
-    if not nodes_data: return
+    if not nodes_data: return {}
 
     AGGREGATOR_NAME = "AGGREGATOR_SERVICE"
     WORKER_NODES = [node['name'] for node in nodes_data]
@@ -625,6 +850,10 @@ def generate_execution_plan(
     }
     produced_by_scheduled_blocks = {get_lhs_var(stmt) for info in consolidated_schedule_info if info['is_schedulable'] for stmt in info['statements']}
     
+    #! first block of every index, looked up once per key
+    blocks_by_index = {}
+    for info in consolidated_schedule_info:
+        blocks_by_index.setdefault(info['consolidated_block_index'], info)
     var_consumers = {}
     for info in consolidated_schedule_info:
         valid_keys = [k for k in info.get('key', []) if k != "none:none"]
@@ -632,7 +861,7 @@ def generate_execution_plan(
             var, source_idx_str = key.split(':')
             if source_idx_str.isdigit():
                 source_idx = int(source_idx_str)
-                producer_block = next((p for p in consolidated_schedule_info if p['consolidated_block_index'] == source_idx), None)
+                producer_block = blocks_by_index.get(source_idx)
                 if producer_block:
                     produced_var = get_lhs_var(producer_block['statements'][-1]) if producer_block['is_schedulable'] else get_lhs_var(producer_block['statements'][0])
                     if produced_var not in var_consumers: var_consumers[produced_var] = set()
@@ -660,7 +889,7 @@ def generate_execution_plan(
                     plan['python_code'].append(f"    {var} = wait_for_data('{var}', from_node='{source_node}')")
                 elif source_idx_str == 'none' and info['statements']:
                     stmt = info['statements'][0]
-                    var_info = live_vars_data.get(stmt, {}).get(var)
+                    var_info = live_vars_data.value(stmt, var)
                     plan['initial_data'][var] = var_info
                     plan['python_code'].append(f"    print('--- Loading initial data ---')")
                     plan['python_code'].append(f"    {var} = initial_data['{var}']")
@@ -709,7 +938,7 @@ def generate_execution_plan(
                 # Load or wait for the full data arrays needed for slicing
                 for arg in arg_names:
                     if arg not in produced_by_scheduled_blocks:
-                        worker_plan['initial_data'][arg] = live_vars_data.get(statement, {}).get(arg, f"MISSING_DATA_FOR_{arg}")
+                        worker_plan['initial_data'][arg] = live_vars_data.value(statement, arg) or f"MISSING_DATA_FOR_{arg}"
                         worker_plan['python_code'].append(f"    {arg} = initial_data.get('{arg}')")
                     else:
                         producer_node = "UNKNOWN"
@@ -768,22 +997,16 @@ def send_data(variable_name, data, consumers):
     
     all_functions_source = "\n\n".join(function_definitions.values())
     
-    try:
-        with open("master_schedule.txt", "w") as f:
-            f.write("\n".join(master_plan))
-        print("Master schedule written to master_schedule.txt")
+    generated_files = {"master_schedule.txt": "\n".join(master_plan)}
+    for node_name, plan_details in node_plans.items():
+        if not plan_details['python_code']: continue
 
-        for node_name, plan_details in node_plans.items():
-            if not plan_details['python_code']: continue
-            
-            with open(f"{node_name}_data.json", "w") as f:
-                json.dump(plan_details['initial_data'], f, indent=4)
-            print(f"Initial data for {node_name} written to {node_name}_data.json")
+        generated_files[f"{node_name}_data.json"] = json.dumps(plan_details['initial_data'], indent=4)
 
-            # Correctly join the list of python code lines with newlines
-            scheduled_tasks_code = "\n".join(plan_details['python_code'])
-            
-            main_logic = f"""
+        # Correctly join the list of python code lines with newlines
+        scheduled_tasks_code = "\n".join(plan_details['python_code'])
+        
+        main_logic = f"""
 def main(node_name):
     print(f"\\n*** Starting execution on {{node_name}} ***\\n")
     try:
@@ -802,108 +1025,205 @@ def main(node_name):
 if __name__ == "__main__":
     main("{node_name}")
 """
-            full_python_code = (
-                python_harness_preamble +
-                "\n\n# ==================================================\n" +
-                "#          RECONSTRUCTED FUNCTION DEFINITIONS          \n" +
-                "# ==================================================\n\n" +
-                all_functions_source +
-                "\n\n# ==================================================\n" +
-                "#               MAIN EXECUTION LOGIC                 \n" +
-                "# ==================================================\n" +
-                main_logic
-            )
+        generated_files[f"{node_name}.py"] = (
+            python_harness_preamble +
+            "\n\n# ==================================================\n" +
+            "#          RECONSTRUCTED FUNCTION DEFINITIONS          \n" +
+            "# ==================================================\n\n" +
+            all_functions_source +
+            "\n\n# ==================================================\n" +
+            "#               MAIN EXECUTION LOGIC                 \n" +
+            "# ==================================================\n" +
+            main_logic
+        )
+
+    if output_dir is None:
+        return generated_files
+    try:
+        with open(os.path.join(output_dir, "master_schedule.txt"), "w") as f:
+            f.write(generated_files["master_schedule.txt"])
+        print("Master schedule written to master_schedule.txt")
+
+        for node_name, plan_details in node_plans.items():
+            if not plan_details['python_code']: continue
             
-            with open(f"{node_name}.py", "w") as f:
-                f.write(full_python_code)
+            with open(os.path.join(output_dir, f"{node_name}_data.json"), "w") as f:
+                f.write(generated_files[f"{node_name}_data.json"])
+            print(f"Initial data for {node_name} written to {node_name}_data.json")
+
+            with open(os.path.join(output_dir, f"{node_name}.py"), "w") as f:
+                f.write(generated_files[f"{node_name}.py"])
             print(f"Executable script for {node_name} written to {node_name}.py")
 
     except IOError as e:
         print(f"Error writing execution plan files: {e}")
+    return generated_files
         
 # ==============================================================================
-# 6. MAIN EXECUTION BLOCK
+# 5.1. LIBRARY ENTRY POINT
 # ==============================================================================
-def main():
-    """Main function to parse arguments and run the scheduling workflow."""
-    parser = argparse.ArgumentParser(
-        description="A smart scheduler that first tries to fit a whole program, then resorts to merging blocks.",
-        formatter_class=argparse.RawTextHelpFormatter
-    )
-    # ... (keep all your argument parsing code here) ...
-    parser.add_argument('blocks_file', help='Path to the initial blocks definition JSON file.')
-    parser.add_argument('live_vars_file', help='Path to live variables JSON file.')
-    parser.add_argument('func_footprints_file', help='Path to function footprints JSON file.')
-    parser.add_argument('nodes_file', help='Path to nodes JSON file.')
-    parser.add_argument('--generate-test-files', action='store_true', help='Generate test JSON files with default names before running.')
-    args = parser.parse_args()
-
-    # --- Load all data from files ---
-    try:
-        with open(args.blocks_file, 'r') as f: initial_blocks = json.load(f)
-        with open(args.live_vars_file, 'r') as f: live_vars_data = json.load(f)
-        with open(args.func_footprints_file, 'r') as f: func_footprints_data = json.load(f)
-        with open(args.nodes_file, 'r') as f: nodes_data = json.load(f)
-    except FileNotFoundError as e:
-        print(f"Error: Could not find required input file: {e.filename}")
-        return
-
+def run_schedule(initial_blocks, live_vars_data, func_footprints_data, nodes_data, output_dir=".", profiler=None,
+                 strategy='memory', runtimes=None, bandwidth=DEFAULT_BANDWIDTH):
+    """
+    Runs the scheduling workflow on already loaded data and returns every result in a dict,
+    the output files are written to output_dir unless it is None.
+    Every phase is recorded as a stage of profiler (a Stage_Profiler) when one is given.
+    strategy 'memory' fits the whole program or merges blocks until they fit, 'heft' places the blocks
+    with schedule_heft to minimize the predicted makespan (runtimes and bandwidth are passed to it).
+    """
+    if profiler is None:
+        profiler = Stage_Profiler(trace_memory=False)
+    #! per-line snapshots (older main_lines_footprint.json files, symbolic expressions) become a Live_Vars
+    live_vars_data = as_live_vars(live_vars_data)
+    #! every phase finds the footprint of a statement in the same index
+    func_footprints_data = as_func_footprints(func_footprints_data)
+    results = {'whole_program_node': None}
     # --- Prepare necessary data structures ---
     full_program_statements = [stmt for block in initial_blocks for stmt in block['statements']]
     stmt_to_original_idx_map = {stmt: i for i, block in enumerate(initial_blocks) for stmt in block['statements']}
     
     # --- Execute the scheduling workflow ---
-    whole_program_node = schedule_program_whole(full_program_statements, nodes_data, live_vars_data, func_footprints_data, stmt_to_original_idx_map)
+    whole_program_node = None
+    if strategy == 'memory':
+        with profiler.stage('schedule_program_whole', statements=len(full_program_statements), nodes=len(nodes_data)):
+            whole_program_node = schedule_program_whole(full_program_statements, nodes_data, live_vars_data, func_footprints_data, stmt_to_original_idx_map)
+    results['whole_program_node'] = whole_program_node
     
     # Initialize variables for the report
     if not whole_program_node:
-        # If the first attempt failed, run the merging process
-        final_blocks, scheduling_info = process_and_merge_blocks(initial_blocks, nodes_data, func_footprints_data, live_vars_data)
-
-        # Run the post-processing and consolidation step
-        consolidated_schedule, consolidated_schedule_info = consolidate_to_block_format(
-            final_blocks,
-            scheduling_info,
-            nodes_data,          # Pass nodes_data
-            live_vars_data,      # Pass live_vars_data
-            func_footprints_data,# Pass func_footprints_data
-            stmt_to_original_idx_map      # Pass stmt_to_idx_map
-        )
+        if strategy == 'heft':
+            #! the blocks are placed as they are, keeping them apart is what lets them run side by side
+            final_blocks = initial_blocks
+            with profiler.stage('schedule_heft', blocks=len(initial_blocks), nodes=len(nodes_data)) as counts:
+                consolidated_schedule, consolidated_schedule_info, scheduling_info = schedule_heft(
+                    initial_blocks, nodes_data, live_vars_data, func_footprints_data, runtimes, bandwidth)
+                results['makespan'] = max((info['finish'] for info in consolidated_schedule_info), default=0.0)
+                counts['unschedulable_blocks'] = sum(not info['is_schedulable'] for info in consolidated_schedule_info)
+        else:
+            # If the first attempt failed, run the merging process
+            with profiler.stage('process_and_merge_blocks', blocks=len(initial_blocks)) as counts:
+                final_blocks, scheduling_info = process_and_merge_blocks(initial_blocks, nodes_data, func_footprints_data, live_vars_data)
+                counts['merged_blocks'] = len(final_blocks)
+
+            # Run the post-processing and consolidation step
+            with profiler.stage('consolidate_to_block_format', blocks=len(final_blocks)) as counts:
+                consolidated_schedule, consolidated_schedule_info = consolidate_to_block_format(
+                    final_blocks,
+                    scheduling_info,
+                    nodes_data,          # Pass nodes_data
+                    live_vars_data,      # Pass live_vars_data
+                    func_footprints_data,# Pass func_footprints_data
+                    stmt_to_original_idx_map      # Pass stmt_to_idx_map
+                )
+                counts['consolidated_blocks'] = len(consolidated_schedule_info)
 
         # --- LEVEL 3: ATTEMPT DATA PARALLELIZATION ---
         unschedulable_final_blocks = [
             info for info in consolidated_schedule_info if not info['is_schedulable']
         ]
 
-        parallelization_plan = plan_data_parallelization(
-            unschedulable_final_blocks,
-            nodes_data,
-            live_vars_data,
-            func_footprints_data,
-        )
+        with profiler.stage('plan_data_parallelization', unschedulable_blocks=len(unschedulable_final_blocks)) as counts:
+            parallelization_plan = plan_data_parallelization(
+                unschedulable_final_blocks,
+                nodes_data,
+                live_vars_data,
+                func_footprints_data,
+            )
+            counts['planned_blocks'] = len(parallelization_plan)
 
         # --- FINAL STEP: GENERATE EXECUTION PLAN ---
-        generate_execution_plan(
-            consolidated_schedule_info,
-            parallelization_plan,
-            nodes_data,
-            live_vars_data,
-            func_footprints_data
-        )
+        with profiler.stage('generate_execution_plan') as counts:
+            execution_files = generate_execution_plan(
+                consolidated_schedule_info,
+                parallelization_plan,
+                nodes_data,
+                live_vars_data,
+                func_footprints_data,
+                output_dir
+            )
+            counts['files'] = len(execution_files)
+        results.update({
+            'final_blocks': final_blocks,
+            'scheduling_info': scheduling_info,
+            'consolidated_schedule_info': consolidated_schedule_info,
+            'consolidated_schedule': consolidated_schedule,
+            'parallelization_plan': parallelization_plan,
+            'execution_files': execution_files,
+        })
+        if output_dir is None:
+            return results
 
         # --- OUTPUTS ---
-        with open("final.json", 'w') as f:
+        with open(os.path.join(output_dir, "final.json"), 'w') as f:
             json.dump(final_blocks, f, indent=4)
-        with open("blocks.json", 'w') as f:
+        with open(os.path.join(output_dir, "blocks.json"), 'w') as f:
             json.dump(scheduling_info, f, indent=4)
-        with open("final_schedule_info.json", 'w') as f:
+        with open(os.path.join(output_dir, "final_schedule_info.json"), 'w') as f:
             json.dump(consolidated_schedule_info, f, indent=4)
-        with open("consolidated_schedule.json", 'w') as f:
+        with open(os.path.join(output_dir, "consolidated_schedule.json"), 'w') as f:
             json.dump(consolidated_schedule, f, indent=4)
-        with open("parallelization_plan.json", 'w') as f:
+        with open(os.path.join(output_dir, "parallelization_plan.json"), 'w') as f:
             json.dump(parallelization_plan, f, indent=4)
         print(f"\nFinal consolidated schedule has been written to 'final_schedule_info.json'")
         print("\nData parallelization plan has been written to 'parallelization_plan.json'")
+    return results
+
+# ==============================================================================
+# 6. MAIN EXECUTION BLOCK
+# ==============================================================================
+def main():
+    """Main function to parse arguments and run the scheduling workflow."""
+    parser = argparse.ArgumentParser(
+        description="A smart scheduler that first tries to fit a whole program, then resorts to merging blocks.",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    # ... (keep all your argument parsing code here) ...
+    parser.add_argument('blocks_file', help='Path to the initial blocks definition JSON file.')
+    parser.add_argument('live_vars_file', help='Path to live variables JSON file.')
+    parser.add_argument('func_footprints_file', help='Path to function footprints JSON file.')
+    parser.add_argument('nodes_file', help='Path to nodes JSON file.')
+    parser.add_argument('--generate-test-files', action='store_true', help='Generate test JSON files with default names before running.')
+    parser.add_argument('--profile', metavar='REPORT', help='Write wall/cpu time, peak traced memory and counts of every phase to REPORT (JSON).')
+    parser.add_argument('--profile-table', action='store_true', help='Print the per-phase profile as a table.')
+    parser.add_argument('--symbolic', metavar='JSON', help='Footprint expressions from Symbolic_Footprint.py --save, evaluated for --rows\nand --columns in place of live_vars_file and func_footprints_file.')
+    parser.add_argument('--rows', type=int, help='Rows of the data file the program will run on (with --symbolic).')
+    parser.add_argument('--columns', type=int, help='Columns of the data file the program will run on (with --symbolic).')
+    parser.add_argument('--strategy', choices=['memory', 'heft'], default='memory',
+                        help='memory: fit the whole program or merge blocks until they fit (default).\nheft: place the blocks to minimize the predicted makespan, nodes may have a\n"speed" (default 1.0) and a "bandwidth" in bytes per second.')
+    parser.add_argument('--runtimes', metavar='JSON', help='Seconds of a block index or a statement on a node of speed 1.0 (with --strategy heft),\nblocks without one are estimated from the bytes they move.')
+    parser.add_argument('--bandwidth', type=float, default=DEFAULT_BANDWIDTH, help=f'Bytes per second between nodes without a "bandwidth" (default {DEFAULT_BANDWIDTH:.0f}).')
+    args = parser.parse_args()
+    if args.symbolic and (args.rows is None or args.columns is None):
+        parser.error('--symbolic needs --rows and --columns')
+    if args.bandwidth <= 0:
+        parser.error('--bandwidth must be above 0')
+
+    # --- Load all data from files ---
+    try:
+        with open(args.blocks_file, 'r') as f: initial_blocks = json.load(f)
+        live_vars_data = Live_Vars.load(args.live_vars_file)
+        with open(args.func_footprints_file, 'r') as f: func_footprints_data = json.load(f)
+        with open(args.nodes_file, 'r') as f: nodes_data = json.load(f)
+        runtimes = None
+        if args.runtimes:
+            with open(args.runtimes, 'r') as f: runtimes = json.load(f)
+    except FileNotFoundError as e:
+        print(f"Error: Could not find required input file: {e.filename}")
+        return
+    if args.symbolic:
+        from Symbolic_Footprint import Symbolic_Footprint
+        live_vars_data, func_footprints_data = Symbolic_Footprint.load(args.symbolic).evaluate(args.rows, args.columns)
+
+    profiler = Stage_Profiler() if args.profile or args.profile_table else None
+    try:
+        run_schedule(initial_blocks, live_vars_data, func_footprints_data, nodes_data, profiler=profiler,
+                     strategy=args.strategy, runtimes=runtimes, bandwidth=args.bandwidth)
+    finally:
+        #! also written when a phase fails, it shows where
+        if args.profile:
+            profiler.save(args.profile, blocks_file=args.blocks_file, nodes_file=args.nodes_file)
+        if args.profile_table:
+            print(profiler.table())
 
 if __name__ == '__main__':
     main()
\ No newline at end of file